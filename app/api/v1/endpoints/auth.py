@@ -144,6 +144,8 @@ def connect_google_drive(
         current_user.google_access_token = credentials.token
         current_user.google_refresh_token = credentials.refresh_token
         current_user.google_drive_connected = True
+        # (Re)connected account: start over with a full listing
+        current_user.google_drive_changes_token = None
         
         db.add(current_user)
         db.commit()
@@ -3,8 +3,9 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.api import deps
 from app.models import user as models
+from app.models.document import Document
 from app.services.google_service import google_drive_service
-from app.services.pgvector_store import pgvector_store
+from app.services.vector_store import vector_store
 
 router = APIRouter()
 
@@ -23,14 +24,39 @@ async def sync_google_calendar(
         from starlette.concurrency import run_in_threadpool
         
         # 0. Clear existing calendar events to avoid duplicates
-        # delete_user_documents is sync
-        await run_in_threadpool(pgvector_store.delete_user_documents, current_user.id, "google_calendar")
+        await vector_store.delete_user_documents(current_user.id, "google_calendar")
 
         # 1. Fetch events (Sync -> Thread)
         events = await run_in_threadpool(google_drive_service.list_calendar_events, current_user)
         
-        # 2. Ingest
-        count = 0
+        if not events:
+            return {"message": "Synced 0 calendar events"}
+
+        # 2. Calendar events share one Document row (embeddings require a document_id)
+        def get_calendar_document():
+            doc = db.query(Document).filter(
+                Document.user_id == current_user.id,
+                Document.provider == "google_calendar",
+                Document.external_id == "primary"
+            ).first()
+            if not doc:
+                doc = Document(
+                    user_id=current_user.id,
+                    provider="google_calendar",
+                    external_id="primary",
+                    filename="Google Calendar",
+                    status="completed"
+                )
+                db.add(doc)
+                db.commit()
+                db.refresh(doc)
+            return doc.id
+
+        document_id = await run_in_threadpool(get_calendar_document)
+
+        # 3. Format events
+        contents = []
+        metadatas = []
         for event in events:
             # Format as text
             start = event['start'].get('dateTime', event['start'].get('date'))
@@ -50,12 +76,14 @@ async def sync_google_calendar(
                 "file_id": event_id,
                 "file_name": f"Event: {summary}",
                 "mime_type": "application/vnd.google-apps.event",
-                "chunk_index": 0
+                "chunk_index": 0,
+                "document_id": document_id
             }
-            
-            # Ingest (Async)
-            await pgvector_store.index_document(current_user.id, content, metadata)
-            count += 1
+            contents.append(content)
+            metadatas.append(metadata)
+
+        # 4. Embed all events in batches and insert them in one transaction (Async)
+        count = await vector_store.index_chunks(current_user.id, document_id, contents, metadata=metadatas)
             
         return {"message": f"Synced {count} calendar events"}
         
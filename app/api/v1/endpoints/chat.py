@@ -1,8 +1,7 @@
 from typing import Any, List, Optional
 from pydantic import BaseModel
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import deps
 from app.models import user as models
@@ -29,19 +28,21 @@ class ChatResponse(BaseModel):
     answer: str
     sources: List[Source]
     conversation_id: int
+    # True when retrieval fell back to keyword search (embedding service unavailable) or failed
+    degraded: bool = False
 
 @router.post("/", response_model=ChatResponse)
 async def chat(
     request: ChatRequest,
-    db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_active_user),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: models.User = Depends(deps.get_current_active_user_async),
 ) -> Any:
     """
     Chat with the Personal AI (Async).
     1. Retrieve Context (Async)
-    2. Get/Create Conversation History (Sync -> Thread)
+    2. Get/Create Conversation History (Async DB)
     3. Generate Answer (Async)
-    4. Save to Memory (Sync -> Thread)
+    4. Save to Memory (Async DB)
     """
     # 1. Retrieve Context
     try:
@@ -49,22 +50,20 @@ async def chat(
         retrieval_result = await retriever.retrieve_context(current_user.id, request.query, conversation_id=request.conversation_id)
         context_docs = retrieval_result["chunks"]
         context_stats = retrieval_result["stats"]
+        degraded = retrieval_result.get("degraded", False)
         print(f"Retrieved {len(context_docs)} docs")
     except Exception as e:
         print(f"Error retrieving context: {e}")
         # Continue without context rather than crashing
         context_docs = []
         context_stats = {}
+        degraded = True
     
     # 2. Get/Create Conversation (DB Op)
-    conversation = await run_in_threadpool(
-        memory_service.get_or_create_conversation, db, current_user.id, request.conversation_id
-    )
+    conversation = await memory_service.get_or_create_conversation(db, current_user.id, request.conversation_id)
     
     # 3. Get History (DB Op)
-    history = await run_in_threadpool(
-        memory_service.get_history, db, conversation.id
-    )
+    history = await memory_service.get_history(db, conversation.id)
     
     # 4. Generate Answer (Async / IO Bound)
     try:
@@ -77,8 +76,10 @@ async def chat(
         raise HTTPException(status_code=500, detail=f"LLM Generation failed: {str(e)}")
     
     # 5. Save to Memory (DB Op)
-    await run_in_threadpool(memory_service.add_message, db, conversation.id, "user", request.query)
-    await run_in_threadpool(memory_service.add_message, db, conversation.id, "assistant", answer)
+    await memory_service.add_messages(db, conversation.id, [
+        {"role": "user", "content": request.query},
+        {"role": "assistant", "content": answer},
+    ])
     
     # Format Sources
     sources = []
@@ -91,43 +92,44 @@ async def chat(
     return ChatResponse(
         answer=answer,
         sources=sources,
-        conversation_id=conversation.id
+        conversation_id=conversation.id,
+        degraded=degraded
     )
 
 @router.get("/conversations", response_model=List[dict])
 async def get_conversations(
-    db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_active_user),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: models.User = Depends(deps.get_current_active_user_async),
 ) -> Any:
     """
     Get all conversations for the current user (Async).
     """
-    conversations = await run_in_threadpool(memory_service.get_user_conversations, db, current_user.id)
+    conversations = await memory_service.get_user_conversations(db, current_user.id)
     return conversations
 
 @router.get("/{conversation_id}/messages", response_model=List[dict])
 async def get_conversation_messages(
     conversation_id: int,
-    db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_active_user),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: models.User = Depends(deps.get_current_active_user_async),
 ) -> Any:
     """
     Get messages for a specific conversation (Async).
     """
     # Verify ownership
-    conversation = await run_in_threadpool(memory_service.get_or_create_conversation, db, current_user.id, conversation_id)
+    conversation = await memory_service.get_or_create_conversation(db, current_user.id, conversation_id)
     if conversation.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    history = await run_in_threadpool(memory_service.get_history, db, conversation_id, limit=100)
+    history = await memory_service.get_history(db, conversation_id, limit=100)
     return history
 @router.delete("/{conversation_id}", response_model=dict)
 async def delete_conversation(
     conversation_id: int,
-    db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_active_user),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: models.User = Depends(deps.get_current_active_user_async),
 ) -> Any:
     """Delete a conversation and its messages for the current user."""
-    await run_in_threadpool(memory_service.delete_conversation, db, conversation_id, current_user.id)
+    await memory_service.delete_conversation(db, conversation_id, current_user.id)
     return {"detail": "Conversation deleted"}
 
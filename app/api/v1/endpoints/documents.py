@@ -1,99 +1,81 @@
-from typing import Any, List, Optional
+from typing import Any, List
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, BackgroundTasks, Form
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.concurrency import run_in_threadpool
 
 from app.api import deps
 from app.models import user as models
 from app.models.document import Document
 from app.services.processing.pdf_processor import pdf_processor
-from app.services.pgvector_store import pgvector_store
-from app.db.session import SessionLocal
+from app.services.vector_store import vector_store
+from app.db.session import AsyncSessionLocal
 
 router = APIRouter()
 
-# Helper for DB operations in background tasks
-def _db_op_wrapper(func, *args, **kwargs):
-    return func(*args, **kwargs)
-
 async def process_pdf_background(document_id: int, file_content: bytes):
-    db: Optional[Session] = None
-    try:
-        # 1. Get Document (Sync DB -> Thread)
-        def get_doc():
-            local_db = SessionLocal()
-            doc = local_db.query(Document).filter(Document.id == document_id).first()
-            return doc, local_db
-            
-        doc, db = await run_in_threadpool(get_doc)
+    async with AsyncSessionLocal() as db:
+        doc = await db.get(Document, document_id)
         if not doc:
-            if db: db.close()
             return
-        
-        # 2. Update Status (Sync DB -> Thread)
-        def update_status(status, error=None):
+
+        async def update_status(status, error=None):
             doc.status = status
             if error:
                 doc.error_message = str(error)
-            db.commit()
-            
-        await run_in_threadpool(update_status, "processing")
-        
-        # 3. Extract Text (CPU -> Thread)
-        text = await run_in_threadpool(pdf_processor.extract_text, file_content)
-        print(f"DEBUG: Document {document_id} extracted text length: {len(text) if text else 0}")
-        
-        if not text:
-            await run_in_threadpool(update_status, "failed", "Could not extract text")
-            await run_in_threadpool(db.close)
-            return
+            await db.commit()
+
+        try:
+            # 1. Update Status (Async DB)
+            await update_status("processing")
 
-        # 4. Chunk Text (CPU -> Thread)
-        from app.services.processing.chunker import chunker
-        chunks = await run_in_threadpool(chunker.chunk_text, text)
-        print(f"DEBUG: Generated {len(chunks)} chunks")
-            
-        for i, chunk in enumerate(chunks):
-            # 5. Index (Async - Await directly)
-            await pgvector_store.index_document(
+            # 2. Extract Text (CPU -> Thread)
+            text = await run_in_threadpool(pdf_processor.extract_text, file_content)
+            print(f"DEBUG: Document {document_id} extracted text length: {len(text) if text else 0}")
+
+            if not text:
+                await update_status("failed", "Could not extract text")
+                return
+
+            # 3. Chunk Text (CPU -> Thread)
+            from app.services.processing.chunker import chunker
+            chunks = await run_in_threadpool(chunker.chunk_text, text)
+            print(f"DEBUG: Generated {len(chunks)} chunks")
+
+            # 4. Embed in batches + bulk insert in one transaction (Async)
+            await vector_store.index_chunks(
                 user_id=doc.user_id,
-                content=chunk,
-                source_metadata={
+                document_id=doc.id,
+                chunks=chunks,
+                metadata={
                     "source_app": "pdf_upload",
                     "source_url": f"uploaded_pdf://{doc.id}",
                     "file_id": f"upload_{doc.id}",
                     "file_name": doc.filename,
                     "mime_type": "application/pdf",
-                    "chunk_index": i,
                     "conversation_id": doc.conversation_id
                 }
             )
-            
-        await run_in_threadpool(update_status, "completed")
-        
-    except Exception as e:
-        print(f"Error processing PDF {document_id}: {e}")
-        if db:
+
+            await update_status("completed")
+
+        except Exception as e:
+            print(f"Error processing PDF {document_id}: {e}")
             try:
                 # Update status to failed
-                def set_failed():
-                    doc.status = "failed"
-                    doc.error_message = str(e)
-                    db.commit()
-                await run_in_threadpool(set_failed)
-            except: pass
-    finally:
-        if db:
-            await run_in_threadpool(db.close)
+                await db.rollback()
+                await update_status("failed", e)
+            except Exception:
+                pass
 
 
 @router.post("/upload/pdf")
 async def upload_pdf(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    conversation_id: int = Form(None), 
-    db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_active_user),
+    conversation_id: int = Form(None),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: models.User = Depends(deps.get_current_active_user_async),
 ) -> Any:
     """
     Upload a PDF file, extract text, and index it for RAG (Background).
@@ -104,7 +86,7 @@ async def upload_pdf(
 
     try:
         contents = await file.read()
-        
+
         if len(contents) > 10 * 1024 * 1024:
             raise HTTPException(status_code=413, detail="File too large. Limit is 10MB.")
 
@@ -117,9 +99,9 @@ async def upload_pdf(
             conversation_id=conversation_id
         )
         db.add(doc)
-        db.commit()
-        db.refresh(doc)
-        
+        await db.commit()
+        await db.refresh(doc)
+
         # Enqueue background task
         background_tasks.add_task(process_pdf_background, doc.id, contents)
 
@@ -131,50 +113,45 @@ async def upload_pdf(
 @router.delete("/{document_id}")
 async def delete_document(
     document_id: int,
-    db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_active_user),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: models.User = Depends(deps.get_current_active_user_async),
 ) -> Any:
     """
     Delete a document and its embeddings.
     """
-    # Sync DB op -> Thread
-    doc = await run_in_threadpool(
-        lambda: db.query(Document).filter(Document.id == document_id, Document.user_id == current_user.id).first()
+    doc = await db.scalar(
+        select(Document).where(Document.id == document_id, Document.user_id == current_user.id)
     )
-    
+
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
-        
+
     try:
         # Delete from Vector Store first (Async)
         file_id = f"upload_{doc.id}"
-        await pgvector_store.delete_document_by_file_id(current_user.id, file_id)
-        
-        # Delete from DB (Sync -> Thread)
-        def db_delete():
-            db.delete(doc)
-            db.commit()
-        
-        await run_in_threadpool(db_delete)
-        
+        await vector_store.delete_document_by_file_id(current_user.id, file_id)
+
+        # Delete from DB (Async)
+        await db.delete(doc)
+        await db.commit()
+
         return {"message": "Document deleted"}
     except Exception as e:
         print(f"Error deleting document {document_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to delete document: {str(e)}")
 
 @router.get("/", response_model=List[dict])
-def get_documents(
+async def get_documents(
     conversation_id: int = None,
-    db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_active_user),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: models.User = Depends(deps.get_current_active_user_async),
 ) -> Any:
     """
     Get all uploaded documents for the current user, optionally filtered by conversation.
-    Kept synchronous (FastAPI threadpool) as it's purely DB read.
     """
-    query = db.query(Document).filter(Document.user_id == current_user.id)
+    query = select(Document).where(Document.user_id == current_user.id)
     if conversation_id:
-        query = query.filter((Document.conversation_id == conversation_id) | (Document.conversation_id == None))
-    
-    documents = query.order_by(Document.created_at.desc()).all()
+        query = query.where((Document.conversation_id == conversation_id) | (Document.conversation_id == None))
+
+    documents = (await db.scalars(query.order_by(Document.created_at.desc()))).all()
     return [{"id": d.id, "filename": d.filename, "created_at": d.created_at, "file_size": d.file_size, "status": d.status, "error_message": d.error_message, "conversation_id": d.conversation_id} for d in documents]
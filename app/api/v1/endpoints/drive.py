@@ -3,9 +3,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.api import deps
 from app.models import user as models
-from app.services.google_service import google_drive_service
+from app.services.google_service import google_drive_service, SUPPORTED_MIME_TYPES
 from app.services.rag_service import rag_service
-from app.services.pgvector_store import pgvector_store
 
 router = APIRouter()
 
@@ -23,26 +22,62 @@ async def sync_drive_files(
     try:
         from starlette.concurrency import run_in_threadpool
         
-        # 1. List files (Sync -> Thread)
-        files = await run_in_threadpool(google_drive_service.list_files, current_user)
+        # 1. Collect what changed since the last sync (Sync -> Thread)
+        removed_ids = set()
+        if current_user.google_drive_changes_token:
+            changes, next_token = await run_in_threadpool(
+                google_drive_service.list_changes, current_user, current_user.google_drive_changes_token
+            )
+            files = {}
+            for change in changes:
+                file = change.get('file') or {}
+                if change.get('removed') or file.get('trashed'):
+                    removed_ids.add(change['fileId'])
+                    files.pop(change['fileId'], None)
+                elif file.get('mimeType') in SUPPORTED_MIME_TYPES:
+                    removed_ids.discard(change['fileId'])
+                    files[change['fileId']] = file
+            files = list(files.values())
+        else:
+            # Initial backfill: take the cursor first so nothing changed while listing is missed
+            next_token = await run_in_threadpool(google_drive_service.get_start_page_token, current_user)
+            files = await run_in_threadpool(google_drive_service.list_files, current_user)
+        
+        # 2. Compare Drive change markers with what was last indexed (one query, no downloads)
+        known = await rag_service.get_drive_documents(current_user.id)
+        if not current_user.google_drive_changes_token:
+            # Files indexed before a full listing that no longer appear in it
+            removed_ids = set(known) - {file['id'] for file in files}
+        
+        # 3. Propagate deletions / trashing
+        removed = 0
+        for file_id in removed_ids:
+            if file_id in known:
+                await rag_service.remove_file(current_user.id, file_id)
+                removed += 1
+        
+        # 4. Ingest new and changed files (concurrently, bounded per user and globally)
+        to_ingest = [file for file in files if not rag_service.is_unchanged(known.get(file['id']), file)]
+        skipped = len(files) - len(to_ingest)
+        results = await rag_service.ingest_files(current_user, to_ingest)
         
-        # 2. Ingest each file
         count = 0
-        skipped = 0
-        for file in files:
-            # Check if file is already ingested (Incremental Sync)
-            # has_document is sync
-            exists = await run_in_threadpool(pgvector_store.has_document, current_user.id, file['id'])
-            if exists:
-                print(f"Skipping existing file: {file['name']}")
-                skipped += 1
-                continue
-                
-            # ingest_file is Async
-            await rag_service.ingest_file(current_user, file['id'], file['mimeType'], file['name'])
-            count += 1
+        updated = 0
+        failed = 0
+        for file, ok in zip(to_ingest, results):
+            if not ok:
+                failed += 1
+            elif file['id'] in known:
+                updated += 1
+            else:
+                count += 1
+        
+        # 5. Advance the cursor only when everything up to it was processed; failures are retried next sync
+        if not failed:
+            current_user.google_drive_changes_token = next_token
+            await run_in_threadpool(db.commit)
             
-        return {"message": f"Synced {count} new files (Skipped {skipped} existing)"}
+        return {"message": f"Synced {count} new and {updated} changed files, removed {removed} (Skipped {skipped} unchanged, {failed} failed)"}
         
     except Exception as e:
         # Log error
@@ -62,7 +97,7 @@ async def list_drive_files(
         
     try:
         from starlette.concurrency import run_in_threadpool
-        files = await run_in_threadpool(google_drive_service.list_files, current_user)
+        files = await run_in_threadpool(google_drive_service.list_files, current_user, 10)
         return files
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to list files: {str(e)}")
@@ -0,0 +1,31 @@
+from typing import Any
+from fastapi import APIRouter, Depends
+from app.api import deps
+from app.models import user as models
+from app.core.circuit_breaker import embedding_circuit_breaker
+from app.core.http_client import shared_http_client
+from app.core.rate_limiter import hf_rate_limiter
+from app.services.processing.embedding_cache import embedding_cache
+from app.services.vector_store import vector_store
+
+router = APIRouter()
+
+@router.get("/")
+async def get_metrics(
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Process-level performance metrics (connection pools, caches, limiters).
+    """
+    return {
+        "http_client": shared_http_client.stats(),
+        "hf_rate_limiter": hf_rate_limiter.stats(),
+        "embedding_backend": vector_store.embedding_backend.stats(),
+        "embedding_circuit_breaker": embedding_circuit_breaker.stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "query_embedding_cache": vector_store.query_embedding_cache.stats(),
+        "embedding_micro_batcher": vector_store.embedding_batcher.stats(),
+        "vector_ingest": vector_store.ingest_stats(),
+        "vector_search": vector_store.search_stats(),
+        "search_result_cache": vector_store.search_result_cache.stats(),
+    }
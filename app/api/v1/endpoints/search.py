@@ -0,0 +1,59 @@
+from typing import Any, List, Optional
+from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.api import deps
+from app.core.config import settings
+from app.models import user as models
+from app.services.ai_core.retriever import retriever
+
+router = APIRouter()
+
+class BatchSearchRequest(BaseModel):
+    queries: List[str]
+    top_k: int = 5
+    conversation_id: Optional[int] = None
+
+class SearchHit(BaseModel):
+    content: str
+    source_app: Optional[str] = None
+    source_url: Optional[str] = None
+    similarity: float
+
+class QueryResults(BaseModel):
+    query: str
+    results: List[SearchHit]
+
+class BatchSearchResponse(BaseModel):
+    results: List[QueryResults]
+    # True when results came from the lexical fallback (embedding backend down or slow)
+    degraded: bool = False
+
+@router.post("/batch", response_model=BatchSearchResponse)
+async def batch_search(
+    request: BatchSearchRequest,
+    current_user: models.User = Depends(deps.get_current_active_user_async),
+) -> Any:
+    """
+    Retrieve context for several queries at once (sub-questions, saved searches).
+    All queries are embedded in one call and searched in one database round trip.
+    Falls back to lexical search (degraded=true) when the embedding backend is unavailable.
+    """
+    if not request.queries:
+        return BatchSearchResponse(results=[])
+    if len(request.queries) > settings.SEARCH_BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {settings.SEARCH_BATCH_MAX_QUERIES} queries per batch")
+    if not 1 <= request.top_k <= settings.SEARCH_BATCH_MAX_TOP_K:
+        raise HTTPException(status_code=400, detail=f"top_k must be between 1 and {settings.SEARCH_BATCH_MAX_TOP_K}")
+
+    try:
+        results, degraded = await retriever.search_many(
+            current_user.id, request.queries, k=request.top_k, conversation_id=request.conversation_id
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch search failed: {str(e)}")
+
+    return BatchSearchResponse(results=[
+        QueryResults(query=query, results=[SearchHit(**hit) for hit in hits])
+        for query, hits in zip(request.queries, results)
+    ], degraded=degraded)
@@ -0,0 +1,123 @@
+"""
+Circuit breaker for upstream dependencies (the embedding backend).
+After `failure_threshold` consecutive failures the circuit opens and calls fail
+immediately with CircuitOpenError instead of waiting on retries and timeouts.
+After `recovery_seconds` one trial call is let through (half-open): success closes
+the circuit, failure opens it again.
+Only errors that `is_failure` accepts count; the others (e.g. a 400 for a bad input) are
+re-raised without affecting the circuit.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict
+import httpx
+from app.core.config import settings
+from app.core.rate_limiter import RetriesExhaustedError
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the dependency while the circuit is open."""
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    """
+    True for errors that say the upstream service is unhealthy: transport errors, timeouts,
+    exhausted retries (429 / 5xx / timeouts, see AdaptiveRateLimiter.send) and 5xx / 429 responses.
+    Errors caused by the request itself (other 4xx, malformed input) return False.
+    """
+    if isinstance(exc, (httpx.TransportError, asyncio.TimeoutError, RetriesExhaustedError)):
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status >= 500 or status == 429
+    return False
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, recovery_seconds: float, is_failure: Callable[[BaseException], bool] = None):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_seconds = recovery_seconds
+        self.is_failure = is_failure or (lambda exc: True)
+
+        self.state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+        self.rejected = 0
+        self.failures = 0
+        self.ignored_errors = 0
+        self.times_opened = 0
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls would be rejected (open and not yet due for a trial call)."""
+        return self.state == self.OPEN and time.monotonic() - self._opened_at < self.recovery_seconds
+
+    def _allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_seconds:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self._consecutive_failures = 0
+        self._trial_in_flight = False
+        if self.state != self.CLOSED:
+            print(f"Circuit '{self.name}' closed")
+        self.state = self.CLOSED
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+                print(f"Circuit '{self.name}' opened after {self._consecutive_failures} consecutive failures")
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    async def call(self, make_call: Callable[[], Awaitable[Any]]) -> Any:
+        if not self._allow():
+            self.rejected += 1
+            raise CircuitOpenError(f"Circuit '{self.name}' is open")
+        try:
+            result = await make_call()
+        except asyncio.CancelledError:
+            # Not a verdict on the dependency; let the next caller run the trial
+            self._trial_in_flight = False
+            raise
+        except Exception as e:
+            if self.is_failure(e):
+                self.record_failure()
+            else:
+                # Says nothing about the dependency's health; a half-open trial is simply retried
+                self.ignored_errors += 1
+                self._trial_in_flight = False
+            raise
+        self.record_success()
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._consecutive_failures,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "ignored_errors": self.ignored_errors,
+            "times_opened": self.times_opened,
+        }
+
+embedding_circuit_breaker = CircuitBreaker(
+    "embedding",
+    failure_threshold=settings.EMBEDDING_CIRCUIT_FAILURE_THRESHOLD,
+    recovery_seconds=settings.EMBEDDING_CIRCUIT_RECOVERY_SECONDS,
+    is_failure=is_upstream_failure,
+)
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional, List
+from typing import Optional, List, Dict
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Exo"
@@ -22,11 +22,131 @@ class Settings(BaseSettings):
             return self.DATABASE_URL.replace("postgres://", "postgresql://")
         return self.SQLALCHEMY_DATABASE_URI
 
+    @property
+    def async_database_url(self) -> str:
+        """Same database as sync_database_url, through an asyncio driver (asyncpg / aiosqlite)."""
+        url = self.sync_database_url
+        if url.startswith("postgresql://") or url.startswith("postgresql+"):
+            # Swap any sync driver (postgresql://, postgresql+psycopg2://); asyncpg spells sslmode as ssl
+            return "postgresql+asyncpg://" + url.split("://", 1)[1].replace("sslmode=", "ssl=")
+        if url.startswith("sqlite://"):
+            return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+        return url
+
+    # Async engine pool (vector store, chat and documents endpoints)
+    ASYNC_DB_POOL_SIZE: int = 10
+    ASYNC_DB_MAX_OVERFLOW: int = 10
+    # asyncpg prepared-statement cache. None = auto: 0 behind a transaction-mode pooler
+    # (Supabase pooler on port 6543, pgbouncer), where prepared statements do not survive, else 100
+    ASYNC_DB_STATEMENT_CACHE_SIZE: Optional[int] = None
+    # Schema the pgvector extension lives in; None looks it up from pg_extension
+    # (Supabase installs extensions into "extensions")
+    PGVECTOR_SCHEMA: Optional[str] = None
+
     GOOGLE_CLIENT_ID: Optional[str] = None
     GOOGLE_CLIENT_SECRET: Optional[str] = None
+    # Page size for Drive files.list / changes.list (API maximum is 1000)
+    DRIVE_LIST_PAGE_SIZE: int = 1000
+    # Files ingested concurrently by /drive/sync (download, extraction and embedding of different files overlap)
+    DRIVE_INGEST_USER_CONCURRENCY: int = 4
+    DRIVE_INGEST_GLOBAL_CONCURRENCY: int = 8
     GEMINI_API_KEY: Optional[str] = None
     HUGGINGFACE_API_KEY: Optional[str] = None
     HUGGINGFACE_MODEL: str = "Qwen/Qwen2.5-72B-Instruct"
+    LLM_REQUEST_TIMEOUT: float = 60.0
+
+    # Embedding backend: "huggingface" (HF Inference Router) or "local" (ONNX Runtime on CPU)
+    EMBEDDING_BACKEND: str = "huggingface"
+    LOCAL_EMBEDDING_MODEL_DIR: Optional[str] = None # Defaults to a huggingface_hub download
+    LOCAL_EMBEDDING_QUANTIZE: bool = True # int8 dynamic quantization
+    LOCAL_EMBEDDING_WORKERS: int = 2
+    LOCAL_EMBEDDING_INTRA_OP_THREADS: int = 2
+    LOCAL_EMBEDDING_BATCH_SIZE: int = 16
+
+    # Embedding batching: max chunks and max characters packed into one inference request
+    EMBEDDING_BATCH_SIZE: int = 32
+    EMBEDDING_BATCH_MAX_CHARS: int = 16000
+
+    # Persistent embedding cache (embedding_cache table)
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MAX_AGE_DAYS: int = 90
+    EMBEDDING_CACHE_MAX_ROWS: int = 1_000_000
+
+    # Vector store: "pgvector" (Postgres) or "local" (NumPy, memory-mapped files under LOCAL_VECTOR_STORE_DIR)
+    VECTOR_STORE_BACKEND: str = "pgvector"
+    LOCAL_VECTOR_STORE_DIR: str = "./local_vector_store"
+
+    # Rows per multi-row INSERT statement when bulk indexing a document
+    VECTOR_INSERT_BATCH_ROWS: int = 500
+
+    # ANN index on document_embeddings.embedding: "ivfflat" or "hnsw" (see rebuild_vector_index.py)
+    VECTOR_INDEX_TYPE: str = "ivfflat"
+    # Per-query search effort presets: ivfflat.probes / hnsw.ef_search
+    VECTOR_SEARCH_ACCURACY: str = "balanced"
+    IVFFLAT_PROBES: Dict[str, int] = {"fast": 1, "balanced": 10, "accurate": 40}
+    HNSW_EF_SEARCH: Dict[str, int] = {"fast": 40, "balanced": 100, "accurate": 400}
+    # Embedding circuit breaker: open after N consecutive failures, retry after the recovery window.
+    # While open (or when the query embedding is slower than the timeout) retrieval falls back to lexical search
+    EMBEDDING_CIRCUIT_FAILURE_THRESHOLD: int = 3
+    EMBEDDING_CIRCUIT_RECOVERY_SECONDS: float = 30.0
+    RETRIEVAL_EMBEDDING_TIMEOUT_SECONDS: float = 8.0
+
+    # Retrieval mode: "vector", "hybrid" (vector + full-text, reciprocal rank fusion) or "lexical"
+    SEARCH_MODE: str = "vector"
+    HYBRID_CANDIDATES: int = 50
+    HYBRID_RRF_K: int = 60
+    # Result diversification: fetch SEARCH_FETCH_K candidates, keep top_k by Maximal Marginal Relevance
+    # (MMR_LAMBDA 1.0 = pure relevance), drop near-duplicates and merge neighbouring chunks of one file
+    SEARCH_DIVERSIFY: bool = True
+    SEARCH_FETCH_K: int = 20
+    MMR_LAMBDA: float = 0.7
+    SEARCH_DUPLICATE_SIMILARITY: float = 0.95
+    SEARCH_MERGE_ADJACENT_CHUNKS: bool = True
+    # Search results keyed by (user, query embedding, top_k, scope, options, corpus version). Every write
+    # to a user's chunks bumps the version, so entries never go stale; the TTL only bounds memory
+    SEARCH_RESULT_CACHE_SIZE: int = 2048
+    SEARCH_RESULT_CACHE_TTL_SECONDS: int = 900
+    # POST /search/batch limits
+    SEARCH_BATCH_MAX_QUERIES: int = 32
+    SEARCH_BATCH_MAX_TOP_K: int = 50
+    # Filtered search: "auto" (exact scan for small per-user sets, else ANN), "exact" or "ann"
+    VECTOR_SEARCH_FILTER_MODE: str = "auto"
+    VECTOR_EXACT_SEARCH_MAX_ROWS: int = 20000
+    VECTOR_CANDIDATE_COUNT_TTL_SECONDS: int = 60
+    # ANN re-queries when filters leave fewer than top_k rows (effort grows by the factor each time)
+    VECTOR_SEARCH_MAX_REQUERIES: int = 2
+    VECTOR_SEARCH_OVERFETCH_FACTOR: int = 4
+    # pgvector >= 0.8: let the index keep scanning past filtered-out rows
+    VECTOR_ITERATIVE_SCAN: bool = False
+
+    # Per-user knowledge-base summary (user_kb_stats / user_kb_files)
+    KB_STATS_CACHE_TTL_SECONDS: int = 300
+    KB_STATS_MAX_FILE_NAMES: int = 20
+
+    # In-process query embedding cache (LRU + TTL)
+    QUERY_EMBEDDING_CACHE_SIZE: int = 1024
+    QUERY_EMBEDDING_CACHE_TTL_SECONDS: int = 3600
+
+    # Micro-batching of concurrent single-text embedding calls
+    EMBEDDING_MICRO_BATCH_MAX_SIZE: int = 32
+    EMBEDDING_MICRO_BATCH_WAIT_MS: float = 5.0
+
+    # Shared HTTP client (HF embedding + LLM backends)
+    HTTP_CLIENT_TIMEOUT: float = 30.0
+    HTTP_CLIENT_MAX_CONNECTIONS: int = 100
+    HTTP_CLIENT_MAX_KEEPALIVE: int = 20
+    HTTP_CLIENT_KEEPALIVE_EXPIRY: float = 60.0
+    HTTP_CLIENT_HTTP2: bool = True
+
+    # Shared HF rate limiter (token bucket + AIMD concurrency) and retry backoff
+    HF_RATE_LIMIT_PER_SECOND: float = 10.0
+    HF_RATE_LIMIT_BURST: int = 20
+    HF_INITIAL_CONCURRENCY: int = 8
+    HF_MIN_CONCURRENCY: int = 1
+    HF_MAX_CONCURRENCY: int = 32
+    HF_MAX_RETRIES: int = 3
+    HF_BACKOFF_BASE_SECONDS: float = 0.5
+    HF_BACKOFF_MAX_SECONDS: float = 30.0
 
     class Config:
         env_file = ".env"
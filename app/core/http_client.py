@@ -0,0 +1,97 @@
+"""
+Process-wide pooled HTTP client.
+Shared by the embedding (PgVectorStore) and LLM (LLMGenerator) backends so that
+every call reuses warm keep-alive connections instead of paying for a new TCP+TLS handshake.
+"""
+from typing import Any, Dict, Optional
+import httpx
+from app.core.config import settings
+
+class SharedHTTPClient:
+    """
+    Owns a single long-lived httpx.AsyncClient.
+    Opened on FastAPI startup and closed on shutdown (see app/main.py).
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._http2 = False
+        self.requests_sent = 0
+        self.connections_opened = 0
+
+    def _http2_available(self) -> bool:
+        if not settings.HTTP_CLIENT_HTTP2:
+            return False
+        try:
+            import h2  # noqa: F401
+            return True
+        except ImportError:
+            print("WARNING: HTTP_CLIENT_HTTP2 is enabled but 'h2' is not installed. Falling back to HTTP/1.1.")
+            return False
+
+    def _create_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_CLIENT_MAX_KEEPALIVE,
+            keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_EXPIRY,
+        )
+        self._http2 = self._http2_available()
+        return httpx.AsyncClient(
+            timeout=settings.HTTP_CLIENT_TIMEOUT,
+            limits=limits,
+            http2=self._http2,
+            event_hooks={"request": [self._on_request], "response": [self._on_response]},
+        )
+
+    async def start(self) -> None:
+        """Create the pooled client (called from the startup event)."""
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+            print("Shared HTTP client started.")
+
+    async def close(self) -> None:
+        """Close the pooled client and its connections (called from the shutdown event)."""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+            print("Shared HTTP client closed.")
+        self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        The shared client. Created lazily so scripts and background jobs that
+        never run the FastAPI lifecycle still work.
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+        return self._client
+
+    async def _on_request(self, request: httpx.Request) -> None:
+        # httpcore reports connection setup through the "trace" extension
+        request.extensions["trace"] = self._trace
+
+    async def _on_response(self, response: httpx.Response) -> None:
+        # Only completed exchanges count towards the reuse rate
+        self.requests_sent += 1
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Pool statistics: requests sent, connections opened and the resulting reuse rate.
+        Counted from the event hooks and trace callbacks only (httpx has no public pool API).
+        """
+        reuse_rate = 0.0
+        if self.requests_sent:
+            reuse_rate = max(0.0, 1 - self.connections_opened / self.requests_sent)
+
+        return {
+            "requests_sent": self.requests_sent,
+            "connections_opened": self.connections_opened,
+            "connection_reuse_rate": round(reuse_rate, 4),
+            "http2": self._http2 and self._client is not None,
+        }
+
+shared_http_client = SharedHTTPClient()
@@ -0,0 +1,196 @@
+"""
+Adaptive client-side rate limiting for Hugging Face API calls.
+Combines a token bucket (request rate) with an AIMD concurrency limit that all
+callers share, and retries with Retry-After aware, jittered backoff.
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+import httpx
+from app.core.config import settings
+
+class RetriesExhaustedError(Exception):
+    """Every attempt was throttled, failed with a retryable status or timed out."""
+
+class AdaptiveRateLimiter:
+    """
+    - Token bucket: at most `rate_per_second` requests on average, bursts up to `burst`.
+    - AIMD: the allowed concurrency grows by ~1 per window of successful calls and is
+      halved on 429/503 or timeouts, so a burst of ingestion backs off together.
+    - Retry-After / rate-limit reset headers pause every caller until the server is ready.
+    """
+    # Status codes worth retrying; 429 and 503 also signal overload
+    retry_statuses = {429, 500, 502, 503, 504}
+    throttle_statuses = {429, 503}
+
+    def __init__(self, rate_per_second: float, burst: int, initial_concurrency: int, min_concurrency: int, max_concurrency: int):
+        self.rate_per_second = rate_per_second
+        self.burst = max(1, burst)
+        self.min_concurrency = max(1, min_concurrency)
+        self.max_concurrency = max(self.min_concurrency, max_concurrency)
+        self.concurrency_limit = float(min(max(initial_concurrency, self.min_concurrency), self.max_concurrency))
+
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._in_flight = 0
+        self._waiters: deque = deque()
+
+        self.requests = 0
+        self.throttled = 0
+        self.retries = 0
+        self.failures = 0
+
+    # --- Concurrency (AIMD) ---
+
+    async def _acquire(self) -> None:
+        while self._in_flight >= int(self.concurrency_limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # Woken (a slot was handed to us) but cancelled before resuming: pass the slot on
+                if waiter.done() and not waiter.cancelled():
+                    self._wake()
+                raise
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self._in_flight += 1
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        free = int(self.concurrency_limit) - self._in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def on_success(self) -> None:
+        # Additive increase: +1 after roughly `limit` successful calls
+        self.concurrency_limit = min(self.max_concurrency, self.concurrency_limit + 1.0 / self.concurrency_limit)
+        self._wake()
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        # Multiplicative decrease, and pause everyone if the server told us how long to wait
+        self.throttled += 1
+        self.concurrency_limit = max(self.min_concurrency, self.concurrency_limit / 2)
+        if retry_after:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+
+    # --- Rate (token bucket) ---
+
+    async def _take_token(self) -> None:
+        if self.rate_per_second <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            if self._blocked_until > now:
+                await asyncio.sleep(self._blocked_until - now)
+                continue
+            self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate_per_second)
+            self._last_refill = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate_per_second)
+
+    # --- Retries ---
+
+    @staticmethod
+    def parse_retry_after(headers: httpx.Headers) -> Optional[float]:
+        """Seconds to wait from Retry-After (delta or HTTP date) or X-RateLimit-Reset headers."""
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                try:
+                    return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+                except (TypeError, ValueError):
+                    pass
+        for header in ("ratelimit-reset", "x-ratelimit-reset"):
+            value = headers.get(header)
+            if value:
+                try:
+                    seconds = float(value)
+                except ValueError:
+                    continue
+                # Some APIs send an epoch timestamp instead of a delta
+                return max(0.0, seconds - time.time()) if seconds > 1e9 else seconds
+        return None
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Server-provided delay when present, otherwise exponential backoff with full jitter."""
+        if retry_after is not None:
+            return min(retry_after, settings.HF_BACKOFF_MAX_SECONDS) + random.uniform(0, settings.HF_BACKOFF_BASE_SECONDS)
+        return random.uniform(0, min(settings.HF_BACKOFF_MAX_SECONDS, settings.HF_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+    async def send(self, make_request: Callable[[], Awaitable[httpx.Response]], max_retries: int = None, label: str = "HF") -> httpx.Response:
+        """
+        Run `make_request` under the limiter, retrying throttled/failed attempts.
+        Returns the first non-retryable response; raises after `max_retries` attempts.
+        """
+        max_retries = max_retries or settings.HF_MAX_RETRIES
+        for attempt in range(max_retries):
+            await self._take_token()
+            await self._acquire()
+            self.requests += 1
+            try:
+                response = await make_request()
+            except httpx.TimeoutException:
+                self.on_throttle()
+                response = None
+            finally:
+                self._release()
+
+            if response is not None and response.status_code not in self.retry_statuses:
+                if response.status_code < 400:
+                    self.on_success()
+                return response
+
+            retry_after = None
+            if response is not None:
+                retry_after = self.parse_retry_after(response.headers)
+                if response.status_code in self.throttle_statuses:
+                    self.on_throttle(retry_after)
+
+            if attempt == max_retries - 1:
+                break
+            self.retries += 1
+            wait_time = self.backoff_delay(attempt, retry_after)
+            reason = "Timeout" if response is None else f"Error ({response.status_code})"
+            print(f"{label} {reason}, retrying in {wait_time:.2f}s...")
+            await asyncio.sleep(wait_time)
+
+        self.failures += 1
+        raise RetriesExhaustedError(f"{label} request failed after {max_retries} attempts")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency_limit": int(self.concurrency_limit),
+            "in_flight": self._in_flight,
+            "waiting": len(self._waiters),
+            "rate_per_second": self.rate_per_second,
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "failures": self.failures,
+        }
+
+# Shared by the embedding and LLM backends (same HF account / quota)
+hf_rate_limiter = AdaptiveRateLimiter(
+    rate_per_second=settings.HF_RATE_LIMIT_PER_SECOND,
+    burst=settings.HF_RATE_LIMIT_BURST,
+    initial_concurrency=settings.HF_INITIAL_CONCURRENCY,
+    min_concurrency=settings.HF_MIN_CONCURRENCY,
+    max_concurrency=settings.HF_MAX_CONCURRENCY,
+)
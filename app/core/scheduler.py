@@ -1,5 +1,6 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from app.services.processing.sync_service import sync_service
+from app.services.processing.embedding_cache import embedding_cache
 from app.db.session import SessionLocal
 from app.models.user import User
 
@@ -25,5 +26,7 @@ def start_scheduler():
     # Run every 12 hours. For testing, we can set it to run every minute or manually trigger.
     # We'll set it to 12 hours as requested.
     scheduler.add_job(sync_all_users, 'interval', hours=12)
+    # Keep the embedding cache bounded (age + LRU eviction)
+    scheduler.add_job(embedding_cache.evict, 'interval', hours=24)
     scheduler.start()
     print("Scheduler started.")
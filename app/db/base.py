@@ -3,3 +3,4 @@ from app.models.user import User  # noqa
 from app.models.credential import UserCredential # noqa
 from app.models.chat import Conversation, Message # noqa
 from app.models.document import Document # noqa
+from app.models.embedding_cache import EmbeddingCache # noqa
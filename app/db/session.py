@@ -1,6 +1,10 @@
-from sqlalchemy import create_engine
+from uuid import uuid4
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from app.core.config import settings
+from app.db.vector_codec import register_psycopg2_adapter, register_asyncpg_codec
 
 db_url = settings.sync_database_url
 connect_args = {"check_same_thread": False} if "sqlite" in db_url else {}
@@ -8,4 +12,48 @@ connect_args = {"check_same_thread": False} if "sqlite" in db_url else {}
 engine = create_engine(
     db_url, connect_args=connect_args
 )
+# Bind embeddings as compact vector literals instead of str(list)
+register_psycopg2_adapter()
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def behind_transaction_pooler(url: str) -> bool:
+    """Supabase's transaction-mode pooler listens on 6543; pgbouncer URLs usually name it."""
+    return make_url(url).port == 6543 or "pgbouncer" in url
+
+def asyncpg_connect_args(url: str) -> dict:
+    """
+    Prepared-statement settings for asyncpg. A transaction-mode pooler hands each transaction
+    to any backend, so statements prepared on one are missing on the next: disable asyncpg's and
+    SQLAlchemy's statement caches there and give every statement a unique name.
+    """
+    cache_size = settings.ASYNC_DB_STATEMENT_CACHE_SIZE
+    if cache_size is None:
+        cache_size = 0 if behind_transaction_pooler(url) else 100
+    if cache_size:
+        return {"statement_cache_size": cache_size}
+    return {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+    }
+
+# Async engine with its own pool: requests await Postgres without a worker thread
+async_db_url = settings.async_database_url
+if async_db_url.startswith("postgresql+asyncpg"):
+    async_engine = create_async_engine(
+        async_db_url,
+        pool_size=settings.ASYNC_DB_POOL_SIZE,
+        max_overflow=settings.ASYNC_DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        connect_args=asyncpg_connect_args(async_db_url),
+    )
+
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _register_vector_codec(dbapi_connection, connection_record):
+        # Embeddings travel in pgvector's binary format on asyncpg connections
+        dbapi_connection.run_async(lambda conn: register_asyncpg_codec(conn, settings.PGVECTOR_SCHEMA))
+else:
+    async_engine = create_async_engine(async_db_url)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
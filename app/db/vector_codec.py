@@ -0,0 +1,72 @@
+"""
+pgvector parameter encoding.
+Embeddings are passed to the database as float32 arrays instead of `str(list)`:
+- Binary wire format (vector_send/vector_recv) on the asyncpg engine (register_asyncpg_codec).
+- A compact, lossless text literal for psycopg2, which only sends text parameters.
+Run bench_vector_encoding.py to compare payload size and CPU cost.
+"""
+import struct
+from typing import Optional, Sequence, Union
+import numpy as np
+
+# pgvector binary layout: int16 dim, int16 unused, dim * float4 (all big-endian)
+_HEADER = struct.Struct(">HH")
+
+class PgVector:
+    """A float32 embedding bound as a pgvector `vector` parameter."""
+    __slots__ = ("data",)
+
+    def __init__(self, values: Union[Sequence[float], np.ndarray]):
+        self.data = np.asarray(values, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+def to_pgvector(values: Union[Sequence[float], np.ndarray, PgVector]) -> PgVector:
+    return values if isinstance(values, PgVector) else PgVector(values)
+
+def encode_vector(values: Union[Sequence[float], np.ndarray, PgVector]) -> bytes:
+    """Encode to pgvector's binary format (4 + 4 * dim bytes)."""
+    data = to_pgvector(values).data
+    return _HEADER.pack(len(data), 0) + data.astype(">f4", copy=False).tobytes()
+
+def decode_vector(payload: bytes) -> np.ndarray:
+    """Decode pgvector's binary format into a float32 array."""
+    dim, _ = _HEADER.unpack_from(payload)
+    return np.frombuffer(payload, dtype=">f4", count=dim, offset=_HEADER.size).astype(np.float32)
+
+def format_vector(values: Union[Sequence[float], np.ndarray, PgVector]) -> str:
+    """Compact text literal. 9 significant digits round-trip float32 exactly."""
+    data = to_pgvector(values).data
+    return "[" + ",".join(["%.9g" % x for x in data.tolist()]) + "]"
+
+def parse_vector(literal: str) -> np.ndarray:
+    """Parse a pgvector text literal ('[1,2,3]') into a float32 array."""
+    return np.array(literal.strip("[]").split(","), dtype=np.float32)
+
+def register_psycopg2_adapter() -> None:
+    """Let psycopg2 bind PgVector parameters as `'[...]'::vector` literals."""
+    try:
+        from psycopg2.extensions import register_adapter, AsIs
+    except ImportError:
+        return
+    register_adapter(PgVector, lambda v: AsIs("'%s'::vector" % format_vector(v)))
+
+async def register_asyncpg_codec(connection, schema: Optional[str] = None) -> None:
+    """
+    Send/receive `vector` values in binary format on an asyncpg connection.
+    `schema` defaults to wherever the pgvector extension is installed (Supabase uses "extensions").
+    Raises if the type cannot be found: without the codec every vector parameter would fail to bind.
+    """
+    if schema is None:
+        schema = await connection.fetchval(
+            "SELECT n.nspname FROM pg_extension e JOIN pg_namespace n ON n.oid = e.extnamespace WHERE e.extname = 'vector'"
+        )
+        if schema is None:
+            raise RuntimeError("pgvector extension is not installed (CREATE EXTENSION vector)")
+    try:
+        await connection.set_type_codec(
+            "vector", schema=schema, encoder=encode_vector, decoder=decode_vector, format="binary"
+        )
+    except ValueError as e:
+        raise RuntimeError(f"pgvector 'vector' type not found in schema '{schema}' (check PGVECTOR_SCHEMA)") from e
@@ -6,6 +6,7 @@ from app.db.base import Base
 from app.db.session import engine
 
 from app.core.scheduler import start_scheduler
+from app.core.http_client import shared_http_client
 
 # Create tables
 Base.metadata.create_all(bind=engine)
@@ -24,8 +25,13 @@ app.add_middleware(
 
 @app.on_event("startup")
 async def startup_event():
+    await shared_http_client.start()
     start_scheduler()
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await shared_http_client.close()
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 @app.get("/")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -18,6 +18,12 @@ class Document(Base):
     source_url = Column(String, nullable=True)
     content_hash = Column(String, nullable=True) # For duplicate detection
     
+    # Source-side change markers from the Drive listing (modifiedTime / md5Checksum / version);
+    # /drive/sync skips files whose markers match without downloading them
+    remote_modified_time = Column(String, nullable=True)
+    remote_md5_checksum = Column(String, nullable=True)
+    remote_version = Column(BigInteger, nullable=True)
+    
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=True)
     
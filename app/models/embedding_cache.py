@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, UniqueConstraint, Index
+from sqlalchemy.sql import func
+
+from app.db.base_class import Base
+
+class EmbeddingCache(Base):
+    """
+    Content-addressed embedding cache.
+    Keyed by (model, instruction, sha256 of the text) so unchanged content is never re-embedded.
+    """
+    __tablename__ = "embedding_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    model = Column(String, nullable=False)
+    instruction = Column(String, nullable=False, default="")
+    content_hash = Column(String(64), nullable=False)
+    embedding = Column(LargeBinary, nullable=False) # float32 bytes
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("model", "instruction", "content_hash", name="uq_embedding_cache_key"),
+        Index("ix_embedding_cache_last_used_at", "last_used_at"),
+    )
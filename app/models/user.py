@@ -12,6 +12,8 @@ class User(Base):
     google_access_token = Column(String, nullable=True)
     google_refresh_token = Column(String, nullable=True)
     google_drive_connected = Column(Boolean, default=False)
+    # Drive Changes API cursor; /drive/sync only processes changes since this token
+    google_drive_changes_token = Column(String, nullable=True)
     is_active = Column(Boolean, default=True)
     
     conversations = relationship("Conversation", back_populates="user")
@@ -1,25 +1,46 @@
 import os
-from huggingface_hub import AsyncInferenceClient
 from typing import List, Dict, Any
 from app.core.config import settings
+from app.core.http_client import shared_http_client
+from app.core.rate_limiter import hf_rate_limiter
 
 class LLMGenerator:
     def __init__(self):
         self.api_key = settings.HUGGINGFACE_API_KEY
         self.model_id = settings.HUGGINGFACE_MODEL
+        # OpenAI-compatible chat completions endpoint of the HF Inference Router
+        self.api_url = "https://router.huggingface.co/v1/chat/completions"
         
         if not self.api_key:
             print("WARNING: HUGGINGFACE_API_KEY not set. Using Mock LLM.")
-            self.client = None
-        else:
-            # Use AsyncInferenceClient
-            self.client = AsyncInferenceClient(token=self.api_key)
+
+    async def chat_completion(self, messages: List[Dict[str, str]], max_tokens: int = 512, temperature: float = 0.7) -> str:
+        """
+        Calls the HF chat completions API over the shared pooled HTTP client.
+        """
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        payload = {
+            "model": self.model_id,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+        client = shared_http_client.client
+        response = await hf_rate_limiter.send(
+            lambda: client.post(self.api_url, headers=headers, json=payload, timeout=settings.LLM_REQUEST_TIMEOUT),
+            label="HF Chat"
+        )
+        if response.status_code != 200:
+            print(f"HF Chat API Error: {response.status_code} - {response.text}")
+            response.raise_for_status()
+        completion = response.json()
+        return completion["choices"][0]["message"]["content"].strip()
 
     async def generate_response(self, query: str, context: List[Dict], history: List[Dict], stats: Dict[str, Any] = None) -> str:
         """
-        Generates a response using Hugging Face Inference API via AsyncInferenceClient.
+        Generates a response using the Hugging Face Inference API (Async).
         """
-        if not self.client:
+        if not self.api_key:
              return f"Mock AI Response to '{query}' based on {len(context)} context items. (Set HUGGINGFACE_API_KEY to use real model)"
 
         # 1. Construct Context String
@@ -60,17 +81,9 @@ Context:
             "content": query
         })
 
-        # 4. Call HF API via AsyncInferenceClient
+        # 4. Call HF API over the shared HTTP client
         try:
-            # Using chat_completion method which is async
-            completion = await self.client.chat_completion(
-                model=self.model_id,
-                messages=messages,
-                max_tokens=512,
-                temperature=0.7
-            )
-            
-            return completion.choices[0].message.content.strip()
+            return await self.chat_completion(messages, max_tokens=512, temperature=0.7)
                 
         except Exception as e:
             return f"Error generating response: {str(e)}"
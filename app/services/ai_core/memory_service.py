@@ -1,46 +1,60 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.chat import Conversation, Message
 from typing import List, Dict, Any
 
 class MemoryService:
-    def get_or_create_conversation(self, db: Session, user_id: int, conversation_id: int = None) -> Conversation:
+    async def get_or_create_conversation(self, db: AsyncSession, user_id: int, conversation_id: int = None) -> Conversation:
         if conversation_id:
-            conversation = db.query(Conversation).filter(Conversation.id == conversation_id, Conversation.user_id == user_id).first()
+            conversation = await db.scalar(
+                select(Conversation).where(Conversation.id == conversation_id, Conversation.user_id == user_id)
+            )
             if conversation:
                 return conversation
         
         # Create new if not found or not provided
         new_conversation = Conversation(user_id=user_id, title="New Conversation")
         db.add(new_conversation)
-        db.commit()
-        db.refresh(new_conversation)
+        await db.commit()
+        await db.refresh(new_conversation)
         return new_conversation
 
-    def add_message(self, db: Session, conversation_id: int, role: str, content: str) -> Message:
+    async def add_message(self, db: AsyncSession, conversation_id: int, role: str, content: str) -> Message:
         message = Message(conversation_id=conversation_id, role=role, content=content)
         db.add(message)
-        db.commit()
-        db.refresh(message)
+        await db.commit()
+        await db.refresh(message)
         return message
 
-    def get_history(self, db: Session, conversation_id: int, limit: int = 10) -> List[Dict[str, str]]:
-        messages = db.query(Message).filter(Message.conversation_id == conversation_id).order_by(Message.created_at.asc()).limit(limit).all()
+    async def add_messages(self, db: AsyncSession, conversation_id: int, messages: List[Dict[str, str]]) -> None:
+        """Saves several messages (e.g. a user/assistant turn) in one commit."""
+        db.add_all([Message(conversation_id=conversation_id, role=m["role"], content=m["content"]) for m in messages])
+        await db.commit()
+
+    async def get_history(self, db: AsyncSession, conversation_id: int, limit: int = 10) -> List[Dict[str, str]]:
+        messages = (await db.scalars(
+            select(Message).where(Message.conversation_id == conversation_id).order_by(Message.created_at.asc()).limit(limit)
+        )).all()
         return [{"role": m.role, "content": m.content} for m in messages]
 
-    def get_user_conversations(self, db: Session, user_id: int) -> List[Dict[str, Any]]:
-        conversations = db.query(Conversation).filter(Conversation.user_id == user_id).order_by(Conversation.updated_at.desc()).all()
+    async def get_user_conversations(self, db: AsyncSession, user_id: int) -> List[Dict[str, Any]]:
+        conversations = (await db.scalars(
+            select(Conversation).where(Conversation.user_id == user_id).order_by(Conversation.updated_at.desc())
+        )).all()
         return [{"id": c.id, "title": c.title, "updated_at": c.updated_at} for c in conversations]
 
 
-    def delete_conversation(self, db: Session, conversation_id: int, user_id: int) -> None:
+    async def delete_conversation(self, db: AsyncSession, conversation_id: int, user_id: int) -> None:
         """Delete a conversation and its messages for a given user."""
         from fastapi import HTTPException
-        conv = db.query(Conversation).filter(Conversation.id == conversation_id, Conversation.user_id == user_id).first()
+        conv = await db.scalar(
+            select(Conversation).where(Conversation.id == conversation_id, Conversation.user_id == user_id)
+        )
         if not conv:
             raise HTTPException(status_code=404, detail="Conversation not found")
         # Delete associated messages
-        db.query(Message).filter(Message.conversation_id == conversation_id).delete()
-        db.delete(conv)
-        db.commit()
+        await db.execute(delete(Message).where(Message.conversation_id == conversation_id))
+        await db.delete(conv)
+        await db.commit()
 
 memory_service = MemoryService()
@@ -1,18 +1,52 @@
+import asyncio
 from typing import List, Dict, Any
-from app.services.pgvector_store import pgvector_store
+from app.core.circuit_breaker import embedding_circuit_breaker
+from app.core.config import settings
+from app.services.vector_store import vector_store
 
 class Retriever:
+    async def _with_fallback(self, vector_call, lexical_call):
+        """
+        Returns (results, degraded). Falls back to lexical (full-text) search, which needs no
+        embedding call, when the embedding circuit is open or the query embedding fails / times out.
+        """
+        if embedding_circuit_breaker.is_open:
+            print("Embedding circuit open; using lexical retrieval")
+        else:
+            try:
+                results = await asyncio.wait_for(vector_call(), timeout=settings.RETRIEVAL_EMBEDDING_TIMEOUT_SECONDS)
+                return results, False
+            except asyncio.TimeoutError:
+                print(f"Vector search timed out after {settings.RETRIEVAL_EMBEDDING_TIMEOUT_SECONDS}s; using lexical retrieval")
+            except Exception as e:
+                print(f"Vector search failed ({e}); using lexical retrieval")
+
+        return await lexical_call(), True
+
+    async def _search(self, user_id: int, query: str, k: int, conversation_id: int = None):
+        return await self._with_fallback(
+            lambda: vector_store.search(user_id=user_id, query=query, top_k=k, conversation_id=conversation_id),
+            lambda: vector_store.search(user_id=user_id, query=query, top_k=k, conversation_id=conversation_id, mode="lexical"),
+        )
+
+    async def search_many(self, user_id: int, queries: List[str], k: int = 5, conversation_id: int = None):
+        """Batched search with the same lexical fallback. Returns (results per query, degraded)."""
+        return await self._with_fallback(
+            lambda: vector_store.search_many(user_id, queries, top_k=k, conversation_id=conversation_id),
+            lambda: vector_store.search_many(user_id, queries, top_k=k, conversation_id=conversation_id, mode="lexical"),
+        )
+
     async def retrieve_context(self, user_id: int, query: str, k: int = 5, conversation_id: int = None) -> Dict[str, Any]:
         """
         Retrieves context and metadata stats.
-        Returns: { 'chunks': [...], 'stats': {...} }
+        Returns: { 'chunks': [...], 'stats': {...}, 'degraded': bool }
+        `degraded` is True when results came from the lexical fallback instead of vector search.
         """
-        # 1. Query Vector DB (pgvector handles embedding generation)
-        results = await pgvector_store.search(user_id=user_id, query=query, top_k=k, conversation_id=conversation_id)
+        # 1. Query Vector DB (the vector store handles embedding generation)
+        results, degraded = await self._search(user_id, query, k, conversation_id)
         
         # 2. Get Stats (Metadata Awareness)
-        from starlette.concurrency import run_in_threadpool
-        stats = await run_in_threadpool(pgvector_store.get_user_file_stats, user_id)
+        stats = await vector_store.get_user_file_stats(user_id)
         
         # 3. Format Results
         formatted_chunks = []
@@ -28,7 +62,8 @@ class Retriever:
                 
         return {
             "chunks": formatted_chunks,
-            "stats": stats
+            "stats": stats,
+            "degraded": degraded
         }
 
 retriever = Retriever()
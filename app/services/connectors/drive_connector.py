@@ -7,6 +7,7 @@ try:
     from pypdf import PdfReader  # Updated package name
 except ImportError:
     from PyPDF2 import PdfReader  # Fallback for older installations
+from app.core.config import settings
 from app.services.connectors.base import BaseConnector
 
 class DriveConnector(BaseConnector):
@@ -47,13 +48,20 @@ class DriveConnector(BaseConnector):
         query = "(mimeType='application/vnd.google-apps.document' or mimeType='application/pdf' or mimeType='image/jpeg' or mimeType='image/png' or mimeType='application/vnd.openxmlformats-officedocument.wordprocessingml.document') and trashed=false"
         
         try:
-            response = service.files().list(
-                q=query,
-                pageSize=10,  # Limit to 10 files per sync for now
-                fields="nextPageToken, files(id, name, mimeType, createdTime, modifiedTime)"
-            ).execute()
-            
-            files = response.get('files', [])
+            # Page through the whole Drive, not just the first page
+            files = []
+            page_token = None
+            while True:
+                response = service.files().list(
+                    q=query,
+                    pageSize=settings.DRIVE_LIST_PAGE_SIZE,
+                    pageToken=page_token,
+                    fields="nextPageToken, files(id, name, mimeType, createdTime, modifiedTime)"
+                ).execute()
+                files.extend(response.get('files', []))
+                page_token = response.get('nextPageToken')
+                if not page_token:
+                    break
             
             for file in files:
                 file_id = file['id']
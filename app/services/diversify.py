@@ -0,0 +1,93 @@
+"""
+Result diversification for retrieval.
+ChunkerService overlaps consecutive chunks by 100 characters, so a plain top-k is often several
+neighbouring chunks of one file repeating each other. These helpers pick a diverse top-k from an
+over-fetched candidate list and stitch neighbouring chunks back together:
+- mmr_select: Maximal Marginal Relevance over candidate embeddings (NumPy), with near-duplicate suppression.
+- merge_adjacent_chunks: results that are consecutive chunk_index values of one file become one passage.
+"""
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+def mmr_select(query_vector: np.ndarray, vectors: np.ndarray, k: int, lambda_mult: float = 0.7, duplicate_threshold: float = 1.0, relevance: Optional[np.ndarray] = None) -> List[int]:
+    """
+    Indices of up to k candidates in selection order.
+    Each step picks argmax(lambda * relevance - (1 - lambda) * max cosine similarity to the picks so far).
+    Candidates with cosine similarity >= duplicate_threshold to a pick are dropped outright.
+    `relevance` defaults to the cosine similarity to the query.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if not len(vectors) or k <= 0:
+        return []
+    vectors = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+    if relevance is None:
+        query = np.asarray(query_vector, dtype=np.float32)
+        relevance = vectors @ (query / max(float(np.linalg.norm(query)), 1e-12))
+    relevance = np.asarray(relevance, dtype=np.float32)
+    similarity = vectors @ vectors.T
+
+    available = np.ones(len(vectors), dtype=bool)
+    max_similarity = np.zeros(len(vectors), dtype=np.float32)
+    selected: List[int] = []
+    while len(selected) < k and available.any():
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity if selected else relevance
+        best = int(np.argmax(np.where(available, scores, -np.inf)))
+        selected.append(best)
+        available[best] = False
+        max_similarity = np.maximum(max_similarity, similarity[best])
+        available &= max_similarity < duplicate_threshold
+    return selected
+
+def join_overlapping(first: str, second: str, min_overlap: int = 20, max_overlap: int = 300) -> str:
+    """Concatenate two consecutive chunks, writing the text they share only once."""
+    for size in range(min(len(first), len(second), max_overlap), min_overlap - 1, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+    return first + "\n" + second
+
+def merge_adjacent_chunks(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Merge results that are neighbouring chunks (same file_id, chunk_index differing by one).
+    A merged passage keeps the position and the best similarity of its members.
+    Results without file_id / chunk_index are passed through.
+    """
+    merged: List[Dict[str, Any]] = []
+    spans: List[Optional[List[int]]] = []  # [first, last] chunk_index per merged entry
+    for result in results:
+        file_id, index = result.get("file_id"), result.get("chunk_index")
+        target = None
+        if file_id is not None and index is not None:
+            for i, entry in enumerate(merged):
+                if entry.get("file_id") == file_id and spans[i] and (index == spans[i][1] + 1 or index == spans[i][0] - 1):
+                    target = i
+                    break
+        if target is None:
+            merged.append(dict(result))
+            spans.append([index, index] if file_id is not None and index is not None else None)
+            continue
+
+        entry, span = merged[target], spans[target]
+        if index == span[1] + 1:
+            entry["content"] = join_overlapping(entry["content"], result["content"])
+            span[1] = index
+        else:
+            entry["content"] = join_overlapping(result["content"], entry["content"])
+            span[0] = index
+        entry["similarity"] = max(entry["similarity"], result["similarity"])
+
+        # The new chunk may close the gap to another passage of the same file
+        for i, other in enumerate(merged):
+            if i != target and other.get("file_id") == file_id and spans[i] and (spans[i][0] == span[1] + 1 or spans[i][1] == span[0] - 1):
+                if spans[i][0] == span[1] + 1:
+                    entry["content"] = join_overlapping(entry["content"], other["content"])
+                    span[1] = spans[i][1]
+                else:
+                    entry["content"] = join_overlapping(other["content"], entry["content"])
+                    span[0] = spans[i][0]
+                entry["similarity"] = max(entry["similarity"], other["similarity"])
+                # Keep the better-ranked of the two positions
+                keep, drop = min(i, target), max(i, target)
+                merged[keep], spans[keep] = entry, span
+                del merged[drop], spans[drop]
+                break
+    return merged
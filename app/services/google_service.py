@@ -2,7 +2,7 @@
 Service for interacting with Google Drive API.
 Handles authentication, file listing, and content retrieval.
 """
-from typing import List, Optional, Any, Union
+from typing import List, Optional, Any, Union, Tuple
 import json
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
@@ -11,6 +11,17 @@ from sqlalchemy.orm import Session
 from app.core.config import settings
 from app.models.user import User
 
+# File types the ingestion pipeline can extract text from
+SUPPORTED_MIME_TYPES = (
+    'application/vnd.google-apps.document',
+    'application/pdf',
+    'image/jpeg',
+    'image/png',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+)
+# Per-file fields requested from files.list / changes.list (incl. change markers, see RAGService.is_unchanged)
+FILE_FIELDS = "id, name, mimeType, createdTime, modifiedTime, md5Checksum, version, trashed"
+
 class GoogleDriveService:
     """
     Service class for Google Drive operations.
@@ -49,30 +60,66 @@ class GoogleDriveService:
         
         return creds
 
-    def list_files(self, user: User, limit: int = 10) -> List[dict]:
+    def _drive(self, user: User):
+        creds = self.get_credentials(user)
+        if not creds:
+            raise Exception("User not authenticated with Google Drive")
+        return build('drive', 'v3', credentials=creds)
+
+    def list_files(self, user: User, limit: Optional[int] = None) -> List[dict]:
         """
-        Lists Google Docs files from the user's Drive.
+        Lists supported files (Docs, PDFs, images, Word) from the user's Drive, following nextPageToken.
 
         Args:
             user (User): The user to list files for.
-            limit (int): Maximum number of files to return.
+            limit (Optional[int]): Maximum number of files to return (None = all).
 
         Returns:
             List[dict]: List of file metadata objects.
         """
-        creds = self.get_credentials(user)
-        if not creds:
-            raise Exception("User not authenticated with Google Drive")
-
-        service = build('drive', 'v3', credentials=creds)
+        service = self._drive(user)
+        query = "(" + " or ".join(f"mimeType='{m}'" for m in SUPPORTED_MIME_TYPES) + ") and trashed=false"
         
-        results = service.files().list(
-            q="(mimeType='application/vnd.google-apps.document' or mimeType='application/pdf' or mimeType='image/jpeg' or mimeType='image/png' or mimeType='application/vnd.openxmlformats-officedocument.wordprocessingml.document') and trashed=false",
-            pageSize=limit,
-            fields="nextPageToken, files(id, name, mimeType, createdTime, modifiedTime)"
-        ).execute()
-        
-        return results.get('files', [])
+        files: List[dict] = []
+        page_token = None
+        while True:
+            page_size = settings.DRIVE_LIST_PAGE_SIZE if limit is None else min(settings.DRIVE_LIST_PAGE_SIZE, limit - len(files))
+            results = service.files().list(
+                q=query,
+                pageSize=page_size,
+                pageToken=page_token,
+                fields=f"nextPageToken, files({FILE_FIELDS})"
+            ).execute()
+            files.extend(results.get('files', []))
+            page_token = results.get('nextPageToken')
+            if not page_token or (limit is not None and len(files) >= limit):
+                return files
+
+    def get_start_page_token(self, user: User) -> str:
+        """Changes API cursor for "now"; list_changes(token) later returns everything changed since."""
+        return self._drive(user).changes().getStartPageToken().execute()['startPageToken']
+
+    def list_changes(self, user: User, page_token: str) -> Tuple[List[dict], str]:
+        """
+        All changes since `page_token`, following nextPageToken.
+
+        Returns:
+            Tuple[List[dict], str]: The changes (fileId, removed, file) and the cursor for the next sync.
+        """
+        service = self._drive(user)
+        changes: List[dict] = []
+        while True:
+            results = service.changes().list(
+                pageToken=page_token,
+                pageSize=settings.DRIVE_LIST_PAGE_SIZE,
+                spaces='drive',
+                includeRemoved=True,
+                fields=f"nextPageToken, newStartPageToken, changes(fileId, removed, file({FILE_FIELDS}))"
+            ).execute()
+            changes.extend(results.get('changes', []))
+            if 'newStartPageToken' in results:
+                return changes, results['newStartPageToken']
+            page_token = results['nextPageToken']
 
     def get_file_content(self, user: User, file_id: str, mime_type: str = 'application/vnd.google-apps.document') -> Any:
         """
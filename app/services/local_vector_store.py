@@ -0,0 +1,463 @@
+"""
+In-process vector store for SQLite / offline mode and single-node deployments.
+Each user's chunks live in LOCAL_VECTOR_STORE_DIR/user_<id>/:
+- vectors.f32: L2-normalized float32 rows, appended on ingest and memory-mapped for search
+- rows.jsonl:  one JSON line per vector (content, source, file_id, conversation_id, metadata)
+- meta.json:   vector dimension
+Search is an exact cosine top-k (one matrix-vector product + argpartition) over the user's rows only;
+lexical and hybrid modes use an in-memory BM25 index built lazily per user.
+Deletes rewrite the user's files without the removed rows.
+"""
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import List, Dict, Any, Optional, Union
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.services.processing.embedding_cache import embedding_cache
+from app.services.processing.embedding_service import EmbeddingBackend
+from app.services.vector_store_base import VectorStore
+
+# Keeps emails, file names and identifiers like PROJ-123 as single tokens
+_TOKEN_RE = re.compile(r"[\w@.\-]+")
+
+def _tokenize(text: str) -> List[str]:
+    return [t for t in (token.strip(".-") for token in _TOKEN_RE.findall(text.lower())) if t]
+
+class _BM25:
+    """Okapi BM25 over a fixed list of documents, with NumPy posting lists."""
+
+    def __init__(self, documents: List[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.size = len(documents)
+        postings: Dict[str, tuple] = {}
+        lengths = []
+        for i, document in enumerate(documents):
+            counts = Counter(_tokenize(document))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                docs, tfs = postings.setdefault(term, ([], []))
+                docs.append(i)
+                tfs.append(tf)
+        self.lengths = np.asarray(lengths, dtype=np.float32)
+        self.avg_length = float(self.lengths.mean()) if self.size else 0.0
+        self.postings = {
+            term: (np.asarray(docs, dtype=np.int64), np.asarray(tfs, dtype=np.float32))
+            for term, (docs, tfs) in postings.items()
+        }
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in set(_tokenize(query)):
+            if term not in self.postings:
+                continue
+            docs, tfs = self.postings[term]
+            idf = math.log(1 + (self.size - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[docs] / max(self.avg_length, 1e-9))
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+        return scores
+
+def _top(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first (O(n) selection, then sort only those)."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+class _UserIndex:
+    """Loaded view of one user's store: memory-mapped vectors plus row metadata."""
+    __slots__ = ("vectors", "rows", "conversation_ids", "file_ids", "_bm25")
+
+    def __init__(self, vectors: np.ndarray, rows: List[Dict[str, Any]]):
+        self.vectors = vectors
+        self.rows = rows
+        # -1 marks global (not conversation-scoped) rows
+        self.conversation_ids = np.array(
+            [r["conversation_id"] if r.get("conversation_id") is not None else -1 for r in rows], dtype=np.int64
+        )
+        self.file_ids = {r["file_id"] for r in rows if r.get("file_id") is not None}
+        self._bm25 = None
+
+    def bm25(self) -> _BM25:
+        """Built on first lexical query; a write reloads the index and drops it."""
+        if self._bm25 is None:
+            self._bm25 = _BM25([r["content"] for r in self.rows])
+        return self._bm25
+
+class LocalVectorStore(VectorStore):
+    """
+    NumPy-backed VectorStore. Same API and result shape as PgVectorStore; no database required.
+    """
+
+    def __init__(self, backend: EmbeddingBackend = None, root: Optional[str] = None):
+        super().__init__(backend)
+        self.root = root or settings.LOCAL_VECTOR_STORE_DIR
+        self._indexes: Dict[int, _UserIndex] = {}
+        self._locks: Dict[int, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self.search_plans = {"vector": 0, "hybrid": 0, "lexical": 0}
+        # Per-user corpus version for the search result cache; bumped on every write
+        self._versions: Dict[int, int] = {}
+
+    # --- Files -----------------------------------------------------------------
+
+    def _paths(self, user_id: int) -> Dict[str, str]:
+        user_dir = os.path.join(self.root, f"user_{int(user_id)}")
+        return {
+            "dir": user_dir,
+            "vectors": os.path.join(user_dir, "vectors.f32"),
+            "rows": os.path.join(user_dir, "rows.jsonl"),
+            "meta": os.path.join(user_dir, "meta.json"),
+        }
+
+    def _lock(self, user_id: int) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(user_id, threading.Lock())
+
+    def _load(self, user_id: int) -> _UserIndex:
+        """Caller holds the user's lock."""
+        index = self._indexes.get(user_id)
+        if index is not None:
+            return index
+
+        paths = self._paths(user_id)
+        rows: List[Dict[str, Any]] = []
+        vectors = np.empty((0, 0), dtype=np.float32)
+        if os.path.exists(paths["meta"]) and os.path.exists(paths["rows"]):
+            with open(paths["meta"], "r") as f:
+                dim = json.load(f)["dim"]
+            with open(paths["rows"], "r", encoding="utf-8") as f:
+                rows = [json.loads(line) for line in f if line.strip()]
+            # An interrupted append can leave one file longer than the other
+            count = min(len(rows), os.path.getsize(paths["vectors"]) // (4 * dim))
+            rows = rows[:count]
+            if count:
+                vectors = np.memmap(paths["vectors"], dtype=np.float32, mode="r", shape=(count, dim))
+
+        index = _UserIndex(vectors, rows)
+        self._indexes[user_id] = index
+        return index
+
+    def _bump_version(self, user_id: int) -> None:
+        """Caller holds the user's lock."""
+        self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return (vectors / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+    def _append_sync(self, user_id: int, rows: List[Dict[str, Any]], vectors: np.ndarray) -> None:
+        paths = self._paths(user_id)
+        with self._lock(user_id):
+            os.makedirs(paths["dir"], exist_ok=True)
+            if os.path.exists(paths["meta"]):
+                with open(paths["meta"], "r") as f:
+                    dim = json.load(f)["dim"]
+                if vectors.shape[1] != dim:
+                    raise ValueError(f"Vector dimension {vectors.shape[1]} does not match store dimension {dim}")
+            else:
+                with open(paths["meta"], "w") as f:
+                    json.dump({"dim": int(vectors.shape[1])}, f)
+            with open(paths["vectors"], "ab") as f:
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+            with open(paths["rows"], "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(row) + "\n" for row in rows)
+            # Re-mapped on next read
+            self._indexes.pop(user_id, None)
+            self._bump_version(user_id)
+
+    def _rewrite_locked(self, user_id: int, rows: List[Dict[str, Any]], vectors: Optional[np.ndarray]) -> None:
+        """Replace the user's files with `rows` / `vectors`. Caller holds the user's lock."""
+        paths = self._paths(user_id)
+        os.makedirs(paths["dir"], exist_ok=True)
+        if vectors is not None and len(vectors) and not os.path.exists(paths["meta"]):
+            with open(paths["meta"], "w") as f:
+                json.dump({"dim": int(vectors.shape[1])}, f)
+        self._indexes.pop(user_id, None)
+
+        # Write new files next to the old ones, then swap atomically
+        with open(paths["vectors"] + ".tmp", "wb") as f:
+            if vectors is not None and len(vectors):
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        with open(paths["rows"] + ".tmp", "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(row) + "\n" for row in rows)
+        os.replace(paths["vectors"] + ".tmp", paths["vectors"])
+        os.replace(paths["rows"] + ".tmp", paths["rows"])
+        self._bump_version(user_id)
+
+    def _delete_sync(self, user_id: int, should_delete) -> int:
+        """Rewrite the user's files without rows matching `should_delete(row)`. Returns rows removed."""
+        with self._lock(user_id):
+            index = self._load(user_id)
+            keep = np.array([not should_delete(row) for row in index.rows], dtype=bool)
+            removed = int(len(keep) - keep.sum())
+            if not removed:
+                return 0
+            kept_vectors = np.asarray(index.vectors[keep]) if keep.any() else None
+            kept_rows = [row for row, k in zip(index.rows, keep) if k]
+            self._rewrite_locked(user_id, kept_rows, kept_vectors)
+            return removed
+
+    @staticmethod
+    def _row_hash(row: Dict[str, Any]) -> str:
+        # Rows written before chunk hashes were stored are hashed on the fly
+        return row.get("chunk_hash") or embedding_cache.content_hash(row["content"])
+
+    def _document_hashes_sync(self, user_id: int, document_id: int) -> set:
+        with self._lock(user_id):
+            index = self._load(user_id)
+            return {self._row_hash(row) for row in index.rows if row.get("document_id") == document_id}
+
+    def _reindex_sync(self, user_id: int, document_id: int, wanted: Dict[str, tuple], vectors: Dict[str, List[float]]) -> Dict[str, int]:
+        """Keep the document's rows whose hash is still wanted, drop the rest, append the new chunks."""
+        with self._lock(user_id):
+            index = self._load(user_id)
+            keep = np.ones(len(index.rows), dtype=bool)
+            rows: List[Dict[str, Any]] = []
+            kept_hashes = set()
+            refreshed = 0
+            for i, row in enumerate(index.rows):
+                if row.get("document_id") != document_id:
+                    rows.append(row)
+                    continue
+                chunk_hash = self._row_hash(row)
+                if chunk_hash not in wanted or chunk_hash in kept_hashes:
+                    keep[i] = False
+                    continue
+                kept_hashes.add(chunk_hash)
+                # New chunk_index, or file name / URL after a rename: take the new metadata wholesale
+                fresh = self._make_row(document_id, row["content"], wanted[chunk_hash][1])
+                if row.get("metadata") != fresh["metadata"] or row.get("source_url") != fresh["source_url"]:
+                    row = {**row, **fresh}
+                    refreshed += 1
+                rows.append(row)
+
+            added = [h for h in wanted if h not in kept_hashes and h in vectors]
+            removed = int(len(keep) - keep.sum())
+            if added or removed or refreshed:
+                parts = [np.asarray(index.vectors[keep])] if keep.any() else []
+                if added:
+                    parts.append(self._normalize(np.asarray([vectors[h] for h in added], dtype=np.float32)))
+                    rows.extend(self._make_row(document_id, wanted[h][0], wanted[h][1]) for h in added)
+                self._rewrite_locked(user_id, rows, np.concatenate(parts) if parts else None)
+            return {"added": len(added), "removed": removed, "kept": len(kept_hashes)}
+
+    # --- VectorStore API ---------------------------------------------------------
+
+    async def index_document(self, user_id: int, document_id: int, content: str, source_metadata: Dict[str, Any], embedding: Optional[List[float]] = None) -> None:
+        await self.index_chunks(
+            user_id, document_id, [content],
+            vectors=[embedding] if embedding is not None else None,
+            metadata=[source_metadata]
+        )
+
+    async def index_chunks(self, user_id: int, document_id: int, chunks: List[str], vectors: Optional[List[List[float]]] = None, metadata: Union[Dict[str, Any], List[Dict[str, Any]]] = None) -> int:
+        if not chunks:
+            return 0
+        try:
+            if vectors is None:
+                vectors = await self.embed_many(chunks)
+            if len(vectors) != len(chunks):
+                raise ValueError(f"Got {len(vectors)} vectors for {len(chunks)} chunks")
+
+            metadatas = self._chunk_metadatas(chunks, metadata)
+            rows = [self._make_row(document_id, chunk, meta) for chunk, meta in zip(chunks, metadatas)]
+
+            started = time.perf_counter()
+            matrix = self._normalize(np.asarray(vectors, dtype=np.float32))
+            await run_in_threadpool(self._append_sync, user_id, rows, matrix)
+            elapsed = time.perf_counter() - started
+
+            self.rows_indexed += len(rows)
+            self.index_seconds += elapsed
+            print(f"Indexed {len(rows)} chunks for user {user_id} (document {document_id}) in {elapsed * 1000:.0f} ms (local store)")
+            return len(rows)
+        except Exception as e:
+            print(f"Error bulk indexing document {document_id}: {e}")
+            raise
+
+    @classmethod
+    def _make_row(cls, document_id: int, chunk: str, meta: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "document_id": document_id,
+            "content": chunk,
+            "chunk_hash": embedding_cache.content_hash(chunk),
+            "source_app": meta.get("source_app"),
+            "source_url": meta.get("source_url"),
+            "file_id": cls._as_file_id(meta.get("file_id")),
+            "conversation_id": cls._as_conversation_id(meta.get("conversation_id")),
+            "metadata": meta,
+        }
+
+    async def reindex_document(self, user_id: int, document_id: int, chunks: List[str], metadata: Union[Dict[str, Any], List[Dict[str, Any]]] = None) -> Dict[str, int]:
+        try:
+            wanted = self._unique_chunks(chunks, self._chunk_metadatas(chunks, metadata))
+            stored = await run_in_threadpool(self._document_hashes_sync, user_id, document_id)
+            missing = [h for h in wanted if h not in stored]
+            vectors = dict(zip(missing, await self.embed_many([wanted[h][0] for h in missing]))) if missing else {}
+
+            started = time.perf_counter()
+            counts = await run_in_threadpool(self._reindex_sync, user_id, document_id, wanted, vectors)
+            elapsed = time.perf_counter() - started
+
+            self.rows_indexed += counts["added"]
+            self.index_seconds += elapsed
+            self.chunks_reused += counts["kept"]
+            print(f"Re-indexed document {document_id} for user {user_id}: {counts['added']} added, {counts['removed']} removed, {counts['kept']} unchanged (local store)")
+            return counts
+        except Exception as e:
+            print(f"Error re-indexing document {document_id}: {e}")
+            raise
+
+    def _search_sync(self, user_id: int, query: str, query_embedding: Optional[np.ndarray], top_k: int, conversation_id: Optional[int], mode: str, diversify: Optional[bool]) -> List[Dict[str, Any]]:
+        with self._lock(user_id):
+            index = self._load(user_id)
+            bm25 = index.bm25() if mode != "vector" and index.rows else None
+        if not index.rows or top_k <= 0:
+            return []
+
+        if conversation_id:
+            candidates = np.flatnonzero((index.conversation_ids == -1) | (index.conversation_ids == int(conversation_id)))
+            if not len(candidates):
+                return []
+        else:
+            candidates = np.arange(len(index.rows))
+
+        vector_scores = lexical_scores = None
+        if mode != "lexical":
+            vectors = index.vectors if len(candidates) == len(index.rows) else index.vectors[candidates]
+            vector_scores = vectors @ query_embedding
+        if mode != "vector":
+            lexical_scores = bm25.scores(query)[candidates]
+
+        fetch_k = self._fetch_k(top_k, diversify)
+        relevance = None
+        if mode == "vector":
+            order, similarity = _top(vector_scores, fetch_k), vector_scores
+        elif mode == "lexical":
+            order = _top(lexical_scores, fetch_k)
+            order, similarity = order[lexical_scores[order] > 0], lexical_scores
+        else:
+            # Reciprocal rank fusion of the vector and BM25 candidate lists
+            pool = max(top_k, settings.HYBRID_CANDIDATES)
+            fused = np.zeros(len(candidates), dtype=np.float64)
+            vector_top = _top(vector_scores, pool)
+            fused[vector_top] += 1.0 / (settings.HYBRID_RRF_K + np.arange(1, len(vector_top) + 1))
+            lexical_top = _top(lexical_scores, pool)
+            lexical_top = lexical_top[lexical_scores[lexical_top] > 0]
+            fused[lexical_top] += 1.0 / (settings.HYBRID_RRF_K + np.arange(1, len(lexical_top) + 1))
+            order, similarity = _top(fused, fetch_k), vector_scores
+            relevance = fused[order] / max(float(fused[order].max()), 1e-12) if len(order) else None
+
+        results = []
+        for i in order:
+            row = index.rows[candidates[i]]
+            results.append({
+                "content": row["content"],
+                "source_app": row["source_app"],
+                "source_url": row["source_url"],
+                "similarity": float(similarity[i]),
+                "file_id": row.get("file_id"),
+                "chunk_index": (row.get("metadata") or {}).get("chunk_index"),
+            })
+        # Lexical mode has no query vector, so it is only merged, not re-ranked
+        vectors = np.asarray(index.vectors[candidates[order]]) if mode != "lexical" else None
+        return self._diversify(results, top_k, diversify, query_embedding, vectors, relevance)
+
+    async def search(self, user_id: int, query: str, top_k: int = 5, conversation_id: int = None, mode: Optional[str] = None, diversify: Optional[bool] = None, **kwargs) -> List[Dict[str, Any]]:
+        """
+        Exact search over the user's rows (accuracy / filter_mode do not apply).
+        `mode`: "vector" (cosine), "lexical" (BM25, no embedding call) or "hybrid" (reciprocal rank fusion).
+        `diversify` (default SEARCH_DIVERSIFY): MMR over SEARCH_FETCH_K candidates plus merging of neighbouring chunks.
+        Supports filtering by conversation_id (scoped search).
+        """
+        try:
+            search_mode = (mode or settings.SEARCH_MODE).lower()
+            if search_mode not in ("vector", "hybrid", "lexical"):
+                raise ValueError(f"Unknown search mode '{search_mode}' (expected 'vector', 'hybrid' or 'lexical')")
+            diversify = settings.SEARCH_DIVERSIFY if diversify is None else diversify
+            query_embedding = None
+            if search_mode != "lexical":
+                query_embedding = self._normalize(np.asarray(await self._embed_query(query), dtype=np.float32))
+
+            cache_key = self._result_cache_key(
+                user_id,
+                query_embedding if query_embedding is not None else self._normalize_query(query),
+                top_k, conversation_id, self._versions.get(user_id, 0), (search_mode, diversify),
+            )
+            cached = self.search_result_cache.get(cache_key)
+            if cached is not None:
+                return [dict(r) for r in cached]
+
+            results = await run_in_threadpool(
+                self._search_sync, user_id, query, query_embedding, top_k, conversation_id, search_mode, diversify
+            )
+            self.search_plans[search_mode] += 1
+            self.search_result_cache.set(cache_key, results)
+            return [dict(r) for r in results]
+        except Exception as e:
+            print(f"Error searching documents: {e}")
+            raise
+
+    async def delete_document_by_file_id(self, user_id: int, file_id: str) -> None:
+        try:
+            await run_in_threadpool(self._delete_sync, user_id, lambda row: row.get("file_id") == file_id)
+            print(f"Deleted document {file_id} for user {user_id}")
+        except Exception as e:
+            print(f"Error deleting document {file_id}: {e}")
+            raise
+
+    async def delete_user_documents(self, user_id: int, source_app: str = None) -> None:
+        try:
+            await run_in_threadpool(
+                self._delete_sync, user_id,
+                lambda row: source_app is None or row.get("source_app") == source_app
+            )
+            print(f"Deleted documents for user {user_id}")
+        except Exception as e:
+            print(f"Error deleting documents: {e}")
+            raise
+
+    def _file_stats_sync(self, user_id: int) -> Dict[str, Any]:
+        with self._lock(user_id):
+            index = self._load(user_id)
+        # Most recently indexed files first, capped like the pgvector store
+        names: Dict[str, str] = {}
+        for row in reversed(index.rows):
+            if row.get("file_id") is not None and row["file_id"] not in names:
+                names[row["file_id"]] = row["metadata"].get("file_name") or "Untitled"
+        listed = list(names.values())[:settings.KB_STATS_MAX_FILE_NAMES]
+        file_names = ", ".join(listed)
+        if len(names) > len(listed):
+            file_names += f" (+{len(names) - len(listed)} more)"
+        return {
+            "file_count": len(names),
+            "file_names": file_names if listed else "(No files found)",
+            "total_chunks": len(index.rows)
+        }
+
+    async def get_user_file_stats(self, user_id: int) -> Dict[str, Any]:
+        try:
+            return await run_in_threadpool(self._file_stats_sync, user_id)
+        except Exception as e:
+            print(f"Error getting file stats: {e}")
+            return {"file_count": 0, "file_names": "", "total_chunks": 0}
+
+    def _has_document_sync(self, user_id: int, file_id: str) -> bool:
+        with self._lock(user_id):
+            return file_id in self._load(user_id).file_ids
+
+    async def has_document(self, user_id: int, file_id: str) -> bool:
+        try:
+            return await run_in_threadpool(self._has_document_sync, user_id, file_id)
+        except Exception as e:
+            print(f"Error checking document existence: {e}")
+            return False
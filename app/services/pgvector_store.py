@@ -1,270 +1,889 @@
-from typing import List, Dict, Any
-from sqlalchemy.orm import Session
+from typing import List, Dict, Any, Optional, Tuple, Union
 from sqlalchemy import text
-from app.db.session import engine
-import httpx
+from app.db.session import async_engine
+from app.db.vector_codec import to_pgvector, parse_vector
 import json
+import time
+import numpy as np
 from app.core.config import settings
+from app.core.cache import TTLLRUCache
+from app.services.processing.embedding_cache import embedding_cache
+from app.services.processing.embedding_service import EmbeddingBackend
+from app.services.vector_store_base import VectorStore
 
-class PgVectorStore:
+# Any-term match over the query's words (plainto_tsquery would AND them, so natural-language
+# questions rarely match). ts_rank_cd then ranks chunks covering more of the query first;
+# emails, URLs and file names stay single tokens under the 'simple' parser
+LEXICAL_TSQUERY = "CAST(replace(plainto_tsquery('simple', :query_text)::text, ' & ', ' | ') AS tsquery)"
+# Upper bounds pgvector accepts for the per-query effort GUCs (set_config raises above them)
+SEARCH_EFFORT_MAX = {"hnsw.ef_search": 1000, "ivfflat.probes": 32768}
+
+class PgVectorStore(VectorStore):
     """
     Service for storing and retrieving document embeddings using Supabase pgvector.
     Replaces ChromaDB for persistent vector storage.
     Now Async-First for scalability.
+    Every statement filters on `user_id = :user_id`, so on a hash-partitioned table
+    (migrations/008) the planner touches a single partition; keep it that way.
     """
     
-    def __init__(self):
-        self.hf_api_key = settings.HUGGINGFACE_API_KEY
-        if not self.hf_api_key:
-            print("WARNING: HUGGINGFACE_API_KEY is missing via settings!")
-        # Using BAAI/bge-small-en-v1.5 (384 dimensions) - High performance & free
-        self.embedding_model = "BAAI/bge-small-en-v1.5"
-    
-    async def _generate_embedding(self, text: str, instruction: str = "") -> List[float]:
-        """Generate embedding vector for text using Hugging Face Inference API (Async)"""
-        headers = {"Authorization": f"Bearer {self.hf_api_key}"}
-        # Correct URL for the new HF Inference Router
-        api_url = f"https://router.huggingface.co/hf-inference/models/{self.embedding_model}"
-        
-        # Prepend instruction if provided (Critical for BGE models on query side)
-        input_text = f"{instruction}{text}"
-        
-        # Async HTTP Client with backoff
-        max_retries = 3
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            for attempt in range(max_retries):
-                try:
-                    response = await client.post(api_url, headers=headers, json={"inputs": input_text})
-                    
-                    if response.status_code in [500, 503]:
-                        import asyncio
-                        wait_time = 2 ** attempt
-                        print(f"HF Error ({response.status_code}), retrying in {wait_time}s...")
-                        await asyncio.sleep(wait_time)
-                        continue
-                        
-                    if response.status_code != 200:
-                        print(f"HF API Error: {response.status_code} - {response.text}")
-                        response.raise_for_status()
-                    
-                    break
-                except httpx.TimeoutException:
-                     import asyncio
-                     print(f"HF Timeout, retrying...")
-                     await asyncio.sleep(2 ** attempt)
-                     continue
-            else:
-                 raise Exception(f"Failed to generate embedding after {max_retries} attempts")
-        
-        response.raise_for_status()
-        embeddings = response.json()
-        
-        # Handle different response formats
-        if isinstance(embeddings, list):
-            if len(embeddings) == 0:
-                return []
-            if isinstance(embeddings[0], float):
-                return embeddings
-            if isinstance(embeddings[0], list):
-                if isinstance(embeddings[0][0], float):
-                    return embeddings[0]
-                return [sum(col) / len(embeddings) for col in zip(*embeddings)]
-                
-        return embeddings
-
-    def _execute_sync_db(self, params: tuple):
-        """Helper to run DB ops in threadpool. Params: (func, kwargs)"""
-        func, kwargs = params
-        with engine.connect() as conn:
-            return func(conn, **kwargs)
+    def __init__(self, backend: EmbeddingBackend = None):
+        super().__init__(backend)
+        # Filtered-row counts per (user, conversation, corpus_version) used to choose exact vs ANN search
+        self.candidate_count_cache = TTLLRUCache(max_size=4096, ttl_seconds=settings.VECTOR_CANDIDATE_COUNT_TTL_SECONDS)
+        self.search_plans = {"exact": 0, "ann": 0, "ann_requery": 0, "ann_fallback_exact": 0, "hybrid": 0, "lexical": 0, "batch": 0}
+        # get_user_file_stats runs on every chat message; keyed on (user, corpus_version)
+        self.kb_stats_cache = TTLLRUCache(max_size=4096, ttl_seconds=settings.KB_STATS_CACHE_TTL_SECONDS)
     
-    async def index_document(self, user_id: int, document_id: int, content: str, source_metadata: Dict[str, Any]) -> None:
+    async def index_document(self, user_id: int, document_id: int, content: str, source_metadata: Dict[str, Any], embedding: Optional[List[float]] = None) -> None:
         """
         Index a document chunk by generating its embedding and storing in pgvector.
+        Pass a precomputed `embedding` (e.g. from embed_many) to skip the HF call.
         """
         try:
-            # 1. Async HF Call
-            embedding = await self._generate_embedding(content)
+            # 1. Async HF Call (unless the caller already batched it)
+            if embedding is None:
+                embedding = await self._generate_embedding(content)
             
-            # 2. Sync DB Call (Offload to thread)
-            from starlette.concurrency import run_in_threadpool
-            
-            def db_op(conn, **kwargs):
-                conn.execute(
+            # 2. Async DB Call
+            async with async_engine.begin() as conn:
+                await conn.execute(
                     text("""
                         INSERT INTO document_embeddings 
-                        (user_id, document_id, content, embedding, source_app, source_url, metadata)
-                        VALUES (:user_id, :document_id, :content, CAST(:embedding AS vector), :source_app, :source_url, :metadata)
+                        (user_id, document_id, content, chunk_hash, embedding, source_app, source_url, file_id, conversation_id, metadata)
+                        VALUES (:user_id, :document_id, :content, :chunk_hash, CAST(:embedding AS vector), :source_app, :source_url, :file_id, :conversation_id, :metadata)
                     """),
-                    kwargs
+                    {
+                        "user_id": user_id,
+                        "document_id": document_id,
+                        "content": content,
+                        "chunk_hash": embedding_cache.content_hash(content),
+                        "embedding": to_pgvector(embedding),
+                        "source_app": source_metadata.get("source_app"),
+                        "source_url": source_metadata.get("source_url"),
+                        "file_id": self._as_file_id(source_metadata.get("file_id")),
+                        "conversation_id": self._as_conversation_id(source_metadata.get("conversation_id")),
+                        "metadata": json.dumps(source_metadata)
+                    }
                 )
-                conn.commit()
-            
-            await run_in_threadpool(
-                lambda: self._execute_sync_db((db_op, {
-                    "user_id": user_id,
-                    "document_id": document_id,
-                    "content": content,
-                    "embedding": str(embedding),
-                    "source_app": source_metadata.get("source_app"),
-                    "source_url": source_metadata.get("source_url"),
-                    "metadata": json.dumps(source_metadata)
-                }))
-            )
+                await self._record_indexed(conn, user_id, [source_metadata])
             print(f"Indexed document for user {user_id} from {source_metadata.get('source_app')}")
         except Exception as e:
             print(f"Error indexing document: {e}")
             raise
     
-    async def search(self, user_id: int, query: str, top_k: int = 5, conversation_id: int = None) -> List[Dict[str, Any]]:
+    async def index_chunks(self, user_id: int, document_id: int, chunks: List[str], vectors: Optional[List[List[float]]] = None, metadata: Union[Dict[str, Any], List[Dict[str, Any]]] = None) -> int:
         """
-        Search for documents similar to the query using vector similarity.
-        Supports filtering by conversation_id (scoped search).
+        Bulk-index all chunks of a document in a single transaction using multi-row INSERTs.
+        `metadata` is either one dict shared by all chunks (chunk_index is added per chunk)
+        or a list with one dict per chunk. Embeddings are generated in batches if `vectors` is None.
+        Returns the number of rows written.
         """
+        if not chunks:
+            return 0
         try:
-            # Generate query embedding
-            instruction = "Represent this sentence for searching relevant passages: "
-            query_embedding = await self._generate_embedding(query, instruction)
+            if vectors is None:
+                vectors = await self.embed_many(chunks)
+            if len(vectors) != len(chunks):
+                raise ValueError(f"Got {len(vectors)} vectors for {len(chunks)} chunks")
             
-            # Search using cosine similarity
-            # Logic: (user_id match) AND (conv_id match OR conv_id is null/global)
-            filter_clause = "user_id = :user_id"
-            params = {
-                "user_id": user_id,
-                "query_embedding": str(query_embedding),
-                "top_k": top_k
-            }
+            metadatas = self._chunk_metadatas(chunks, metadata)
+            rows = [self._make_row(chunk, vector, meta) for chunk, vector, meta in zip(chunks, vectors, metadatas)]
             
-            if conversation_id:
-                filter_clause += " AND (metadata->>'conversation_id' IS NULL OR metadata->>'conversation_id' = :conv_id)"
-                params["conv_id"] = str(conversation_id)
-
-            from starlette.concurrency import run_in_threadpool
+            started = time.perf_counter()
+            # One transaction for the whole document
+            async with async_engine.begin() as conn:
+                await self._insert_rows(conn, user_id, document_id, rows)
+                await self._record_indexed(conn, user_id, metadatas)
+            elapsed = time.perf_counter() - started
             
-            def db_search(conn, **kwargs):
-                return conn.execute(
-                    text(f"""
+            self.rows_indexed += len(rows)
+            self.index_seconds += elapsed
+            rate = len(rows) / elapsed if elapsed > 0 else float("inf")
+            print(f"Indexed {len(rows)} chunks for user {user_id} (document {document_id}) in {elapsed * 1000:.0f} ms ({rate:.0f} rows/s)")
+            return len(rows)
+        except Exception as e:
+            print(f"Error bulk indexing document {document_id}: {e}")
+            raise
+
+    @classmethod
+    def _make_row(cls, chunk: str, vector: List[float], meta: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "content": chunk,
+            "chunk_hash": embedding_cache.content_hash(chunk),
+            "embedding": to_pgvector(vector),
+            "source_app": meta.get("source_app"),
+            "source_url": meta.get("source_url"),
+            "file_id": cls._as_file_id(meta.get("file_id")),
+            "conversation_id": cls._as_conversation_id(meta.get("conversation_id")),
+            "metadata": json.dumps(meta)
+        }
+
+    async def _insert_rows(self, conn, user_id: int, document_id: int, rows: List[Dict[str, Any]]) -> None:
+        """Multi-row INSERTs of up to VECTOR_INSERT_BATCH_ROWS rows each (caller owns the transaction)."""
+        batch_rows = max(1, settings.VECTOR_INSERT_BATCH_ROWS)
+        for start in range(0, len(rows), batch_rows):
+            batch = rows[start:start + batch_rows]
+            params = {"user_id": user_id, "document_id": document_id}
+            values = []
+            for i, row in enumerate(batch):
+                values.append(
+                    f"(:user_id, :document_id, :content_{i}, :chunk_hash_{i}, CAST(:embedding_{i} AS vector), "
+                    f":source_app_{i}, :source_url_{i}, :file_id_{i}, :conversation_id_{i}, :metadata_{i})"
+                )
+                for key, value in row.items():
+                    params[f"{key}_{i}"] = value
+            await conn.execute(
+                text(f"""
+                    INSERT INTO document_embeddings 
+                    (user_id, document_id, content, chunk_hash, embedding, source_app, source_url, file_id, conversation_id, metadata)
+                    VALUES {", ".join(values)}
+                """),
+                params
+            )
+
+    async def _stored_chunks(self, conn, user_id: int, document_id: int) -> List[Any]:
+        """(id, chunk_hash, chunk_index, file_name, source_url) of a document's stored chunks, oldest first."""
+        return (await conn.execute(
+            text("""
+                SELECT 
+                    id,
+                    COALESCE(chunk_hash, encode(sha256(convert_to(content, 'UTF8')), 'hex')),
+                    metadata->>'chunk_index',
+                    metadata->>'file_name',
+                    source_url
+                FROM document_embeddings
+                WHERE user_id = :user_id AND document_id = :document_id
+                ORDER BY id
+            """),
+            {"user_id": user_id, "document_id": document_id}
+        )).fetchall()
+
+    async def reindex_document(self, user_id: int, document_id: int, chunks: List[str], metadata: Union[Dict[str, Any], List[Dict[str, Any]]] = None) -> Dict[str, int]:
+        """
+        Delta re-index of a changed document. Chunks are matched on content hash (chunk_hash,
+        migrations/012): new chunks are embedded and inserted, vanished ones deleted and kept ones
+        given the new metadata (chunk_index, file name / URL after a rename), all in one transaction. Embedding happens before the
+        transaction, so a one-paragraph edit costs a handful of embeddings and a short write.
+        """
+        try:
+            metadatas = self._chunk_metadatas(chunks, metadata)
+            wanted = self._unique_chunks(chunks, metadatas)
+            async with async_engine.connect() as conn:
+                stored = {row[1] for row in await self._stored_chunks(conn, user_id, document_id)}
+            missing = [h for h in wanted if h not in stored]
+            vectors = dict(zip(missing, await self.embed_many([wanted[h][0] for h in missing]))) if missing else {}
+
+            started = time.perf_counter()
+            async with async_engine.begin() as conn:
+                # Serialize re-indexes of one document, then diff against what is stored now
+                await conn.execute(
+                    text("SELECT pg_advisory_xact_lock(CAST(:user_id AS integer), CAST(:document_id AS integer))"),
+                    {"user_id": user_id, "document_id": document_id}
+                )
+                kept: Dict[str, Tuple[int, Any, Any, Any]] = {}
+                removed_ids: List[int] = []
+                for row_id, chunk_hash, *stored_fields in await self._stored_chunks(conn, user_id, document_id):
+                    if chunk_hash in wanted and chunk_hash not in kept:
+                        kept[chunk_hash] = (row_id, *stored_fields)
+                    else:
+                        removed_ids.append(row_id)
+                added = [h for h in wanted if h not in kept]
+                # Only if another writer changed the document since the first read
+                late = [h for h in added if h not in vectors]
+                if late:
+                    vectors.update(zip(late, await self.embed_many([wanted[h][0] for h in late])))
+                # Kept rows whose position, file name or URL changed get the new metadata wholesale
+                refreshed = [
+                    (row_id, wanted[h][1])
+                    for h, (row_id, chunk_index, file_name, source_url) in kept.items()
+                    if (
+                        (wanted[h][1].get("chunk_index") is not None and str(wanted[h][1]["chunk_index"]) != chunk_index)
+                        or wanted[h][1].get("file_name") != file_name
+                        or wanted[h][1].get("source_url") != source_url
+                    )
+                ]
+
+                if removed_ids:
+                    await conn.execute(
+                        text("DELETE FROM document_embeddings WHERE user_id = :user_id AND id = ANY(CAST(:ids AS bigint[]))"),
+                        {"user_id": user_id, "ids": removed_ids}
+                    )
+                if refreshed:
+                    await conn.execute(
+                        text("""
+                            UPDATE document_embeddings d
+                            SET metadata = CAST(t.metadata AS jsonb), source_url = t.source_url, updated_at = NOW()
+                            FROM unnest(CAST(:ids AS bigint[]), CAST(:metadatas AS text[]), CAST(:source_urls AS text[]))
+                                AS t(id, metadata, source_url)
+                            WHERE d.user_id = :user_id AND d.id = t.id
+                        """),
+                        {
+                            "user_id": user_id,
+                            "ids": [r[0] for r in refreshed],
+                            "metadatas": [json.dumps(r[1]) for r in refreshed],
+                            "source_urls": [r[1].get("source_url") for r in refreshed],
+                        }
+                    )
+                if added:
+                    rows = [self._make_row(wanted[h][0], vectors[h], wanted[h][1]) for h in added]
+                    await self._insert_rows(conn, user_id, document_id, rows)
+                if added or removed_ids or refreshed:
+                    shared = metadata if isinstance(metadata, dict) else (metadatas[0] if metadatas else {})
+                    file_id = self._as_file_id(shared.get("file_id"))
+                    await self._record_reindexed(conn, user_id, file_id, [wanted[h][1] for h in added], len(removed_ids), shared.get("file_name"))
+            elapsed = time.perf_counter() - started
+
+            counts = {"added": len(added), "removed": len(removed_ids), "kept": len(kept)}
+            self.rows_indexed += counts["added"]
+            self.index_seconds += elapsed
+            self.chunks_reused += counts["kept"]
+            print(f"Re-indexed document {document_id} for user {user_id}: {counts['added']} added, {counts['removed']} removed, {counts['kept']} unchanged in {elapsed * 1000:.0f} ms")
+            return counts
+        except Exception as e:
+            print(f"Error re-indexing document {document_id}: {e}")
+            raise
+
+    async def _record_reindexed(self, conn, user_id: int, file_id: Optional[str], added: List[Dict[str, Any]], removed: int, file_name: Optional[str] = None) -> None:
+        """user_kb_files / user_kb_stats for a delta re-index (also bumps the corpus version)."""
+        if file_id is not None and file_name:
+            # Renamed file with unchanged chunks
+            await conn.execute(
+                text("""
+                    UPDATE user_kb_files SET file_name = :file_name, updated_at = NOW()
+                    WHERE user_id = :user_id AND file_id = :file_id AND file_name IS DISTINCT FROM :file_name
+                """),
+                {"user_id": user_id, "file_id": file_id, "file_name": file_name}
+            )
+        if added:
+            await self._record_indexed(conn, user_id, added)
+        files = 0
+        if removed and file_id is not None:
+            remaining = (await conn.execute(
+                text("""
+                    UPDATE user_kb_files SET chunk_count = GREATEST(chunk_count - :removed, 0), updated_at = NOW()
+                    WHERE user_id = :user_id AND file_id = :file_id
+                    RETURNING chunk_count
+                """),
+                {"user_id": user_id, "file_id": file_id, "removed": removed}
+            )).scalar()
+            if remaining == 0:
+                await conn.execute(
+                    text("DELETE FROM user_kb_files WHERE user_id = :user_id AND file_id = :file_id"),
+                    {"user_id": user_id, "file_id": file_id}
+                )
+                files = -1
+        if removed or not added:
+            await self._bump_kb_stats(conn, user_id, files, -removed)
+
+    async def _record_indexed(self, conn, user_id: int, metadatas: List[Dict[str, Any]]) -> None:
+        """Add freshly inserted chunks to user_kb_files / user_kb_stats (same transaction as the INSERT)."""
+        files: Dict[str, Dict[str, Any]] = {}
+        for meta in metadatas:
+            file_id = self._as_file_id(meta.get("file_id"))
+            if file_id is None:
+                continue
+            entry = files.setdefault(file_id, {"file_name": None, "source_app": meta.get("source_app"), "chunks": 0})
+            entry["chunks"] += 1
+            entry["file_name"] = entry["file_name"] or meta.get("file_name")
+
+        new_files = 0
+        if files:
+            result = await conn.execute(
+                text("""
+                    INSERT INTO user_kb_files AS f (user_id, file_id, file_name, source_app, chunk_count, updated_at)
+                    SELECT CAST(:user_id AS integer), t.file_id, t.file_name, t.source_app, t.chunk_count, NOW()
+                    FROM unnest(
+                        CAST(:file_ids AS varchar[]), CAST(:file_names AS text[]),
+                        CAST(:source_apps AS varchar[]), CAST(:chunk_counts AS integer[])
+                    ) AS t(file_id, file_name, source_app, chunk_count)
+                    ON CONFLICT (user_id, file_id) DO UPDATE SET
+                        chunk_count = f.chunk_count + EXCLUDED.chunk_count,
+                        file_name = COALESCE(EXCLUDED.file_name, f.file_name),
+                        updated_at = NOW()
+                    RETURNING (xmax = 0) AS inserted
+                """),
+                {
+                    "user_id": user_id,
+                    "file_ids": list(files),
+                    "file_names": [f["file_name"] for f in files.values()],
+                    "source_apps": [f["source_app"] for f in files.values()],
+                    "chunk_counts": [f["chunks"] for f in files.values()],
+                }
+            )
+            new_files = sum(1 for row in result.fetchall() if row[0])
+        await self._bump_kb_stats(conn, user_id, new_files, len(metadatas))
+
+    async def _record_deleted(self, conn, user_id: int, chunks: int, file_clause: str = "", params: Dict[str, Any] = None) -> None:
+        """Remove deleted files from user_kb_files and subtract them from user_kb_stats."""
+        result = await conn.execute(
+            text(f"DELETE FROM user_kb_files WHERE user_id = :user_id {file_clause}"),
+            {"user_id": user_id, **(params or {})}
+        )
+        await self._bump_kb_stats(conn, user_id, -(result.rowcount or 0), -(chunks or 0))
+
+    async def _bump_kb_stats(self, conn, user_id: int, files: int, chunks: int) -> None:
+        """Apply file/chunk deltas and bump corpus_version, which invalidates cached search results."""
+        await conn.execute(
+            text("""
+                INSERT INTO user_kb_stats AS s (user_id, file_count, chunk_count, corpus_version, updated_at)
+                VALUES (:user_id, GREATEST(:files, 0), GREATEST(:chunks, 0), 1, NOW())
+                ON CONFLICT (user_id) DO UPDATE SET
+                    file_count = GREATEST(s.file_count + :files, 0),
+                    chunk_count = GREATEST(s.chunk_count + :chunks, 0),
+                    corpus_version = s.corpus_version + 1,
+                    updated_at = NOW()
+            """),
+            {"user_id": user_id, "files": files, "chunks": chunks}
+        )
+
+    def _search_effort(self, accuracy: Union[str, int, None], top_k: int) -> Tuple[str, int]:
+        """
+        Resolve an accuracy knob to the index's GUC and value.
+        `accuracy` is a preset name ("fast", "balanced", "accurate") or a raw probes/ef_search value.
+        """
+        accuracy = accuracy if accuracy is not None else settings.VECTOR_SEARCH_ACCURACY
+        if settings.VECTOR_INDEX_TYPE.lower() == "hnsw":
+            name, presets = "hnsw.ef_search", settings.HNSW_EF_SEARCH
+        else:
+            name, presets = "ivfflat.probes", settings.IVFFLAT_PROBES
+        maximum = SEARCH_EFFORT_MAX[name]
+        if isinstance(accuracy, str):
+            if accuracy not in presets:
+                raise ValueError(f"Unknown search accuracy '{accuracy}' (expected one of {sorted(presets)})")
+            value = presets[accuracy]
+        else:
+            value = int(accuracy)
+            if not 1 <= value <= maximum:
+                raise ValueError(f"Search accuracy {value} out of range for {name} (expected 1-{maximum})")
+        if name == "hnsw.ef_search":
+            # HNSW never returns more than ef_search candidates
+            value = max(value, top_k)
+        return name, min(max(1, value), maximum)
+
+    async def _set_local(self, conn, name: str, value: Any) -> None:
+        # is_local=true scopes the setting to this transaction (safe with pooled connections)
+        await conn.execute(text("SELECT set_config(:name, :value, true)"), {"name": name, "value": str(value)})
+
+    async def _count_candidates(self, conn, user_id: int, conversation_id: Optional[int], corpus_version: int, filter_clause: str, params: Dict[str, Any]) -> int:
+        """
+        Rows matching the search filter, counted up to VECTOR_EXACT_SEARCH_MAX_ROWS + 1
+        (enough to pick a plan). Served from the (user_id, ...) b-tree indexes and cached briefly;
+        keyed on corpus_version so any insert/delete of the user's chunks is seen immediately.
+        """
+        key = (user_id, conversation_id, corpus_version)
+        count = self.candidate_count_cache.get(key)
+        if count is None:
+            count = (await conn.execute(
+                text(f"""
+                    SELECT COUNT(*) FROM (
+                        SELECT 1 FROM document_embeddings WHERE {filter_clause} LIMIT :count_limit
+                    ) AS candidates
+                """),
+                {**params, "count_limit": settings.VECTOR_EXACT_SEARCH_MAX_ROWS + 1}
+            )).scalar() or 0
+            self.candidate_count_cache.set(key, count)
+        return count
+
+    async def _exact_search(self, conn, filter_clause: str, params: Dict[str, Any]) -> List[Any]:
+        """
+        Exact k-NN over the filtered rows. MATERIALIZED keeps the planner from pushing the
+        ORDER BY into the ANN index, so the filter runs first (via the user_id b-tree).
+        """
+        return (await conn.execute(
+            text(f"""
+                WITH candidates AS MATERIALIZED (
+                    SELECT content, source_app, source_url, embedding, file_id, metadata->>'chunk_index' AS chunk_index
+                    FROM document_embeddings
+                    WHERE {filter_clause}
+                )
+                SELECT 
+                    content,
+                    source_app,
+                    source_url,
+                    1 - (embedding <=> CAST(:query_embedding AS vector)) as similarity,
+                    embedding,
+                    file_id,
+                    chunk_index
+                FROM candidates
+                ORDER BY embedding <=> CAST(:query_embedding AS vector)
+                LIMIT :top_k
+            """),
+            params
+        )).fetchall()
+
+    async def _ann_search(self, conn, filter_clause: str, params: Dict[str, Any], accuracy: Union[str, int, None], top_k: int) -> Tuple[List[Any], int]:
+        """
+        ANN search that keeps widening the index scan until top_k filtered rows come back.
+        With VECTOR_ITERATIVE_SCAN (pgvector >= 0.8) the index itself keeps scanning past filtered-out rows.
+        Returns (rows, rounds).
+        """
+        setting, effort = self._search_effort(accuracy, top_k)
+        if settings.VECTOR_ITERATIVE_SCAN:
+            index_type = "hnsw" if setting.startswith("hnsw") else "ivfflat"
+            await self._set_local(conn, f"{index_type}.iterative_scan", "relaxed_order")
+
+        rounds = 0
+        rows: List[Any] = []
+        while True:
+            rounds += 1
+            await self._set_local(conn, setting, effort)
+            # relaxed_order may return rows slightly out of order; the outer ORDER BY restores it
+            rows = (await conn.execute(
+                text(f"""
+                    WITH nearest AS MATERIALIZED (
                         SELECT 
                             content,
                             source_app,
                             source_url,
-                            1 - (embedding <=> CAST(:query_embedding AS vector)) as similarity
+                            embedding <=> CAST(:query_embedding AS vector) as distance,
+                            embedding,
+                            file_id,
+                            metadata->>'chunk_index' AS chunk_index
                         FROM document_embeddings
                         WHERE {filter_clause}
                         ORDER BY embedding <=> CAST(:query_embedding AS vector)
                         LIMIT :top_k
-                    """),
-                    kwargs
-                ).fetchall()
+                    )
+                    SELECT content, source_app, source_url, 1 - distance as similarity, embedding, file_id, chunk_index
+                    FROM nearest
+                    ORDER BY distance
+                """),
+                params
+            )).fetchall()
+            # At the GUC's maximum a wider scan is impossible; the caller falls back to an exact pass
+            if len(rows) >= top_k or rounds >= settings.VECTOR_SEARCH_MAX_REQUERIES + 1 or effort >= SEARCH_EFFORT_MAX[setting]:
+                return rows, rounds
+            # Filtered-out rows starved the scan: re-query with a wider probe / candidate list
+            effort = min(effort * settings.VECTOR_SEARCH_OVERFETCH_FACTOR, SEARCH_EFFORT_MAX[setting])
 
-            results = await run_in_threadpool(
-                lambda: self._execute_sync_db((db_search, params))
-            )
-            
-            return [
-                {
-                    "content": row[0],
-                    "source_app": row[1],
-                    "source_url": row[2],
-                    "similarity": float(row[3])
-                }
-                for row in results
-            ]
+    async def _lexical_search(self, conn, filter_clause: str, params: Dict[str, Any]) -> List[Any]:
+        """Full-text search on the generated content_tsv column (GIN index). No embedding needed."""
+        return (await conn.execute(
+            text(f"""
+                SELECT 
+                    content,
+                    source_app,
+                    source_url,
+                    ts_rank_cd(content_tsv, {LEXICAL_TSQUERY}) as similarity,
+                    NULL as embedding,
+                    file_id,
+                    metadata->>'chunk_index' as chunk_index
+                FROM document_embeddings
+                WHERE {filter_clause}
+                AND content_tsv @@ {LEXICAL_TSQUERY}
+                ORDER BY similarity DESC
+                LIMIT :top_k
+            """),
+            params
+        )).fetchall()
+
+    async def _hybrid_search(self, conn, filter_clause: str, params: Dict[str, Any], accuracy: Union[str, int, None], top_k: int) -> List[Any]:
+        """
+        Vector and lexical candidate lists in one statement, merged with reciprocal rank fusion:
+        score = sum over lists of 1 / (HYBRID_RRF_K + rank). Similarity stays the cosine similarity.
+        """
+        setting, effort = self._search_effort(accuracy, top_k)
+        await self._set_local(conn, setting, effort)
+        return (await conn.execute(
+            text(f"""
+                WITH vector_hits AS (
+                    SELECT id, ROW_NUMBER() OVER (ORDER BY distance) AS rank
+                    FROM (
+                        SELECT id, embedding <=> CAST(:query_embedding AS vector) AS distance
+                        FROM document_embeddings
+                        WHERE {filter_clause}
+                        ORDER BY embedding <=> CAST(:query_embedding AS vector)
+                        LIMIT :candidates
+                    ) nearest
+                ),
+                lexical_hits AS (
+                    SELECT id, ROW_NUMBER() OVER (ORDER BY lexical_rank DESC) AS rank
+                    FROM (
+                        SELECT id, ts_rank_cd(content_tsv, {LEXICAL_TSQUERY}) AS lexical_rank
+                        FROM document_embeddings
+                        WHERE {filter_clause}
+                        AND content_tsv @@ {LEXICAL_TSQUERY}
+                        ORDER BY lexical_rank DESC
+                        LIMIT :candidates
+                    ) matches
+                ),
+                fused AS (
+                    SELECT
+                        COALESCE(v.id, l.id) AS id,
+                        COALESCE(1.0 / (:rrf_k + v.rank), 0) + COALESCE(1.0 / (:rrf_k + l.rank), 0) AS score
+                    FROM vector_hits v
+                    FULL OUTER JOIN lexical_hits l ON v.id = l.id
+                )
+                SELECT 
+                    d.content,
+                    d.source_app,
+                    d.source_url,
+                    1 - (d.embedding <=> CAST(:query_embedding AS vector)) as similarity,
+                    d.embedding,
+                    d.file_id,
+                    d.metadata->>'chunk_index' as chunk_index,
+                    f.score
+                FROM fused f
+                JOIN document_embeddings d ON d.id = f.id AND d.user_id = :user_id
+                ORDER BY f.score DESC
+                LIMIT :top_k
+            """),
+            {**params, "candidates": max(top_k, settings.HYBRID_CANDIDATES), "rrf_k": settings.HYBRID_RRF_K}
+        )).fetchall()
+
+    @staticmethod
+    def _candidates(rows: List[Any]) -> Tuple[List[Dict[str, Any]], Optional[np.ndarray]]:
+        """
+        Rows are (content, source_app, source_url, similarity, embedding, file_id, chunk_index[, score]).
+        Returns candidate dicts for _diversify plus their embeddings (None when not selected).
+        """
+        candidates = [
+            {
+                "content": row[0],
+                "source_app": row[1],
+                "source_url": row[2],
+                "similarity": float(row[3]),
+                "file_id": row[5],
+                "chunk_index": int(row[6]) if row[6] is not None and str(row[6]).isdigit() else None,
+            }
+            for row in rows
+        ]
+        if not rows or rows[0][4] is None:
+            return candidates, None
+        # Binary codec on asyncpg returns float32 arrays; a text literal if the codec is not registered
+        vectors = np.stack([parse_vector(row[4]) if isinstance(row[4], str) else np.asarray(row[4], dtype=np.float32) for row in rows])
+        return candidates, vectors
+
+    async def search(self, user_id: int, query: str, top_k: int = 5, conversation_id: int = None, accuracy: Union[str, int, None] = None, filter_mode: Optional[str] = None, mode: Optional[str] = None, diversify: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """
+        Search for documents similar to the query using vector similarity.
+        Supports filtering by conversation_id (scoped search).
+        `mode` ("vector", "hybrid", "lexical") defaults to SEARCH_MODE. "hybrid" fuses vector and
+        full-text candidates (exact identifiers, file names, emails); "lexical" skips the embedding call.
+        `accuracy` trades recall for latency: it sets ivfflat.probes / hnsw.ef_search for this query only.
+        `filter_mode` ("auto", "exact", "ann") defaults to VECTOR_SEARCH_FILTER_MODE. In "auto", users with
+        at most VECTOR_EXACT_SEARCH_MAX_ROWS matching chunks get an exact scan; others get ANN with
+        re-queries, falling back to an exact scan if the index still returns fewer than top_k rows.
+        `diversify` (default SEARCH_DIVERSIFY) fetches SEARCH_FETCH_K candidates with their embeddings,
+        keeps top_k by MMR and merges neighbouring chunks of one file (see _diversify).
+        """
+        try:
+            search_mode = (mode or settings.SEARCH_MODE).lower()
+            if search_mode not in ("vector", "hybrid", "lexical"):
+                raise ValueError(f"Unknown search mode '{search_mode}' (expected 'vector', 'hybrid' or 'lexical')")
+            filter_mode = (filter_mode or settings.VECTOR_SEARCH_FILTER_MODE).lower()
+            diversify = settings.SEARCH_DIVERSIFY if diversify is None else diversify
+
+            # Candidates to fetch; _diversify narrows them to top_k
+            fetch_k = self._fetch_k(top_k, diversify)
+            filter_clause, params = self._search_filter(user_id, conversation_id, fetch_k)
+
+            query_embedding = None
+            if search_mode != "lexical":
+                # Generate query embedding (cached)
+                query_embedding = await self._embed_query(query)
+                params["query_embedding"] = to_pgvector(query_embedding)
+            if search_mode != "vector":
+                params["query_text"] = query
+
+            async with async_engine.begin() as conn:
+                # Read before searching: a concurrent write can only make the cached rows newer than the key
+                corpus_version = await self._corpus_version(conn, user_id)
+                cache_key = self._result_cache_key(
+                    user_id,
+                    query_embedding if query_embedding is not None else self._normalize_query(query),
+                    top_k, conversation_id, corpus_version,
+                    (search_mode, filter_mode, accuracy, diversify),
+                )
+                cached = self.search_result_cache.get(cache_key)
+                if cached is not None:
+                    return [dict(r) for r in cached]
+
+                if search_mode == "lexical":
+                    rows = await self._lexical_search(conn, filter_clause, params)
+                    self.search_plans["lexical"] += 1
+                    results = self._diversify(self._candidates(rows)[0], top_k, diversify)
+                elif search_mode == "hybrid":
+                    rows = await self._hybrid_search(conn, filter_clause, params, accuracy, fetch_k)
+                    self.search_plans["hybrid"] += 1
+                    candidates, vectors = self._candidates(rows)
+                    # MMR relevance is the fused rank score (scaled to 1 for the best hit), not the cosine
+                    relevance = np.array([float(row[7]) for row in rows]) if rows else None
+                    if relevance is not None:
+                        relevance /= max(relevance.max(), 1e-12)
+                    results = self._diversify(candidates, top_k, diversify, query_embedding, vectors, relevance)
+                else:
+                    rows = await self._vector_search(conn, user_id, conversation_id, corpus_version, filter_clause, params, accuracy, filter_mode, fetch_k)
+                    candidates, vectors = self._candidates(rows)
+                    results = self._diversify(candidates, top_k, diversify, query_embedding, vectors)
+
+            self.search_result_cache.set(cache_key, results)
+            return [dict(r) for r in results]
         except Exception as e:
             print(f"Error searching documents: {e}")
             raise
+
+    async def search_many(self, user_id: int, queries: List[str], top_k: int = 5, conversation_id: int = None, accuracy: Union[str, int, None] = None, filter_mode: Optional[str] = None, mode: Optional[str] = None, diversify: Optional[bool] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Vector search for several queries at once: one embedding call for the batch and one SQL
+        statement (LATERAL join over an array of query vectors) for the queries not in the result cache.
+        Returns one result list per query, in query order. "hybrid" / "lexical" modes search per query.
+        """
+        search_mode = (mode or settings.SEARCH_MODE).lower()
+        if search_mode != "vector" or not queries:
+            return await super().search_many(
+                user_id, queries, top_k=top_k, conversation_id=conversation_id,
+                accuracy=accuracy, filter_mode=filter_mode, mode=mode, diversify=diversify
+            )
+        try:
+            filter_mode = (filter_mode or settings.VECTOR_SEARCH_FILTER_MODE).lower()
+            if filter_mode not in ("auto", "exact", "ann"):
+                raise ValueError(f"Unknown filter_mode '{filter_mode}' (expected 'auto', 'exact' or 'ann')")
+            diversify = settings.SEARCH_DIVERSIFY if diversify is None else diversify
+            fetch_k = self._fetch_k(top_k, diversify)
+            filter_clause, params = self._search_filter(user_id, conversation_id, fetch_k)
+
+            embeddings = await self._embed_queries(queries)
+            results: List[Optional[List[Dict[str, Any]]]] = [None] * len(queries)
+            async with async_engine.begin() as conn:
+                corpus_version = await self._corpus_version(conn, user_id)
+                # Same keys as search(), so single and batched searches share cache entries
+                keys = [
+                    self._result_cache_key(user_id, embedding, top_k, conversation_id, corpus_version, ("vector", filter_mode, accuracy, diversify))
+                    for embedding in embeddings
+                ]
+                for i, key in enumerate(keys):
+                    cached = self.search_result_cache.get(key)
+                    if cached is not None:
+                        results[i] = [dict(r) for r in cached]
+
+                pending = [i for i, r in enumerate(results) if r is None]
+                if pending:
+                    rows_per_query = await self._vector_search_many(
+                        conn, user_id, conversation_id, corpus_version, filter_clause, params, accuracy, filter_mode, fetch_k,
+                        [embeddings[i] for i in pending]
+                    )
+                    for i, rows in zip(pending, rows_per_query):
+                        candidates, vectors = self._candidates(rows)
+                        found = self._diversify(candidates, top_k, diversify, embeddings[i], vectors)
+                        self.search_result_cache.set(keys[i], found)
+                        results[i] = [dict(r) for r in found]
+            return results
+        except Exception as e:
+            print(f"Error searching documents (batch of {len(queries)}): {e}")
+            raise
+
+    async def _batch_knn(self, conn, filter_clause: str, params: Dict[str, Any], exact: bool) -> List[List[Any]]:
+        """
+        k-NN for every vector in :query_embeddings in one statement. Returns rows grouped per query,
+        each row shaped for _candidates. exact=True materializes the filtered rows once and scans them
+        for every query; otherwise each query walks the ANN index.
+        """
+        rows = (await conn.execute(
+            text(f"""
+                {"WITH candidates AS MATERIALIZED (SELECT content, source_app, source_url, embedding, file_id, metadata FROM document_embeddings WHERE " + filter_clause + ")" if exact else ""}
+                SELECT q.ord, hit.content, hit.source_app, hit.source_url, 1 - hit.distance AS similarity,
+                       hit.embedding, hit.file_id, hit.chunk_index
+                FROM unnest(CAST(:query_embeddings AS vector[])) WITH ORDINALITY AS q(query_embedding, ord)
+                CROSS JOIN LATERAL (
+                    SELECT 
+                        d.content,
+                        d.source_app,
+                        d.source_url,
+                        d.embedding <=> q.query_embedding AS distance,
+                        d.embedding,
+                        d.file_id,
+                        d.metadata->>'chunk_index' AS chunk_index
+                    FROM {"candidates d" if exact else "document_embeddings d WHERE " + filter_clause}
+                    ORDER BY d.embedding <=> q.query_embedding
+                    LIMIT :top_k
+                ) hit
+                ORDER BY q.ord, hit.distance
+            """),
+            params
+        )).fetchall()
+        grouped: List[List[Any]] = [[] for _ in params["query_embeddings"]]
+        for row in rows:
+            grouped[row[0] - 1].append(tuple(row[1:]))
+        return grouped
+
+    async def _vector_search_many(self, conn, user_id: int, conversation_id: Optional[int], corpus_version: int, filter_clause: str, params: Dict[str, Any], accuracy: Union[str, int, None], filter_mode: str, fetch_k: int, query_embeddings: List[List[float]]) -> List[List[Any]]:
+        """Batched _vector_search: the exact / ANN choice is made once for the whole batch."""
+        params = {**params, "query_embeddings": [to_pgvector(e) for e in query_embeddings]}
+        candidates = None
+        if filter_mode == "auto":
+            candidates = await self._count_candidates(conn, user_id, conversation_id, corpus_version, filter_clause, params)
+            filter_mode = "exact" if candidates <= settings.VECTOR_EXACT_SEARCH_MAX_ROWS else "ann"
+
+        self.search_plans["batch"] += 1
+        if filter_mode == "exact":
+            self.search_plans["exact"] += len(query_embeddings)
+            return await self._batch_knn(conn, filter_clause, params, exact=True)
+
+        setting, effort = self._search_effort(accuracy, fetch_k)
+        if settings.VECTOR_ITERATIVE_SCAN:
+            index_type = "hnsw" if setting.startswith("hnsw") else "ivfflat"
+            await self._set_local(conn, f"{index_type}.iterative_scan", "relaxed_order")
+        await self._set_local(conn, setting, effort)
+        grouped = await self._batch_knn(conn, filter_clause, params, exact=False)
+        self.search_plans["ann"] += len(query_embeddings)
+
+        # Queries the filtered index scan starved get one exact pass together
+        short = [i for i, rows in enumerate(grouped) if len(rows) < fetch_k and (candidates is None or candidates > len(rows))]
+        if short:
+            exact_params = {**params, "query_embeddings": [params["query_embeddings"][i] for i in short]}
+            for i, rows in zip(short, await self._batch_knn(conn, filter_clause, exact_params, exact=True)):
+                grouped[i] = rows
+            self.search_plans["ann_fallback_exact"] += len(short)
+        return grouped
+
+    @staticmethod
+    def _search_filter(user_id: int, conversation_id: Optional[int], fetch_k: int) -> Tuple[str, Dict[str, Any]]:
+        """WHERE clause and base parameters shared by every search plan."""
+        # Logic: (user_id match) AND (conv_id match OR conv_id is null/global)
+        filter_clause = "user_id = :user_id"
+        params = {
+            "user_id": user_id,
+            "top_k": fetch_k
+        }
+        if conversation_id:
+            filter_clause += " AND (conversation_id IS NULL OR conversation_id = :conv_id)"
+            params["conv_id"] = int(conversation_id)
+        return filter_clause, params
+
+    async def _vector_search(self, conn, user_id: int, conversation_id: Optional[int], corpus_version: int, filter_clause: str, params: Dict[str, Any], accuracy: Union[str, int, None], filter_mode: str, fetch_k: int) -> List[Any]:
+        """Exact or ANN k-NN, chosen by filter_mode (see search)."""
+        if filter_mode not in ("auto", "exact", "ann"):
+            raise ValueError(f"Unknown filter_mode '{filter_mode}' (expected 'auto', 'exact' or 'ann')")
+
+        candidates = None
+        if filter_mode == "auto":
+            candidates = await self._count_candidates(conn, user_id, conversation_id, corpus_version, filter_clause, params)
+            filter_mode = "exact" if candidates <= settings.VECTOR_EXACT_SEARCH_MAX_ROWS else "ann"
+
+        if filter_mode == "exact":
+            self.search_plans["exact"] += 1
+            return await self._exact_search(conn, filter_clause, params)
+
+        rows, rounds = await self._ann_search(conn, filter_clause, params, accuracy, fetch_k)
+        self.search_plans["ann"] += 1
+        if rounds > 1:
+            self.search_plans["ann_requery"] += 1
+        # Only worth an exact pass when we know more than fetch_k rows match
+        if len(rows) < fetch_k and (candidates is None or candidates > len(rows)):
+            rows = await self._exact_search(conn, filter_clause, params)
+            self.search_plans["ann_fallback_exact"] += 1
+        return rows
+
+    async def _corpus_version(self, conn, user_id: int) -> int:
+        """Bumped by _bump_kb_stats in the same transaction as every insert/delete of the user's chunks."""
+        version = (await conn.execute(
+            text("SELECT corpus_version FROM user_kb_stats WHERE user_id = :user_id"),
+            {"user_id": user_id}
+        )).scalar()
+        return version or 0
     
     async def delete_document_by_file_id(self, user_id: int, file_id: str) -> None:
         """
         Delete a specific document (and all its chunks) by file_id.
         """
-        from starlette.concurrency import run_in_threadpool
         try:
-            def db_del(conn, **kwargs):
-                conn.execute(
-                    text("DELETE FROM document_embeddings WHERE user_id = :user_id AND metadata->>'file_id' = :file_id"),
-                    kwargs
+            async with async_engine.begin() as conn:
+                result = await conn.execute(
+                    text("DELETE FROM document_embeddings WHERE user_id = :user_id AND file_id = :file_id"),
+                    {"user_id": user_id, "file_id": file_id}
                 )
-                conn.commit()
-            
-            await run_in_threadpool(
-                lambda: self._execute_sync_db((db_del, {"user_id": user_id, "file_id": file_id}))
-            )
+                await self._record_deleted(conn, user_id, result.rowcount, "AND file_id = :file_id", {"file_id": file_id})
             print(f"Deleted document {file_id} for user {user_id}")
         except Exception as e:
             print(f"Error deleting document {file_id}: {e}")
             raise
     
-    def delete_user_documents(self, user_id: int, source_app: str = None) -> None:
+    async def delete_user_documents(self, user_id: int, source_app: str = None) -> None:
         """
-        Delete all documents for a user. Kept Sync for now as it's rarely used.
+        Delete all documents for a user, optionally only those from one source_app.
         """
         try:
-            with engine.connect() as conn:
+            async with async_engine.begin() as conn:
                 if source_app:
-                    conn.execute(
+                    result = await conn.execute(
                         text("DELETE FROM document_embeddings WHERE user_id = :user_id AND source_app = :source_app"),
                         {"user_id": user_id, "source_app": source_app}
                     )
+                    await self._record_deleted(conn, user_id, result.rowcount, "AND source_app = :source_app", {"source_app": source_app})
                 else:
-                    conn.execute(
+                    result = await conn.execute(
                         text("DELETE FROM document_embeddings WHERE user_id = :user_id"),
                         {"user_id": user_id}
                     )
-                conn.commit()
+                    await self._record_deleted(conn, user_id, result.rowcount)
             print(f"Deleted documents for user {user_id}")
         except Exception as e:
             print(f"Error deleting documents: {e}")
             raise
 
-    def get_user_file_stats(self, user_id: int) -> Dict[str, Any]:
+    async def get_user_file_stats(self, user_id: int) -> Dict[str, Any]:
         """
         Get statistics about a user's uploaded files.
-        Kept sync because it's fast (no external API calls).
+        Reads the incrementally maintained user_kb_stats / user_kb_files (migrations/009); the
+        file-name list is capped at KB_STATS_MAX_FILE_NAMES (most recent first) to keep prompts small.
+        The formatted result is cached per corpus_version, so writes on other workers are seen at once.
         """
         try:
-            with engine.connect() as conn:
-                result = conn.execute(
+            async with async_engine.connect() as conn:
+                # One primary-key read; corpus_version moves with every write from any worker
+                totals = (await conn.execute(
+                    text("SELECT file_count, chunk_count, corpus_version FROM user_kb_stats WHERE user_id = :user_id"),
+                    {"user_id": user_id}
+                )).fetchone()
+                cache_key = (user_id, totals[2] if totals else 0)
+                cached = self.kb_stats_cache.get(cache_key)
+                if cached is not None:
+                    return cached
+                names = (await conn.execute(
                     text("""
-                        SELECT 
-                            COUNT(DISTINCT metadata->>'file_id') as file_count,
-                            STRING_AGG(DISTINCT metadata->>'file_name', ', ') as file_list,
-                            COUNT(*) as chunk_count
-                        FROM document_embeddings
+                        SELECT file_name
+                        FROM user_kb_files
                         WHERE user_id = :user_id
+                        ORDER BY updated_at DESC
+                        LIMIT :limit
                     """),
-                    {"user_id": user_id}
-                ).fetchone()
-                
-                return {
-                    "file_count": result[0],
-                    "file_names": result[1] if result[1] else "(No files found)",
-                    "total_chunks": result[2]
-                }
+                    {"user_id": user_id, "limit": settings.KB_STATS_MAX_FILE_NAMES}
+                )).fetchall()
         except Exception as e:
             print(f"Error getting file stats: {e}")
             return {"file_count": 0, "file_names": "", "total_chunks": 0}
 
-    def has_document(self, user_id: int, file_id: str) -> bool:
+        file_count = totals[0] if totals else 0
+        file_names = ", ".join(row[0] or "Untitled" for row in names)
+        if file_count > len(names):
+            file_names += f" (+{file_count - len(names)} more)"
+        stats = {
+            "file_count": file_count,
+            "file_names": file_names if names else "(No files found)",
+            "total_chunks": totals[1] if totals else 0
+        }
+        self.kb_stats_cache.set(cache_key, stats)
+        return stats
+
+    async def has_document(self, user_id: int, file_id: str) -> bool:
         """
         Check if a document with the given file_id already exists for the user.
         """
         try:
-            with engine.connect() as conn:
-                result = conn.execute(
+            async with async_engine.connect() as conn:
+                result = (await conn.execute(
                     text("""
                         SELECT 1 
                         FROM document_embeddings 
                         WHERE user_id = :user_id 
-                        AND metadata->>'file_id' = :file_id
+                        AND file_id = :file_id
                         LIMIT 1
                     """),
                     {"user_id": user_id, "file_id": file_id}
-                ).fetchone()
+                )).fetchone()
                 return result is not None
         except Exception as e:
             print(f"Error checking document existence: {e}")
             return False
-
-# Singleton instance
-pgvector_store = PgVectorStore()
@@ -0,0 +1,147 @@
+"""
+Persistent, content-addressed embedding cache.
+Lets re-ingest of unchanged content (Drive re-sync, PDF re-upload, calendar re-sync)
+skip the Hugging Face call entirely.
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+import numpy as np
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.dialects import postgresql, sqlite
+from app.db.session import async_engine
+from app.models.embedding_cache import EmbeddingCache
+from app.core.config import settings
+
+class EmbeddingCacheService:
+    """
+    Batched lookups/inserts against the `embedding_cache` table, with hit/miss counters
+    and an age + LRU eviction job (see app/core/scheduler.py).
+    """
+    # Only refresh last_used_at when it is older than this, so hits stay read-mostly
+    touch_interval = timedelta(hours=1)
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.evicted = 0
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    async def get_many(self, model: str, instruction: str, hashes: List[str]) -> Dict[str, List[float]]:
+        """
+        Look up cached embeddings for many content hashes in one query.
+        Returns {content_hash: embedding} for the hits.
+        """
+        if not settings.EMBEDDING_CACHE_ENABLED or not hashes:
+            return {}
+
+        table = EmbeddingCache.__table__
+        now = datetime.now(timezone.utc)
+        try:
+            async with async_engine.begin() as conn:
+                rows = (await conn.execute(
+                    select(table.c.content_hash, table.c.embedding, table.c.last_used_at).where(
+                        table.c.model == model,
+                        table.c.instruction == instruction,
+                        table.c.content_hash.in_(hashes)
+                    )
+                )).fetchall()
+
+                stale = [row[0] for row in rows if row[2] is None or self._as_utc(row[2]) < now - self.touch_interval]
+                if stale:
+                    await conn.execute(
+                        update(table).where(
+                            table.c.model == model,
+                            table.c.instruction == instruction,
+                            table.c.content_hash.in_(stale)
+                        ).values(last_used_at=now)
+                    )
+        except Exception as e:
+            print(f"Error reading embedding cache: {e}")
+            self.errors += 1
+            self.misses += len(hashes)
+            return {}
+
+        found = {row[0]: np.frombuffer(row[1], dtype=np.float32).tolist() for row in rows}
+        self.hits += len(found)
+        self.misses += len(hashes) - len(found)
+        return found
+
+    async def put_many(self, model: str, instruction: str, embeddings: Dict[str, List[float]]) -> None:
+        """
+        Store embeddings keyed by content hash. Existing keys are left untouched.
+        """
+        if not settings.EMBEDDING_CACHE_ENABLED or not embeddings:
+            return
+
+        now = datetime.now(timezone.utc)
+        rows = [
+            {
+                "model": model,
+                "instruction": instruction,
+                "content_hash": content_hash,
+                "embedding": np.asarray(vector, dtype=np.float32).tobytes(),
+                "last_used_at": now,
+            }
+            for content_hash, vector in embeddings.items()
+        ]
+        try:
+            dialect = postgresql if async_engine.dialect.name == "postgresql" else sqlite
+            stmt = dialect.insert(EmbeddingCache.__table__).on_conflict_do_nothing(
+                index_elements=["model", "instruction", "content_hash"]
+            )
+            async with async_engine.begin() as conn:
+                await conn.execute(stmt, rows)
+        except Exception as e:
+            print(f"Error writing embedding cache: {e}")
+            self.errors += 1
+
+    async def evict(self, max_age_days: int = None, max_rows: int = None) -> int:
+        """
+        Drop entries unused for `max_age_days`, then trim least-recently-used entries
+        beyond `max_rows`. Returns the number of rows removed.
+        """
+        max_age_days = max_age_days if max_age_days is not None else settings.EMBEDDING_CACHE_MAX_AGE_DAYS
+        max_rows = max_rows if max_rows is not None else settings.EMBEDDING_CACHE_MAX_ROWS
+
+        table = EmbeddingCache.__table__
+        removed = 0
+        try:
+            async with async_engine.begin() as conn:
+                cutoff = datetime.now(timezone.utc) - timedelta(days=max_age_days)
+                removed += (await conn.execute(delete(table).where(table.c.last_used_at < cutoff))).rowcount or 0
+
+                total = (await conn.execute(select(func.count()).select_from(table))).scalar() or 0
+                excess = total - max_rows
+                if excess > 0:
+                    oldest = select(table.c.id).order_by(table.c.last_used_at.asc()).limit(excess).scalar_subquery()
+                    removed += (await conn.execute(delete(table).where(table.c.id.in_(oldest)))).rowcount or 0
+        except Exception as e:
+            print(f"Error evicting embedding cache: {e}")
+            self.errors += 1
+            return 0
+
+        self.evicted += removed
+        print(f"Embedding cache eviction removed {removed} rows")
+        return removed
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "errors": self.errors,
+            "evicted": self.evicted,
+        }
+
+    @staticmethod
+    def _as_utc(value: datetime) -> datetime:
+        # SQLite returns naive datetimes
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+embedding_cache = EmbeddingCacheService()
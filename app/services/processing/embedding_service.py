@@ -1,14 +1,188 @@
-from typing import List
+"""
+Pluggable embedding backends.
+- HuggingFaceEmbeddingBackend: remote HF Inference Router (default).
+- LocalEmbeddingBackend: BAAI/bge-small-en-v1.5 on CPU via ONNX Runtime (optionally int8),
+  batched across a worker pool. No network on ingest or query; useful for offline benchmarks.
+The backend is selected with settings.EMBEDDING_BACKEND.
+"""
+import asyncio
+import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+import numpy as np
+from app.core.config import settings
+from app.core.http_client import shared_http_client
+from app.core.rate_limiter import hf_rate_limiter
 
-class EmbeddingService:
-    def get_embedding(self, text: str) -> List[float]:
+class EmbeddingBackend(ABC):
+    # Identifies the vector space; used as part of the embedding cache key
+    model_name: str
+
+    @abstractmethod
+    async def embed(self, inputs: List[str]) -> List[List[float]]:
         """
-        Generates a vector embedding for the given text.
-        Currently returns a deterministic mock vector for development.
+        Embeds a batch of (already instruction-prefixed) inputs.
+        Returns one vector per input, in input order.
         """
-        # Mock embedding: 384 dimensions (common for small models like all-MiniLM-L6-v2)
-        # Deterministic based on text length to allow simple verification
-        seed = len(text) % 100
-        return [float(seed) / 100.0] * 384
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.__class__.__name__, "model": self.model_name}
+
+class HuggingFaceEmbeddingBackend(EmbeddingBackend):
+    def __init__(self, model_id: str = "BAAI/bge-small-en-v1.5"):
+        self.model_name = model_id
+        self.hf_api_key = settings.HUGGINGFACE_API_KEY
+        if not self.hf_api_key:
+            print("WARNING: HUGGINGFACE_API_KEY is missing via settings!")
+        # Correct URL for the new HF Inference Router
+        self.api_url = f"https://router.huggingface.co/hf-inference/models/{model_id}"
+
+    async def embed(self, inputs: List[str]) -> List[List[float]]:
+        """Send one feature-extraction request for a batch of inputs (Async). Order is preserved."""
+        headers = {"Authorization": f"Bearer {self.hf_api_key}"}
+
+        # Shared pooled HTTP Client, rate limited with adaptive backoff
+        client = shared_http_client.client
+        response = await hf_rate_limiter.send(
+            lambda: client.post(self.api_url, headers=headers, json={"inputs": inputs}),
+            label="HF Embedding"
+        )
+        if response.status_code != 200:
+            print(f"HF API Error: {response.status_code} - {response.text}")
+
+        response.raise_for_status()
+        embeddings = response.json()
+
+        # Handle different response formats
+        # - [[float]] : one pooled vector per input (sentence-transformers models)
+        # - [[[float]]]: token-level vectors per input -> mean pool
+        # - [float]   : single pooled vector (single input)
+        if not isinstance(embeddings, list) or len(embeddings) == 0:
+            raise Exception(f"Unexpected embedding response: {embeddings}")
+        if isinstance(embeddings[0], float):
+            embeddings = [embeddings]
+
+        vectors = []
+        for item in embeddings:
+            if item and isinstance(item[0], list):
+                item = [sum(col) / len(item) for col in zip(*item)]
+            vectors.append(item)
+
+        if len(vectors) != len(inputs):
+            raise Exception(f"Embedding count mismatch: sent {len(inputs)}, got {len(vectors)}")
+        return vectors
+
+class LocalEmbeddingBackend(EmbeddingBackend):
+    """
+    CPU inference of bge-small-en-v1.5 with ONNX Runtime.
+    Requires the optional packages `onnxruntime`, `tokenizers` and (to fetch the model) `huggingface_hub`.
+    The model is loaded lazily on first use.
+    """
+
+    def __init__(self, model_id: str = "BAAI/bge-small-en-v1.5"):
+        self.model_id = model_id
+        self.quantize = settings.LOCAL_EMBEDDING_QUANTIZE
+        # int8 weights produce slightly different vectors, so they get their own cache namespace
+        self.model_name = f"{model_id}:onnx-int8" if self.quantize else f"{model_id}:onnx"
+        self.batch_size = max(1, settings.LOCAL_EMBEDDING_BATCH_SIZE)
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.LOCAL_EMBEDDING_WORKERS, thread_name_prefix="local-embed"
+        )
+        self._session = None
+        self._tokenizer = None
+        self._input_names: List[str] = []
+        # Concurrent first calls from the worker pool must build the session only once
+        self._load_lock = threading.Lock()
+
+    def _resolve_model_dir(self) -> str:
+        if settings.LOCAL_EMBEDDING_MODEL_DIR:
+            return settings.LOCAL_EMBEDDING_MODEL_DIR
+        try:
+            from huggingface_hub import snapshot_download
+        except ImportError:
+            raise ImportError("Set LOCAL_EMBEDDING_MODEL_DIR or install huggingface_hub to download the local embedding model")
+        return snapshot_download(self.model_id, allow_patterns=["onnx/model.onnx", "tokenizer.json"])
+
+    def _load(self) -> None:
+        if self._session is not None:
+            return
+        with self._load_lock:
+            if self._session is None:
+                self._load_model()
+
+    def _load_model(self) -> None:
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError:
+            raise ImportError("EMBEDDING_BACKEND=local requires the 'onnxruntime' and 'tokenizers' packages")
+
+        model_dir = self._resolve_model_dir()
+        model_path = os.path.join(model_dir, "onnx", "model.onnx")
+        if self.quantize:
+            quantized_path = os.path.join(model_dir, "onnx", "model_int8.onnx")
+            if not os.path.exists(quantized_path):
+                from onnxruntime.quantization import quantize_dynamic, QuantType
+                print(f"Quantizing {model_path} to int8...")
+                quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+            model_path = quantized_path
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = settings.LOCAL_EMBEDDING_INTRA_OP_THREADS
+        session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+
+        tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        tokenizer.enable_truncation(max_length=512)
+        tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+        self._input_names = [i.name for i in session.get_inputs()]
+        self._tokenizer = tokenizer
+        self._session = session
+        print(f"Loaded local embedding model from {model_path}")
+
+    def _embed_sync(self, inputs: List[str]) -> List[List[float]]:
+        """Runs in a worker thread (ONNX Runtime releases the GIL during inference)."""
+        self._load()
+        encodings = self._tokenizer.encode_batch(inputs)
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        outputs = self._session.run(None, {name: feeds[name] for name in self._input_names})
+        # BGE uses the [CLS] token as the sentence embedding, L2-normalized
+        cls = outputs[0][:, 0]
+        cls = cls / np.clip(np.linalg.norm(cls, axis=1, keepdims=True), 1e-12, None)
+        return cls.astype(np.float32).tolist()
+
+    async def embed(self, inputs: List[str]) -> List[List[float]]:
+        loop = asyncio.get_running_loop()
+        # First call loads the model once, before fanning out to workers
+        if self._session is None:
+            await loop.run_in_executor(self._executor, self._load)
+        batches = [inputs[i:i + self.batch_size] for i in range(0, len(inputs), self.batch_size)]
+        results = await asyncio.gather(
+            *[loop.run_in_executor(self._executor, self._embed_sync, batch) for batch in batches]
+        )
+        return [vector for batch in results for vector in batch]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "loaded": self._session is not None,
+            "workers": settings.LOCAL_EMBEDDING_WORKERS,
+            "batch_size": self.batch_size,
+        }
+
+def create_embedding_backend(name: Optional[str] = None) -> EmbeddingBackend:
+    name = (name or settings.EMBEDDING_BACKEND).lower()
+    if name == "local":
+        return LocalEmbeddingBackend()
+    if name in ("huggingface", "hf"):
+        return HuggingFaceEmbeddingBackend()
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {name}")
 
-embedding_service = EmbeddingService()
+embedding_backend = create_embedding_backend()
@@ -1,7 +1,7 @@
 from typing import Dict, Any
 from app.services.sanitizer import sanitizer
 from app.services.processing.chunker import chunker
-from app.services.pgvector_store import pgvector_store
+from app.services.vector_store import vector_store
 
 class RAGPipeline:
     def process_document(self, user_id: int, text: str, source_metadata: Dict[str, Any]) -> int:
@@ -25,7 +25,7 @@ class RAGPipeline:
 
         # 3. Index each chunk in pgvector
         for chunk in chunks:
-            pgvector_store.index_document(
+            vector_store.index_document(
                 user_id=user_id,
                 content=chunk,
                 source_metadata=source_metadata
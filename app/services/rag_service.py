@@ -2,8 +2,13 @@
 Service for RAG (Retrieval-Augmented Generation) operations.
 Handles text chunking, document ingestion, and querying.
 """
-from typing import List, Dict, Any
-from app.services.pgvector_store import pgvector_store
+import asyncio
+from typing import List, Dict, Any, Optional
+from sqlalchemy import select
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.document import Document
+from app.services.vector_store import vector_store
 from app.models.user import User
 
 try:
@@ -13,24 +18,80 @@ except ImportError:
 
 from app.services.processing.chunker import chunker
 
+# Shared by all users' syncs; bounds Drive downloads / DB sessions / embedding load across the process
+_global_ingest_slots = asyncio.Semaphore(settings.DRIVE_INGEST_GLOBAL_CONCURRENCY)
+
 class RAGService:
     """
     Service class for RAG operations.
     """
 
-    async def ingest_file(self, user: User, file_id: str, mime_type: str, file_name: str = None):
+    def __init__(self):
+        # user_id -> [semaphore, active ingest_files calls]; dropped when the user's last sync ends
+        self._user_ingest_slots: Dict[int, list] = {}
+
+    @staticmethod
+    def remote_markers(drive_file: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Document column values for a Drive files.list entry's change markers."""
+        drive_file = drive_file or {}
+        version = drive_file.get("version")
+        return {
+            "remote_modified_time": drive_file.get("modifiedTime"),
+            "remote_md5_checksum": drive_file.get("md5Checksum"),
+            "remote_version": int(version) if version is not None else None,
+        }
+
+    @classmethod
+    def is_unchanged(cls, doc: Optional[Document], drive_file: Dict[str, Any]) -> bool:
+        """
+        True when the listed Drive file matches what was last indexed for `doc`.
+        md5Checksum (binary files) only changes with content; Google Docs have none, so fall back
+        to version, then modifiedTime. Markers are only stored once an ingest finishes.
+        """
+        if doc is None:
+            return False
+        markers = cls.remote_markers(drive_file)
+        for column in ("remote_md5_checksum", "remote_version", "remote_modified_time"):
+            if markers[column] is not None and getattr(doc, column) is not None:
+                return markers[column] == getattr(doc, column)
+        return False
+
+    async def get_drive_documents(self, user_id: int) -> Dict[str, Document]:
+        """The user's Drive-backed documents keyed by Drive file id (one query)."""
+        async with AsyncSessionLocal() as db:
+            docs = (await db.scalars(select(Document).where(
+                Document.user_id == user_id,
+                Document.provider == "google_drive"
+            ))).all()
+        return {doc.external_id: doc for doc in docs}
+
+    async def remove_file(self, user_id: int, file_id: str) -> None:
+        """Drops a Drive file that was deleted/trashed remotely: its embeddings and its Document row."""
+        await vector_store.delete_document_by_file_id(user_id, file_id)
+        async with AsyncSessionLocal() as db:
+            doc = await db.scalar(select(Document).where(
+                Document.user_id == user_id,
+                Document.provider == "google_drive",
+                Document.external_id == file_id
+            ))
+            if doc:
+                await db.delete(doc)
+                await db.commit()
+        print(f"Removed Drive file {file_id} for user {user_id}")
+
+    async def ingest_file(self, user: User, file_id: str, mime_type: str, file_name: str = None, drive_file: Optional[Dict[str, Any]] = None) -> bool:
         """
         Fetches a file from Drive, processes it based on type, and indexes it (Async).
+        `drive_file` is the files.list entry; its change markers are stored once indexing finishes.
+        Returns False if the file could not be ingested (so the sync cursor is not advanced past it).
         """
         if not google_drive_service:
             print("Google Drive Service not available")
-            return
+            return False
 
         try:
             from starlette.concurrency import run_in_threadpool
             import hashlib
-            from app.db.session import SessionLocal
-            from app.models.document import Document
             
             # Blocking Drive API Call -> Thread
             content = await run_in_threadpool(google_drive_service.get_file_content, user, file_id, mime_type)
@@ -43,43 +104,49 @@ class RAGService:
 
             # Create/Update Document in DB
             document_id = None
-            db = SessionLocal()
-            try:
-                # Check for existing document
-                existing_doc = db.query(Document).filter(
-                    Document.user_id == user.id,
-                    Document.provider == provider,
-                    Document.external_id == file_id
-                ).first()
-                
-                if existing_doc:
-                    existing_doc.content_hash = content_hash
-                    if file_name:
-                        existing_doc.filename = file_name
-                    existing_doc.source_url = source_url
-                    existing_doc.status = "processing"
-                    document_id = existing_doc.id
-                else:
-                    new_doc = Document(
-                        user_id=user.id,
-                        provider=provider,
-                        external_id=file_id,
-                        filename=file_name or "Untitled",
-                        source_url=source_url,
-                        content_hash=content_hash,
-                        status="processing"
-                    )
-                    db.add(new_doc)
-                    db.commit()
-                    db.refresh(new_doc)
-                    document_id = new_doc.id
-                db.commit()
-            except Exception as db_e:
-                print(f"Database error creating document: {db_e}")
-                db.rollback()
-                return
-            finally:
-                db.close()
+            async with AsyncSessionLocal() as db:
+                try:
+                    # Check for existing document
+                    existing_doc = await db.scalar(select(Document).where(
+                        Document.user_id == user.id,
+                        Document.provider == provider,
+                        Document.external_id == file_id
+                    ))
+
+                    renamed = bool(file_name) and existing_doc is not None and existing_doc.filename != file_name
+                    if existing_doc and existing_doc.content_hash == content_hash and existing_doc.status == "completed" and not renamed:
+                        # Markers changed but the content did not: nothing to re-index
+                        # (a rename goes through the delta re-index, which only rewrites chunk metadata)
+                        for column, value in self.remote_markers(drive_file).items():
+                            setattr(existing_doc, column, value)
+                        await db.commit()
+                        print(f"Content unchanged for file {file_id}; skipping re-index")
+                        return True
+                    if existing_doc:
+                        existing_doc.content_hash = content_hash
+                        if file_name:
+                            existing_doc.filename = file_name
+                        existing_doc.source_url = source_url
+                        existing_doc.status = "processing"
+                        document_id = existing_doc.id
+                    else:
+                        new_doc = Document(
+                            user_id=user.id,
+                            provider=provider,
+                            external_id=file_id,
+                            filename=file_name or "Untitled",
+                            source_url=source_url,
+                            content_hash=content_hash,
+                            status="processing"
+                        )
+                        db.add(new_doc)
+                        await db.flush()
+                        document_id = new_doc.id
+                    await db.commit()
+                except Exception as db_e:
+                    print(f"Database error creating document: {db_e}")
+                    await db.rollback()
+                    return False
             
             text_to_index = ""
             
@@ -98,35 +165,44 @@ class RAGService:
             
             if not text_to_index:
                 print(f"No text extracted for file {file_id} ({mime_type})")
-                return
+                # Chunks from an earlier version (e.g. the doc was emptied) must not outlive it
+                await vector_store.delete_document_by_file_id(user.id, file_id)
+                # Still record the markers so the file is not downloaded again until it changes
+                async with AsyncSessionLocal() as db:
+                    doc = await db.get(Document, document_id)
+                    if doc:
+                        doc.status = "completed"
+                        doc.error_message = "No text extracted"
+                        for column, value in self.remote_markers(drive_file).items():
+                            setattr(doc, column, value)
+                        await db.commit()
+                return True
 
             # Blocking CPU task -> Thread
             chunks = await run_in_threadpool(chunker.chunk_text, text_to_index)
+
+            metadata = {
+                "source_app": "google_drive",
+                "source_url": source_url,
+                "file_id": file_id,
+                "mime_type": mime_type,
+                "file_name": file_name,
+                "document_id": document_id
+            }
             
-            for i, chunk in enumerate(chunks):
-                metadata = {
-                    "source_app": "google_drive",
-                    "source_url": source_url,
-                    "file_id": file_id,
-                    "mime_type": mime_type,
-                    "file_name": file_name,
-                    "chunk_index": i,
-                    "document_id": document_id
-                }
-                
-                # Async Vector Store Call
-                await pgvector_store.index_document(user.id, document_id, chunk, metadata)
+            # Delta re-index: only new chunks are embedded/inserted, vanished ones deleted (one transaction)
+            await vector_store.reindex_document(user.id, document_id, chunks, metadata=metadata)
                 
             # Update status to completed
-            db = SessionLocal()
-            try:
-                doc = db.query(Document).filter(Document.id == document_id).first()
+            async with AsyncSessionLocal() as db:
+                doc = await db.get(Document, document_id)
                 if doc:
                     doc.status = "completed"
                     doc.error_message = None
-                    db.commit()
-            finally:
-                db.close()
+                    for column, value in self.remote_markers(drive_file).items():
+                        setattr(doc, column, value)
+                    await db.commit()
+            return True
                 
         except Exception as e:
             import traceback
@@ -135,20 +211,43 @@ class RAGService:
             
             # Update status to failed
             if 'document_id' in locals() and document_id:
-                db = SessionLocal()
-                try:
-                    doc = db.query(Document).filter(Document.id == document_id).first()
+                async with AsyncSessionLocal() as db:
+                    doc = await db.get(Document, document_id)
                     if doc:
                         doc.status = "failed"
                         doc.error_message = str(e)
-                        db.commit()
-                finally:
-                    db.close()
+                        await db.commit()
+            return False
+
+    async def ingest_files(self, user: User, files: List[Dict[str, Any]]) -> List[bool]:
+        """
+        Ingests Drive files (files.list / changes.list entries) concurrently, at most
+        DRIVE_INGEST_USER_CONCURRENCY per user and DRIVE_INGEST_GLOBAL_CONCURRENCY overall.
+        While one file is downloading another is being extracted or embedded, so wall time
+        approaches the slowest stage rather than the per-file sum. Returns ingest_file's result per file.
+        """
+        entry = self._user_ingest_slots.get(user.id)
+        if entry is None:
+            entry = self._user_ingest_slots[user.id] = [asyncio.Semaphore(settings.DRIVE_INGEST_USER_CONCURRENCY), 0]
+        user_slots = entry[0]
+        entry[1] += 1
+
+        async def ingest(file: Dict[str, Any]) -> bool:
+            # Per-user slot first so a large sync does not sit on global slots while it waits
+            async with user_slots, _global_ingest_slots:
+                return await self.ingest_file(user, file['id'], file['mimeType'], file.get('name'), drive_file=file)
+
+        try:
+            return await asyncio.gather(*(ingest(file) for file in files))
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._user_ingest_slots[user.id]
 
     async def query(self, user_id: int, query_text: str, k: int = 5) -> List[Dict[str, Any]]:
         """
         Queries the Vector DB for relevant context (Async).
         """
-        return await pgvector_store.search(user_id, query_text, top_k=k)
+        return await vector_store.search(user_id, query_text, top_k=k)
 
 rag_service = RAGService()
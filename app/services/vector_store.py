@@ -0,0 +1,21 @@
+"""
+Vector store selection.
+- PgVectorStore: Postgres + pgvector (default).
+- LocalVectorStore: per-user NumPy matrices memory-mapped from disk, for SQLite/offline runs and benchmarks.
+The store is selected with settings.VECTOR_STORE_BACKEND; callers use the `vector_store` singleton.
+"""
+from typing import Optional
+from app.core.config import settings
+from app.services.vector_store_base import VectorStore
+
+def create_vector_store(name: Optional[str] = None) -> VectorStore:
+    name = (name or settings.VECTOR_STORE_BACKEND).lower()
+    if name == "local":
+        from app.services.local_vector_store import LocalVectorStore
+        return LocalVectorStore()
+    if name in ("pgvector", "postgres"):
+        from app.services.pgvector_store import PgVectorStore
+        return PgVectorStore()
+    raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {name}")
+
+vector_store = create_vector_store()
@@ -0,0 +1,288 @@
+"""
+Vector store interface.
+Embedding generation (batching, caching, micro-batching) is shared here; subclasses only store and search vectors.
+"""
+import hashlib
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Optional, Tuple, Union
+import numpy as np
+from app.core.config import settings
+from app.core.cache import TTLLRUCache
+from app.core.circuit_breaker import embedding_circuit_breaker
+from app.services.diversify import mmr_select, merge_adjacent_chunks
+from app.services.processing.embedding_cache import embedding_cache
+from app.services.processing.micro_batcher import MicroBatcher
+from app.services.processing.embedding_service import EmbeddingBackend, embedding_backend
+
+class VectorStore(ABC):
+    
+    def __init__(self, backend: EmbeddingBackend = None):
+        # Embedding backend (HF router or local ONNX) chosen via settings.EMBEDDING_BACKEND
+        # Default: BAAI/bge-small-en-v1.5 (384 dimensions) - High performance & free
+        self.embedding_backend = backend or embedding_backend
+        self.embedding_model = self.embedding_backend.model_name
+        # BGE query-side instruction
+        self.query_instruction = "Represent this sentence for searching relevant passages: "
+        # Hot query embeddings skip the HF round trip entirely
+        self.query_embedding_cache = TTLLRUCache(
+            max_size=settings.QUERY_EMBEDDING_CACHE_SIZE,
+            ttl_seconds=settings.QUERY_EMBEDDING_CACHE_TTL_SECONDS
+        )
+        # Concurrent single-text embeddings (e.g. /chat queries) share one HF request
+        self.embedding_batcher = MicroBatcher(
+            self._embed_batched,
+            max_batch_size=settings.EMBEDDING_MICRO_BATCH_MAX_SIZE,
+            max_wait_ms=settings.EMBEDDING_MICRO_BATCH_WAIT_MS
+        )
+        # Bulk insert throughput counters (see index_chunks)
+        self.rows_indexed = 0
+        self.index_seconds = 0.0
+        # Chunks reindex_document found unchanged (not re-embedded or re-inserted)
+        self.chunks_reused = 0
+        # Which search plan each query used (see search_stats)
+        self.search_plans: Dict[str, int] = {}
+        # Repeat retrievals against an unchanged corpus (see _result_cache_key)
+        self.search_result_cache = TTLLRUCache(
+            max_size=settings.SEARCH_RESULT_CACHE_SIZE,
+            ttl_seconds=settings.SEARCH_RESULT_CACHE_TTL_SECONDS
+        )
+    
+    async def _post_embeddings(self, inputs: List[str]) -> List[List[float]]:
+        """
+        Embed one batch of inputs with the configured backend (Async). Order is preserved.
+        Fails fast with CircuitOpenError while the embedding backend is known to be down.
+        """
+        return await embedding_circuit_breaker.call(lambda: self.embedding_backend.embed(inputs))
+
+    def _iter_batches(self, inputs: List[str]):
+        """
+        Split inputs into consecutive batches bounded by EMBEDDING_BATCH_SIZE items
+        and EMBEDDING_BATCH_MAX_CHARS characters. Yields (start_index, batch).
+        """
+        max_items = max(1, settings.EMBEDDING_BATCH_SIZE)
+        max_chars = settings.EMBEDDING_BATCH_MAX_CHARS
+        
+        start = 0
+        batch: List[str] = []
+        batch_chars = 0
+        for i, item in enumerate(inputs):
+            # An oversized single input still goes out on its own
+            if batch and (len(batch) >= max_items or batch_chars + len(item) > max_chars):
+                yield start, batch
+                start, batch, batch_chars = i, [], 0
+            batch.append(item)
+            batch_chars += len(item)
+        if batch:
+            yield start, batch
+
+    async def embed_many(self, texts: List[str], instruction: str = "") -> List[List[float]]:
+        """
+        Generate embeddings for many texts, packing them into as few inference
+        requests as the batch budget allows. Results are returned in input order.
+        Texts already in the persistent embedding cache (or repeated in `texts`) are not re-sent.
+        """
+        hashes = [embedding_cache.content_hash(t) for t in texts]
+        found = await embedding_cache.get_many(self.embedding_model, instruction, list(dict.fromkeys(hashes)))
+        
+        to_embed: Dict[str, str] = {}
+        for content_hash, t in zip(hashes, texts):
+            if content_hash not in found and content_hash not in to_embed:
+                to_embed[content_hash] = t
+        
+        if to_embed:
+            missing = list(to_embed)
+            inputs = [f"{instruction}{to_embed[h]}" for h in missing]
+            vectors: List[List[float]] = []
+            for _, batch in self._iter_batches(inputs):
+                vectors.extend(await self._post_embeddings(batch))
+            fresh = dict(zip(missing, vectors))
+            await embedding_cache.put_many(self.embedding_model, instruction, fresh)
+            found.update(fresh)
+        
+        return [found[h] for h in hashes]
+
+    async def _embed_batched(self, items: List[Tuple[str, str]]) -> List[List[float]]:
+        """Micro-batch handler: embed (text, instruction) pairs, one embed_many call per instruction."""
+        groups: Dict[str, List[int]] = {}
+        for i, (_, instruction) in enumerate(items):
+            groups.setdefault(instruction, []).append(i)
+        
+        vectors: List[List[float]] = [None] * len(items)
+        for instruction, indices in groups.items():
+            group_vectors = await self.embed_many([items[i][0] for i in indices], instruction)
+            for i, vector in zip(indices, group_vectors):
+                vectors[i] = vector
+        return vectors
+
+    async def _generate_embedding(self, text: str, instruction: str = "") -> List[float]:
+        """Generate embedding vector for a single text (Async, micro-batched with concurrent callers)"""
+        # Prepend instruction if provided (Critical for BGE models on query side)
+        return await self.embedding_batcher.submit((text, instruction))
+
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        # bge-small-en is uncased, so case and whitespace do not change the embedding
+        return " ".join(query.split()).lower()
+
+    async def _embed_query(self, query: str) -> List[float]:
+        """Embed a search query, serving repeated queries from the in-process LRU."""
+        normalized = self._normalize_query(query)
+        key = (self.embedding_model, self.query_instruction, normalized)
+        embedding = self.query_embedding_cache.get(key)
+        if embedding is None:
+            embedding = await self._generate_embedding(normalized, self.query_instruction)
+            self.query_embedding_cache.set(key, embedding)
+        return embedding
+
+    async def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed several search queries with one embedding call (cached ones are not re-sent)."""
+        normalized = [self._normalize_query(q) for q in queries]
+        keys = [(self.embedding_model, self.query_instruction, n) for n in normalized]
+        embeddings = [self.query_embedding_cache.get(key) for key in keys]
+        missing = list(dict.fromkeys(n for n, e in zip(normalized, embeddings) if e is None))
+        if missing:
+            fresh = dict(zip(missing, await self.embed_many(missing, self.query_instruction)))
+            for i, (key, n) in enumerate(zip(keys, normalized)):
+                if embeddings[i] is None:
+                    embeddings[i] = fresh[n]
+                    self.query_embedding_cache.set(key, fresh[n])
+        return embeddings
+
+    @staticmethod
+    def _result_cache_key(user_id: int, query_key: Any, top_k: int, conversation_id: Optional[int], corpus_version: int, options: Tuple) -> Tuple:
+        """
+        Search result cache key. `query_key` is the query embedding (hashed here) or, for lexical
+        search, the normalized query text; `options` are the resolved settings that change results.
+        The user's corpus version changes on every write, so a hit is never stale.
+        """
+        if not isinstance(query_key, str):
+            query_key = hashlib.blake2b(np.asarray(query_key, dtype=np.float32).tobytes(), digest_size=16).hexdigest()
+        return (int(user_id), query_key, top_k, int(conversation_id) if conversation_id else None, corpus_version, options)
+
+    @staticmethod
+    def _fetch_k(top_k: int, diversify: Optional[bool]) -> int:
+        """How many candidates to fetch before _diversify picks the final top_k."""
+        if settings.SEARCH_DIVERSIFY if diversify is None else diversify:
+            return max(top_k, settings.SEARCH_FETCH_K)
+        return top_k
+
+    @staticmethod
+    def _diversify(candidates: List[Dict[str, Any]], top_k: int, diversify: Optional[bool] = None, query_vector: Any = None, vectors: Optional[np.ndarray] = None, relevance: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """
+        Final top_k from best-first candidates carrying file_id / chunk_index.
+        With diversification on (SEARCH_DIVERSIFY) and candidate vectors available, picks by MMR,
+        then merges neighbouring chunks of one file. Returns the public result shape.
+        """
+        diversify = settings.SEARCH_DIVERSIFY if diversify is None else diversify
+        if diversify and vectors is not None and len(candidates) > 1:
+            order = mmr_select(
+                query_vector, vectors, top_k,
+                lambda_mult=settings.MMR_LAMBDA,
+                duplicate_threshold=settings.SEARCH_DUPLICATE_SIMILARITY,
+                relevance=relevance,
+            )
+            selected = [candidates[i] for i in order]
+        else:
+            selected = candidates[:top_k]
+        if diversify and settings.SEARCH_MERGE_ADJACENT_CHUNKS:
+            selected = merge_adjacent_chunks(selected)
+        return [
+            {
+                "content": c["content"],
+                "source_app": c["source_app"],
+                "source_url": c["source_url"],
+                "similarity": c["similarity"],
+            }
+            for c in selected
+        ]
+
+    @staticmethod
+    def _chunk_metadatas(chunks: List[str], metadata: Union[Dict[str, Any], List[Dict[str, Any]], None]) -> List[Dict[str, Any]]:
+        """One metadata dict per chunk: a shared dict gets chunk_index added, a list is used as is."""
+        if isinstance(metadata, list):
+            return metadata
+        return [{**(metadata or {}), "chunk_index": i} for i in range(len(chunks))]
+
+    @staticmethod
+    def _unique_chunks(chunks: List[str], metadatas: List[Dict[str, Any]]) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+        """content hash -> (chunk, metadata) in chunk order; a repeated chunk text is kept once."""
+        unique: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        for chunk, meta in zip(chunks, metadatas):
+            unique.setdefault(embedding_cache.content_hash(chunk), (chunk, meta))
+        return unique
+
+    @staticmethod
+    def _as_file_id(value: Any) -> Optional[str]:
+        return str(value) if value is not None else None
+
+    @staticmethod
+    def _as_conversation_id(value: Any) -> Optional[int]:
+        return int(value) if value not in (None, "") else None
+
+    def ingest_stats(self) -> Dict[str, Any]:
+        """Cumulative bulk insert throughput."""
+        return {
+            "rows_indexed": self.rows_indexed,
+            "insert_seconds": round(self.index_seconds, 3),
+            "rows_per_second": round(self.rows_indexed / self.index_seconds, 1) if self.index_seconds else 0.0,
+            "chunks_reused": self.chunks_reused,
+        }
+    
+
+    def search_stats(self) -> Dict[str, Any]:
+        """Which plan each search used."""
+        return dict(self.search_plans)
+
+    @abstractmethod
+    async def index_document(self, user_id: int, document_id: int, content: str, source_metadata: Dict[str, Any], embedding: Optional[List[float]] = None) -> None:
+        """Index a single chunk. Pass a precomputed `embedding` to skip the embedding call."""
+        pass
+
+    @abstractmethod
+    async def index_chunks(self, user_id: int, document_id: int, chunks: List[str], vectors: Optional[List[List[float]]] = None, metadata: Union[Dict[str, Any], List[Dict[str, Any]]] = None) -> int:
+        """Bulk-index all chunks of a document. Returns the number of rows written."""
+        pass
+
+    @abstractmethod
+    async def reindex_document(self, user_id: int, document_id: int, chunks: List[str], metadata: Union[Dict[str, Any], List[Dict[str, Any]]] = None) -> Dict[str, int]:
+        """
+        Make the document's stored chunks match `chunks` (its full, freshly chunked text): only chunks
+        whose content hash is not stored yet are embedded and inserted, vanished ones are deleted.
+        Returns {"added", "removed", "kept"}.
+        """
+        pass
+
+    @abstractmethod
+    async def search(self, user_id: int, query: str, top_k: int = 5, conversation_id: int = None, **kwargs) -> List[Dict[str, Any]]:
+        """Top-k chunks for a query: [{"content", "source_app", "source_url", "similarity"}]."""
+        pass
+
+    async def search_many(self, user_id: int, queries: List[str], top_k: int = 5, conversation_id: int = None, **kwargs) -> List[List[Dict[str, Any]]]:
+        """
+        Top-k chunks for each of several queries, in query order.
+        Embeds all queries in one call, then searches each; stores that can answer the whole
+        batch in one round trip override this.
+        """
+        if (kwargs.get("mode") or settings.SEARCH_MODE).lower() != "lexical":
+            await self._embed_queries(queries)
+        return [
+            await self.search(user_id, query, top_k=top_k, conversation_id=conversation_id, **kwargs)
+            for query in queries
+        ]
+
+    @abstractmethod
+    async def delete_document_by_file_id(self, user_id: int, file_id: str) -> None:
+        pass
+
+    @abstractmethod
+    async def delete_user_documents(self, user_id: int, source_app: str = None) -> None:
+        pass
+
+    @abstractmethod
+    async def get_user_file_stats(self, user_id: int) -> Dict[str, Any]:
+        """{"file_count", "file_names", "total_chunks"} for the user's knowledge base."""
+        pass
+
+    @abstractmethod
+    async def has_document(self, user_id: int, file_id: str) -> bool:
+        pass
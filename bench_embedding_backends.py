@@ -0,0 +1,43 @@
+"""
+Offline embedding throughput benchmark.
+Usage: python bench_embedding_backends.py [local|huggingface] [num_chunks]
+"""
+import os
+import sys
+import time
+import asyncio
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from app.services.processing.embedding_service import create_embedding_backend
+from app.services.processing.chunker import chunker
+
+def sample_chunks(n: int):
+    paragraph = (
+        "Quarterly planning notes. The team reviewed the roadmap for the search service, "
+        "agreed to ship hybrid retrieval first and to revisit the ingestion pipeline afterwards. "
+    )
+    chunks = chunker.chunk_text(paragraph * (n * 4))
+    return [f"{c} #{i}" for i, c in enumerate(chunks[:n])]
+
+async def bench(backend_name: str, n: int):
+    backend = create_embedding_backend(backend_name)
+    chunks = sample_chunks(n)
+
+    # Warm-up (model load / connection setup) is reported separately
+    start = time.perf_counter()
+    await backend.embed(chunks[:1])
+    warmup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectors = await backend.embed(chunks)
+    elapsed = time.perf_counter() - start
+
+    print(f"Backend:    {backend.model_name}")
+    print(f"Chunks:     {len(chunks)} ({len(vectors[0])} dims)")
+    print(f"Warm-up:    {warmup * 1000:.1f} ms")
+    print(f"Total:      {elapsed * 1000:.1f} ms")
+    print(f"Throughput: {len(chunks) / elapsed:.1f} chunks/s")
+
+if __name__ == "__main__":
+    backend_name = sys.argv[1] if len(sys.argv) > 1 else "local"
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+    asyncio.run(bench(backend_name, n))
@@ -0,0 +1,41 @@
+"""
+Benchmark: bytes and client CPU per embedding for the ways we can bind a pgvector parameter.
+Usage: python bench_vector_encoding.py [dims] [iterations]
+"""
+import os
+import sys
+import json
+import timeit
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import numpy as np
+from app.db.vector_codec import encode_vector, decode_vector, format_vector, parse_vector
+
+def bench(dims: int = 384, iterations: int = 2000):
+    rng = np.random.default_rng(0)
+    vector = rng.standard_normal(dims).astype(np.float32)
+    vector /= np.linalg.norm(vector)
+    # What the HF API hands us: a JSON list of Python floats
+    as_list = json.loads(json.dumps(vector.astype(np.float64).tolist()))
+
+    cases = [
+        ("str(list) text (old)", lambda: str(as_list), lambda p: json.loads(p)),
+        ("compact text (psycopg2)", lambda: format_vector(as_list), parse_vector),
+        ("binary (asyncpg)", lambda: encode_vector(as_list), decode_vector),
+    ]
+
+    print(f"{dims}-dim vector, {iterations} iterations\n")
+    print(f"{'encoding':<26}{'bytes':>8}{'encode us':>12}{'decode us':>12}")
+    for name, encode, decode in cases:
+        payload = encode()
+        encode_us = timeit.timeit(encode, number=iterations) / iterations * 1e6
+        decode_us = timeit.timeit(lambda: decode(payload), number=iterations) / iterations * 1e6
+        print(f"{name:<26}{len(payload):>8}{encode_us:>12.1f}{decode_us:>12.1f}")
+
+    # Lossless check: both new encodings round-trip float32 exactly
+    assert np.array_equal(parse_vector(format_vector(vector)), vector)
+    assert np.array_equal(decode_vector(encode_vector(vector)), vector)
+
+if __name__ == "__main__":
+    dims = int(sys.argv[1]) if len(sys.argv) > 1 else 384
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    bench(dims, iterations)
@@ -16,14 +16,14 @@ def check():
     cols = [c['name'] for c in insp.get_columns("document")]
     print(cols)
     
-    required_doc = ["provider", "external_id", "source_url", "content_hash"]
+    required_doc = ["provider", "external_id", "source_url", "content_hash", "remote_modified_time", "remote_md5_checksum", "remote_version"]
     missing_doc = [c for c in required_doc if c not in cols]
     
     print("Checking 'document_embeddings' columns:")
     emb_cols = [c['name'] for c in insp.get_columns("document_embeddings")]
     print(emb_cols)
     
-    required_emb = ["document_id"]
+    required_emb = ["document_id", "file_id", "conversation_id", "content_tsv", "chunk_hash"]
     missing_emb = [c for c in required_emb if c not in emb_cols]
 
     print("Checking 'messages' columns:")
@@ -32,11 +32,18 @@ def check():
     
     required_msg = ["user_id"]
     missing_msg = [c for c in required_msg if c not in msg_cols]
+
+    print("Checking 'users' columns:")
+    user_cols = [c['name'] for c in insp.get_columns("users")]
+    print(user_cols)
+    
+    required_user = ["google_drive_changes_token"]
+    missing_user = [c for c in required_user if c not in user_cols]
     
-    if not missing_doc and not missing_emb and not missing_msg:
+    if not missing_doc and not missing_emb and not missing_msg and not missing_user:
         print("SUCCESS: All columns present.")
     else:
-        print(f"FAILED: Missing columns: Document={missing_doc}, Embeddings={missing_emb}, Messages={missing_msg}")
+        print(f"FAILED: Missing columns: Document={missing_doc}, Embeddings={missing_emb}, Messages={missing_msg}, Users={missing_user}")
 
 if __name__ == "__main__":
     check()
@@ -0,0 +1,79 @@
+"""
+Per-partition maintenance for a hash-partitioned document_embeddings (migrations/008).
+Each command works one partition at a time, so locks and I/O stay bounded.
+
+    python maintain_vector_partitions.py stats     # rows and on-disk size per partition
+    python maintain_vector_partitions.py vacuum    # VACUUM (ANALYZE) each partition
+    python maintain_vector_partitions.py reindex   # REINDEX CONCURRENTLY each partition's vector index
+"""
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from sqlalchemy import create_engine, text
+from app.core.config import settings
+
+def is_partitioned(conn) -> bool:
+    kind = conn.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass('document_embeddings')")
+    ).scalar()
+    return kind == "p"
+
+def list_partitions(conn):
+    """[(partition_name, estimated_rows)] ordered by name."""
+    rows = conn.execute(text("""
+        SELECT c.relname, GREATEST(c.reltuples, 0)::BIGINT
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass('document_embeddings')
+        ORDER BY c.relname
+    """)).fetchall()
+    return [(r[0], r[1]) for r in rows]
+
+def partition_vector_index(conn, partition: str):
+    """Name of the partition's child of document_embeddings_embedding_idx."""
+    return conn.execute(text("""
+        SELECT ci.relname
+        FROM pg_inherits i
+        JOIN pg_class ci ON ci.oid = i.inhrelid
+        JOIN pg_index x ON x.indexrelid = ci.oid
+        WHERE i.inhparent = to_regclass('document_embeddings_embedding_idx')
+        AND x.indrelid = to_regclass(:partition)
+    """), {"partition": partition}).scalar()
+
+def maintain(command: str):
+    db_url = settings.sync_database_url
+    if not db_url:
+        print("DATABASE_URL is not set.")
+        return
+
+    # VACUUM and REINDEX CONCURRENTLY cannot run inside a transaction block
+    engine = create_engine(db_url, isolation_level="AUTOCOMMIT")
+    with engine.connect() as conn:
+        if not is_partitioned(conn):
+            print("document_embeddings is not partitioned (apply migrations/008 first).")
+            return
+
+        for partition, rows in list_partitions(conn):
+            started = time.perf_counter()
+            if command == "stats":
+                size = conn.execute(
+                    text("SELECT pg_size_pretty(pg_total_relation_size(to_regclass(:p)))"), {"p": partition}
+                ).scalar()
+                print(f"{partition}: ~{rows} rows, {size}")
+                continue
+            elif command == "vacuum":
+                conn.execute(text(f"VACUUM (ANALYZE) {partition}"))
+            elif command == "reindex":
+                index = partition_vector_index(conn, partition)
+                if not index:
+                    print(f"{partition}: no vector index, skipping")
+                    continue
+                conn.execute(text(f"REINDEX INDEX CONCURRENTLY {index}"))
+            else:
+                print(f"Unknown command '{command}' (expected 'stats', 'vacuum' or 'reindex')")
+                return
+            print(f"{command} {partition} (~{rows} rows) in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    maintain(sys.argv[1] if len(sys.argv) > 1 else "stats")
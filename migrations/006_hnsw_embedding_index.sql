@@ -0,0 +1,13 @@
+-- Switch the embedding ANN index from IVFFlat to HNSW (pgvector >= 0.5.0).
+-- HNSW needs no training data, keeps recall stable as the table grows and is tuned per query
+-- with hnsw.ef_search (set VECTOR_INDEX_TYPE=hnsw so PgVectorStore.search sets it).
+-- CONCURRENTLY cannot run inside a transaction: apply with `python rebuild_vector_index.py hnsw`.
+
+-- Build the new index first so search never runs without one
+CREATE INDEX CONCURRENTLY IF NOT EXISTS document_embeddings_embedding_hnsw_idx
+ON document_embeddings USING hnsw (embedding vector_cosine_ops)
+WITH (m = 16, ef_construction = 64);
+
+DROP INDEX CONCURRENTLY IF EXISTS document_embeddings_embedding_idx;
+
+ALTER INDEX document_embeddings_embedding_hnsw_idx RENAME TO document_embeddings_embedding_idx;
@@ -0,0 +1,20 @@
+-- Promote the hot filter keys out of JSONB into typed, indexed columns.
+-- The GIN index on metadata only serves containment (@>), not metadata->>'file_id' = ...,
+-- so existence checks, deletes and conversation-scoped search were per-user sequential scans.
+ALTER TABLE document_embeddings ADD COLUMN IF NOT EXISTS file_id VARCHAR(255);
+ALTER TABLE document_embeddings ADD COLUMN IF NOT EXISTS conversation_id INTEGER;
+
+-- Backfill from metadata
+UPDATE document_embeddings
+SET file_id = metadata->>'file_id',
+    conversation_id = NULLIF(metadata->>'conversation_id', '')::INTEGER
+WHERE file_id IS NULL
+AND (metadata ? 'file_id' OR metadata ? 'conversation_id');
+
+CREATE INDEX IF NOT EXISTS document_embeddings_user_file_idx
+ON document_embeddings(user_id, file_id);
+
+CREATE INDEX IF NOT EXISTS document_embeddings_user_conversation_idx
+ON document_embeddings(user_id, conversation_id);
+
+ANALYZE document_embeddings;
@@ -0,0 +1,65 @@
+-- Hash-partition document_embeddings by user_id (16 partitions).
+-- Every PgVectorStore statement filters on user_id equality, so the planner prunes to a single
+-- partition: searches, deletes and stats touch one heap and one vector index, and VACUUM / REINDEX
+-- run partition by partition (see maintain_vector_partitions.py).
+-- Postgres cannot partition an existing table in place, so this builds a partitioned copy and swaps it in.
+-- Run in a maintenance window: writes to document_embeddings block while rows are copied.
+
+LOCK TABLE document_embeddings IN EXCLUSIVE MODE;
+
+-- The partition key must be part of the primary key
+CREATE TABLE document_embeddings_partitioned (
+    id INTEGER NOT NULL DEFAULT nextval('document_embeddings_id_seq'),
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    document_id INTEGER NOT NULL REFERENCES document(id) ON DELETE CASCADE,
+    content TEXT NOT NULL,
+    embedding vector(384),
+    source_app VARCHAR(50) NOT NULL,
+    source_url TEXT,
+    file_id VARCHAR(255),
+    conversation_id INTEGER,
+    metadata JSONB DEFAULT '{}'::jsonb,
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (id, user_id)
+) PARTITION BY HASH (user_id);
+
+DO $$ BEGIN
+    FOR i IN 0..15 LOOP
+        EXECUTE format(
+            'CREATE TABLE document_embeddings_p%s PARTITION OF document_embeddings_partitioned FOR VALUES WITH (MODULUS 16, REMAINDER %s)',
+            i, i
+        );
+    END LOOP;
+END $$;
+
+INSERT INTO document_embeddings_partitioned
+    (id, user_id, document_id, content, embedding, source_app, source_url, file_id, conversation_id, metadata, created_at, updated_at)
+SELECT id, user_id, document_id, content, embedding, source_app, source_url, file_id, conversation_id, metadata, created_at, updated_at
+FROM document_embeddings;
+
+-- Keep the id sequence when the old table goes away
+ALTER SEQUENCE document_embeddings_id_seq OWNED BY document_embeddings_partitioned.id;
+DROP TABLE document_embeddings;
+ALTER TABLE document_embeddings_partitioned RENAME TO document_embeddings;
+
+-- Indexes on the parent are created on every partition (one vector index per partition).
+-- HNSW needs no training data. apply_migration_008.py rebuilds it as IVFFlat (lists sized per
+-- partition, via rebuild_vector_index.py) when VECTOR_INDEX_TYPE is "ivfflat".
+CREATE INDEX document_embeddings_embedding_idx
+ON document_embeddings USING hnsw (embedding vector_cosine_ops)
+WITH (m = 16, ef_construction = 64);
+
+-- (user_id, ...) composites also cover plain user_id lookups
+CREATE INDEX document_embeddings_user_file_idx ON document_embeddings(user_id, file_id);
+CREATE INDEX document_embeddings_user_conversation_idx ON document_embeddings(user_id, conversation_id);
+CREATE INDEX document_embeddings_source_idx ON document_embeddings(source_app, user_id);
+CREATE INDEX idx_document_embeddings_metadata ON document_embeddings USING gin (metadata);
+
+-- RLS (policies are not copied with the table)
+ALTER TABLE document_embeddings ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS "Users can only access their own embeddings" ON document_embeddings;
+CREATE POLICY "Users can only access their own embeddings" ON document_embeddings
+    USING (auth.uid() = (SELECT auth_user_id FROM users WHERE id = document_embeddings.user_id));
+
+ANALYZE document_embeddings;
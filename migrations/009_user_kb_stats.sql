@@ -0,0 +1,47 @@
+-- Per-user knowledge-base summary, maintained by PgVectorStore in the same transaction as
+-- every insert/delete, so get_user_file_stats (called on each chat message) is a key lookup
+-- instead of COUNT(DISTINCT ...) / STRING_AGG over all of the user's chunks.
+CREATE TABLE IF NOT EXISTS user_kb_files (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    file_id VARCHAR(255) NOT NULL,
+    file_name TEXT,
+    source_app VARCHAR(50),
+    chunk_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (user_id, file_id)
+);
+
+-- Most recently indexed files first (capped file-name list)
+CREATE INDEX IF NOT EXISTS user_kb_files_recent_idx ON user_kb_files(user_id, updated_at DESC);
+
+CREATE TABLE IF NOT EXISTS user_kb_stats (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    file_count INTEGER NOT NULL DEFAULT 0,
+    chunk_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Backfill from existing embeddings
+INSERT INTO user_kb_files (user_id, file_id, file_name, source_app, chunk_count, updated_at)
+SELECT user_id, file_id, MAX(metadata->>'file_name'), MAX(source_app), COUNT(*), MAX(created_at)
+FROM document_embeddings
+WHERE file_id IS NOT NULL
+GROUP BY user_id, file_id
+ON CONFLICT (user_id, file_id) DO NOTHING;
+
+INSERT INTO user_kb_stats (user_id, file_count, chunk_count)
+SELECT user_id, COUNT(DISTINCT file_id), COUNT(*)
+FROM document_embeddings
+GROUP BY user_id
+ON CONFLICT (user_id) DO NOTHING;
+
+ALTER TABLE user_kb_files ENABLE ROW LEVEL SECURITY;
+ALTER TABLE user_kb_stats ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can only access their own kb files" ON user_kb_files;
+CREATE POLICY "Users can only access their own kb files" ON user_kb_files
+    USING (auth.uid() = (SELECT auth_user_id FROM users WHERE id = user_kb_files.user_id));
+
+DROP POLICY IF EXISTS "Users can only access their own kb stats" ON user_kb_stats;
+CREATE POLICY "Users can only access their own kb stats" ON user_kb_stats
+    USING (auth.uid() = (SELECT auth_user_id FROM users WHERE id = user_kb_stats.user_id));
@@ -0,0 +1,9 @@
+-- Full-text search over chunk content for hybrid / lexical retrieval (PgVectorStore.search mode=...).
+-- 'simple' keeps tokens unstemmed so identifiers (PROJ-123), file names and emails match as written.
+-- Adding a STORED generated column rewrites the table: run in a maintenance window on large tables.
+ALTER TABLE document_embeddings
+ADD COLUMN IF NOT EXISTS content_tsv tsvector
+GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED;
+
+CREATE INDEX IF NOT EXISTS document_embeddings_content_tsv_idx
+ON document_embeddings USING gin (content_tsv);
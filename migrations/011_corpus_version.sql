@@ -0,0 +1,3 @@
+-- Per-user corpus version for the search result cache. PgVectorStore bumps it in the same
+-- transaction as every insert/delete of the user's chunks; cached results are keyed on it.
+ALTER TABLE user_kb_stats ADD COLUMN IF NOT EXISTS corpus_version BIGINT NOT NULL DEFAULT 0;
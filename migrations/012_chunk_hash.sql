@@ -0,0 +1,12 @@
+-- Per-chunk content hash for delta re-indexing (PgVectorStore.reindex_document): when a file changes,
+-- only chunks with a new hash are embedded and inserted, and chunks that vanished are deleted.
+-- Same hash as the embedding cache: sha256 hex of the UTF-8 chunk text.
+ALTER TABLE document_embeddings ADD COLUMN IF NOT EXISTS chunk_hash VARCHAR(64);
+
+-- Backfill rewrites every row: run in a maintenance window on large tables
+UPDATE document_embeddings
+SET chunk_hash = encode(sha256(convert_to(content, 'UTF8')), 'hex')
+WHERE chunk_hash IS NULL;
+
+-- Stored chunks of one document (user_id first so it stays partition-local)
+CREATE INDEX IF NOT EXISTS document_embeddings_user_document_idx ON document_embeddings(user_id, document_id);
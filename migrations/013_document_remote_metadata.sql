@@ -0,0 +1,5 @@
+-- Drive change markers on document, taken from the files.list response (modifiedTime,
+-- md5Checksum, version). /drive/sync compares them to skip unchanged files without downloading.
+ALTER TABLE document ADD COLUMN IF NOT EXISTS remote_modified_time VARCHAR(64);
+ALTER TABLE document ADD COLUMN IF NOT EXISTS remote_md5_checksum VARCHAR(64);
+ALTER TABLE document ADD COLUMN IF NOT EXISTS remote_version BIGINT;
@@ -0,0 +1,3 @@
+-- Per-user Drive Changes API cursor (changes.getStartPageToken / newStartPageToken).
+-- NULL means the next /drive/sync does a full listing backfill.
+ALTER TABLE users ADD COLUMN IF NOT EXISTS google_drive_changes_token VARCHAR;
@@ -0,0 +1,103 @@
+"""
+Rebuild the ANN index on document_embeddings.embedding without blocking writes.
+
+    python rebuild_vector_index.py hnsw      # applies migrations/006_hnsw_embedding_index.sql
+    python rebuild_vector_index.py ivfflat   # IVFFlat with `lists` sized from the current row count
+
+On a partitioned table (migrations/008) each partition's index is built concurrently and attached
+to the parent index, and IVFFlat `lists` is sized per partition.
+Set VECTOR_INDEX_TYPE to the same value so search() tunes ivfflat.probes / hnsw.ef_search.
+"""
+import math
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from sqlalchemy import create_engine, text
+from app.core.config import settings
+from maintain_vector_partitions import is_partitioned, list_partitions
+
+MIGRATION = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations/006_hnsw_embedding_index.sql")
+HNSW_OPTIONS = "m = 16, ef_construction = 64"
+
+def ivfflat_lists(rows: int) -> int:
+    """pgvector guidance: rows / 1000 up to 1M rows, sqrt(rows) above that."""
+    lists = rows // 1000 if rows <= 1_000_000 else int(math.sqrt(rows))
+    return max(10, lists)
+
+def split_statements(sql: str):
+    body = "\n".join(line for line in sql.splitlines() if not line.strip().startswith("--"))
+    return [s.strip() for s in body.split(";") if s.strip()]
+
+def index_options(index_type: str, rows: int) -> str:
+    return HNSW_OPTIONS if index_type == "hnsw" else f"lists = {ivfflat_lists(rows)}"
+
+def ivfflat_statements(lists: int):
+    return [
+        f"""CREATE INDEX CONCURRENTLY IF NOT EXISTS document_embeddings_embedding_ivfflat_idx
+ON document_embeddings USING ivfflat (embedding vector_cosine_ops)
+WITH (lists = {lists})""",
+        "DROP INDEX CONCURRENTLY IF EXISTS document_embeddings_embedding_idx",
+        "ALTER INDEX document_embeddings_embedding_ivfflat_idx RENAME TO document_embeddings_embedding_idx",
+    ]
+
+def partitioned_statements(index_type: str, partitions):
+    """
+    CREATE INDEX CONCURRENTLY is not supported on a partitioned parent: create an (invalid) parent
+    index ON ONLY, build each partition's index concurrently and attach it. The parent becomes
+    valid once every partition is attached.
+    """
+    statements = [
+        f"""CREATE INDEX IF NOT EXISTS document_embeddings_embedding_new_idx
+ON ONLY document_embeddings USING {index_type} (embedding vector_cosine_ops)
+WITH ({index_options(index_type, 0)})"""
+    ]
+    for partition, rows in partitions:
+        statements += [
+            f"""CREATE INDEX CONCURRENTLY IF NOT EXISTS {partition}_embedding_new_idx
+ON {partition} USING {index_type} (embedding vector_cosine_ops)
+WITH ({index_options(index_type, rows)})""",
+            f"ALTER INDEX document_embeddings_embedding_new_idx ATTACH PARTITION {partition}_embedding_new_idx",
+        ]
+    # Dropping a partitioned index cannot be CONCURRENTLY; it only takes a brief lock
+    statements.append("DROP INDEX IF EXISTS document_embeddings_embedding_idx")
+    statements.append("ALTER INDEX document_embeddings_embedding_new_idx RENAME TO document_embeddings_embedding_idx")
+    statements += [
+        f"ALTER INDEX {partition}_embedding_new_idx RENAME TO {partition}_embedding_idx"
+        for partition, _ in partitions
+    ]
+    return statements
+
+def rebuild(index_type: str, maintenance_work_mem: str = "1GB"):
+    db_url = settings.sync_database_url
+    if not db_url:
+        print("DATABASE_URL is not set.")
+        return
+    if index_type not in ("hnsw", "ivfflat"):
+        print(f"Unknown index type '{index_type}' (expected 'hnsw' or 'ivfflat')")
+        return
+
+    # CREATE/DROP INDEX CONCURRENTLY must run outside a transaction block
+    engine = create_engine(db_url, isolation_level="AUTOCOMMIT")
+    with engine.connect() as conn:
+        if is_partitioned(conn):
+            partitions = list_partitions(conn)
+            print(f"Partitioned table: rebuilding {len(partitions)} partition indexes")
+            statements = partitioned_statements(index_type, partitions)
+        elif index_type == "hnsw":
+            with open(MIGRATION, "r") as f:
+                statements = split_statements(f.read())
+        else:
+            rows = conn.execute(text("SELECT COUNT(*) FROM document_embeddings")).scalar() or 0
+            lists = ivfflat_lists(rows)
+            print(f"{rows} rows -> lists = {lists} (start with probes ~ {max(1, int(math.sqrt(lists)))})")
+            statements = ivfflat_statements(lists)
+
+        # Index builds are much faster when the graph / centroids fit in memory
+        conn.execute(text(f"SET maintenance_work_mem = '{maintenance_work_mem}'"))
+        for statement in statements:
+            print(f"Executing: {statement.splitlines()[0]}...")
+            conn.execute(text(statement))
+    print(f"Rebuilt document_embeddings_embedding_idx as {index_type}. Set VECTOR_INDEX_TYPE={index_type}.")
+
+if __name__ == "__main__":
+    rebuild(sys.argv[1] if len(sys.argv) > 1 else "hnsw")
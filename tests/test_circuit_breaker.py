@@ -0,0 +1,86 @@
+import sys
+import os
+import asyncio
+import httpx
+# Add parent directory to path to import from app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError, is_upstream_failure
+from app.core.rate_limiter import RetriesExhaustedError
+
+def test_opens_and_recovers():
+    print("Testing circuit breaker...")
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_seconds=0.05)
+    calls = []
+
+    async def failing():
+        calls.append("fail")
+        raise RuntimeError("upstream down")
+
+    async def ok():
+        calls.append("ok")
+        return "ok"
+
+    async def scenario():
+        for _ in range(2):
+            try:
+                await breaker.call(failing)
+            except RuntimeError:
+                pass
+        assert breaker.is_open
+
+        # Open: rejected without calling the dependency
+        try:
+            await breaker.call(ok)
+            assert False, "expected CircuitOpenError"
+        except CircuitOpenError:
+            pass
+        assert calls == ["fail", "fail"]
+
+        # After the recovery window a trial call closes it again
+        await asyncio.sleep(0.06)
+        assert not breaker.is_open
+        assert await breaker.call(ok) == "ok"
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    asyncio.run(scenario())
+    stats = breaker.stats()
+    assert stats["times_opened"] == 1 and stats["rejected"] == 1 and stats["failures"] == 2
+    print("Circuit breaker passed!")
+
+def status_error(status):
+    request = httpx.Request("POST", "https://hf.test/")
+    return httpx.HTTPStatusError(f"HTTP {status}", request=request, response=httpx.Response(status, request=request))
+
+def test_client_errors_do_not_open():
+    print("Testing that client errors are not counted...")
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_seconds=60, is_failure=is_upstream_failure)
+
+    async def fail_with(exc):
+        raise exc
+
+    async def raising(exc):
+        try:
+            await breaker.call(lambda: fail_with(exc))
+        except Exception:
+            pass
+
+    async def scenario():
+        # Bad requests / malformed input: the service is fine
+        for exc in (status_error(400), status_error(413), ValueError("bad input"), status_error(400)):
+            await raising(exc)
+        assert breaker.state == CircuitBreaker.CLOSED and breaker.stats()["ignored_errors"] == 4
+
+        # Overload and outages count
+        await raising(status_error(503))
+        await raising(RetriesExhaustedError("HF request failed after 3 attempts"))
+        assert breaker.is_open
+
+    asyncio.run(scenario())
+    assert is_upstream_failure(status_error(429)) and is_upstream_failure(httpx.ConnectError("refused"))
+    assert is_upstream_failure(asyncio.TimeoutError())
+    print("Client errors passed!")
+
+if __name__ == "__main__":
+    test_opens_and_recovers()
+    test_client_errors_do_not_open()
@@ -0,0 +1,45 @@
+import sys
+import os
+import numpy as np
+# Add parent directory to path to import from app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.diversify import mmr_select, merge_adjacent_chunks
+from app.services.processing.chunker import ChunkerService
+
+def test_mmr_prefers_distinct_results():
+    print("Testing MMR selection...")
+    query = np.array([1.0, 0.0, 0.0])
+    vectors = np.array([
+        [1.0, 0.1, 0.0],   # best match
+        [1.0, 0.11, 0.0],  # near-duplicate of the best match
+        [0.8, 0.0, 0.6],   # less relevant, different content
+    ])
+    # Pure relevance keeps the duplicate
+    assert mmr_select(query, vectors, 2, lambda_mult=1.0) == [0, 1]
+    assert mmr_select(query, vectors, 2, lambda_mult=0.5) == [0, 2]
+    # Near-duplicates are dropped even when nothing else is left
+    assert mmr_select(query, vectors[:2], 2, lambda_mult=1.0, duplicate_threshold=0.95) == [0]
+    print("MMR selection passed!")
+
+def test_merge_adjacent_chunks():
+    print("Testing adjacent chunk merging...")
+    text = " ".join(f"Sentence number {i} of the report." for i in range(40))
+    chunks = ChunkerService(chunk_size=200, overlap=50).chunk_text(text)
+    results = [
+        {"content": chunks[2], "similarity": 0.9, "file_id": "f1", "chunk_index": 2},
+        {"content": "unrelated", "similarity": 0.8, "file_id": "f2", "chunk_index": 0},
+        {"content": chunks[1], "similarity": 0.7, "file_id": "f1", "chunk_index": 1},
+        {"content": chunks[3], "similarity": 0.6, "file_id": "f1", "chunk_index": 3},
+    ]
+    merged = merge_adjacent_chunks(results)
+    assert [m["file_id"] for m in merged] == ["f1", "f2"]
+    # Overlapping text appears once and the passage reads as the original
+    assert merged[0]["content"] in text
+    assert merged[0]["content"].startswith(chunks[1]) and merged[0]["content"].endswith(chunks[3])
+    assert merged[0]["similarity"] == 0.9
+    print("Adjacent chunk merging passed!")
+
+if __name__ == "__main__":
+    test_mmr_prefers_distinct_results()
+    test_merge_adjacent_chunks()
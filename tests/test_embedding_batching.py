@@ -0,0 +1,74 @@
+import sys
+import os
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+# Add parent directory to path to import from app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.pgvector_store import PgVectorStore
+from app.core.config import settings
+from app.services.processing.embedding_service import LocalEmbeddingBackend
+
+def test_embed_many_batches_and_keeps_order():
+    print("Testing batched embedding generation...")
+    store = PgVectorStore()
+    calls = []
+
+    async def fake_post(inputs):
+        calls.append(list(inputs))
+        # Vector encodes the input so ordering can be checked
+        return [[float(len(t))] for t in inputs]
+
+    store._post_embeddings = fake_post
+
+    original = (settings.EMBEDDING_BATCH_SIZE, settings.EMBEDDING_BATCH_MAX_CHARS, settings.EMBEDDING_CACHE_ENABLED)
+    settings.EMBEDDING_BATCH_SIZE = 4
+    settings.EMBEDDING_BATCH_MAX_CHARS = 1000
+    settings.EMBEDDING_CACHE_ENABLED = False
+    try:
+        texts = ["x" * (i + 1) for i in range(10)]
+        vectors = asyncio.run(store.embed_many(texts))
+    finally:
+        settings.EMBEDDING_BATCH_SIZE, settings.EMBEDDING_BATCH_MAX_CHARS, settings.EMBEDDING_CACHE_ENABLED = original
+
+    assert len(calls) == 3
+    assert [len(c) for c in calls] == [4, 4, 2]
+    assert vectors == [[float(i + 1)] for i in range(10)]
+    print("Batching passed!")
+
+def test_batches_respect_char_budget():
+    print("Testing character budget...")
+    store = PgVectorStore()
+    original = (settings.EMBEDDING_BATCH_SIZE, settings.EMBEDDING_BATCH_MAX_CHARS)
+    settings.EMBEDDING_BATCH_SIZE = 100
+    settings.EMBEDDING_BATCH_MAX_CHARS = 10
+    try:
+        batches = list(store._iter_batches(["aaaa", "bbbb", "cccc", "d" * 50, "e"]))
+    finally:
+        settings.EMBEDDING_BATCH_SIZE, settings.EMBEDDING_BATCH_MAX_CHARS = original
+
+    assert batches == [(0, ["aaaa", "bbbb"]), (2, ["cccc"]), (3, ["d" * 50]), (4, ["e"])]
+    print("Character budget passed!")
+
+class SlowLoadingBackend(LocalEmbeddingBackend):
+    """Counts model builds instead of loading ONNX Runtime."""
+    builds = 0
+
+    def _load_model(self):
+        SlowLoadingBackend.builds += 1
+        time.sleep(0.05)
+        self._session = object()
+
+def test_local_model_loads_once_under_concurrency():
+    print("Testing concurrent local model loading...")
+    backend = SlowLoadingBackend()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda _: backend._load(), range(8)))
+    assert SlowLoadingBackend.builds == 1
+    print("Concurrent model loading passed!")
+
+if __name__ == "__main__":
+    test_embed_many_batches_and_keeps_order()
+    test_batches_respect_char_budget()
+    test_local_model_loads_once_under_concurrency()
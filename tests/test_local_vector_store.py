@@ -0,0 +1,142 @@
+import sys
+import os
+import asyncio
+import tempfile
+# Add parent directory to path to import from app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.services.local_vector_store import LocalVectorStore
+from app.services.processing.embedding_service import EmbeddingBackend
+
+VOCAB = ["apple", "banana", "cherry", "date"]
+
+class KeywordBackend(EmbeddingBackend):
+    """Deterministic embeddings: one dimension per vocabulary word."""
+    model_name = "test-keywords"
+
+    async def embed(self, inputs):
+        return [[float(text.count(word)) + 0.01 for word in VOCAB] for text in inputs]
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_index_search_and_delete():
+    print("Testing local vector store...")
+    original = settings.EMBEDDING_CACHE_ENABLED
+    settings.EMBEDDING_CACHE_ENABLED = False
+    try:
+        with tempfile.TemporaryDirectory() as root:
+            store = LocalVectorStore(backend=KeywordBackend(), root=root)
+            run(store.index_chunks(1, 10, ["apple pie", "banana bread"], metadata={"source_app": "google_drive", "file_id": "f1", "file_name": "Recipes"}))
+            run(store.index_chunks(1, 11, ["cherry tart"], metadata={"source_app": "pdf_upload", "file_id": "upload_11", "file_name": "Tart", "conversation_id": 7}))
+            run(store.index_chunks(2, 20, ["apple cider"], metadata={"source_app": "google_drive", "file_id": "g1"}))
+
+            results = run(store.search(1, "banana", top_k=1))
+            assert [r["content"] for r in results] == ["banana bread"]
+            assert results[0]["source_app"] == "google_drive"
+
+            # Batched search returns one list per query, same as searching each
+            batched = run(store.search_many(1, ["banana", "apple"], top_k=1))
+            assert batched == [run(store.search(1, "banana", top_k=1)), run(store.search(1, "apple", top_k=1))]
+
+            # Other users' rows are never returned
+            assert all(r["content"] != "apple cider" for r in run(store.search(1, "apple", top_k=10)))
+
+            # Conversation-scoped rows only show up in their conversation
+            assert "cherry tart" not in [r["content"] for r in run(store.search(1, "cherry", top_k=10, conversation_id=3))]
+            assert run(store.search(1, "cherry", top_k=1, conversation_id=7))[0]["content"] == "cherry tart"
+
+            stats = run(store.get_user_file_stats(1))
+            assert stats["file_count"] == 2 and stats["total_chunks"] == 3
+            assert run(store.has_document(1, "f1")) and not run(store.has_document(2, "f1"))
+
+            # A fresh instance reads the same files back
+            reopened = LocalVectorStore(backend=KeywordBackend(), root=root)
+            assert run(reopened.get_user_file_stats(1))["total_chunks"] == 3
+
+            run(store.delete_document_by_file_id(1, "f1"))
+            assert not run(store.has_document(1, "f1"))
+            assert [r["content"] for r in run(store.search(1, "apple", top_k=10))] == ["cherry tart"]
+
+            run(store.delete_user_documents(1))
+            assert run(store.search(1, "apple", top_k=5)) == []
+            assert run(store.get_user_file_stats(2))["total_chunks"] == 1
+    finally:
+        settings.EMBEDDING_CACHE_ENABLED = original
+    print("Local vector store passed!")
+
+class DownBackend(EmbeddingBackend):
+    model_name = "test-down"
+
+    async def embed(self, inputs):
+        raise RuntimeError("embedding service unavailable")
+
+def test_lexical_search_without_embeddings():
+    print("Testing local lexical search...")
+    original = settings.EMBEDDING_CACHE_ENABLED
+    settings.EMBEDDING_CACHE_ENABLED = False
+    try:
+        with tempfile.TemporaryDirectory() as root:
+            store = LocalVectorStore(backend=KeywordBackend(), root=root)
+            run(store.index_chunks(1, 10, ["Invoice PROJ-123 sent to alice@example.com", "banana bread recipe", "PROJ-124 kickoff"], metadata={"source_app": "google_drive", "file_id": "f1"}))
+
+            # Lexical mode never calls the embedding backend
+            store.embedding_backend = DownBackend()
+            results = run(store.search(1, "who got PROJ-123?", top_k=5, mode="lexical"))
+            assert [r["content"] for r in results] == ["Invoice PROJ-123 sent to alice@example.com"]
+            assert run(store.search(1, "alice@example.com", top_k=5, mode="lexical"))[0]["content"].startswith("Invoice")
+            assert run(store.search(1, "nothing matches", top_k=5, mode="lexical")) == []
+
+            store.embedding_backend = KeywordBackend()
+            assert run(store.search(1, "banana", top_k=1, mode="hybrid"))[0]["content"] == "banana bread recipe"
+            assert store.search_plans["lexical"] == 3 and store.search_plans["hybrid"] == 1
+    finally:
+        settings.EMBEDDING_CACHE_ENABLED = original
+    print("Local lexical search passed!")
+
+class CountingBackend(KeywordBackend):
+    def __init__(self):
+        self.embedded = 0
+
+    async def embed(self, inputs):
+        self.embedded += len(inputs)
+        return await super().embed(inputs)
+
+def test_reindex_only_embeds_changed_chunks():
+    print("Testing delta re-index...")
+    original = settings.EMBEDDING_CACHE_ENABLED
+    settings.EMBEDDING_CACHE_ENABLED = False
+    try:
+        with tempfile.TemporaryDirectory() as root:
+            backend = CountingBackend()
+            store = LocalVectorStore(backend=backend, root=root)
+            meta = {"source_app": "google_drive", "file_id": "f1", "file_name": "Recipes"}
+            assert run(store.reindex_document(1, 10, ["apple pie", "banana bread", "cherry tart"], metadata=meta)) == {"added": 3, "removed": 0, "kept": 0}
+            run(store.index_chunks(1, 11, ["date loaf"], metadata={"source_app": "pdf_upload", "file_id": "upload_11"}))
+
+            backend.embedded = 0
+            counts = run(store.reindex_document(1, 10, ["apple pie", "banana split", "cherry tart"], metadata=meta))
+            assert counts == {"added": 1, "removed": 1, "kept": 2} and backend.embedded == 1
+            contents = [r["content"] for r in run(store.search(1, "apple banana cherry date", top_k=10, diversify=False))]
+            assert sorted(contents) == ["apple pie", "banana split", "cherry tart", "date loaf"]
+
+            # Unchanged document: nothing embedded or rewritten
+            backend.embedded = 0
+            assert run(store.reindex_document(1, 10, ["apple pie", "banana split", "cherry tart"], metadata=meta))["added"] == 0
+            assert backend.embedded == 0
+
+            # Renamed file: kept chunks pick up the new name / URL without re-embedding
+            renamed = {**meta, "file_name": "Desserts", "source_url": "https://drive.test/f1"}
+            assert run(store.reindex_document(1, 10, ["apple pie", "banana split", "cherry tart"], metadata=renamed))["kept"] == 3
+            assert backend.embedded == 0
+            assert "Desserts" in run(store.get_user_file_stats(1))["file_names"]
+            assert run(store.search(1, "apple", top_k=1, diversify=False))[0]["source_url"] == "https://drive.test/f1"
+    finally:
+        settings.EMBEDDING_CACHE_ENABLED = original
+    print("Delta re-index passed!")
+
+if __name__ == "__main__":
+    test_index_search_and_delete()
+    test_lexical_search_without_embeddings()
+    test_reindex_only_embeds_changed_chunks()
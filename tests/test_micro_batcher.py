@@ -0,0 +1,50 @@
+import sys
+import os
+import asyncio
+# Add parent directory to path to import from app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.processing.micro_batcher import MicroBatcher
+
+def test_concurrent_calls_are_batched():
+    print("Testing micro-batching...")
+    calls = []
+
+    async def process(items):
+        calls.append(list(items))
+        await asyncio.sleep(0.02)
+        return [item * 2 for item in items]
+
+    async def run():
+        batcher = MicroBatcher(process, max_batch_size=8, max_wait_ms=10)
+        results = await asyncio.gather(*[batcher.submit(i) for i in range(10)])
+        return batcher, results
+
+    batcher, results = asyncio.run(run())
+
+    assert results == [i * 2 for i in range(10)]
+    # First call goes out immediately, the rest are grouped
+    assert calls[0] == [0]
+    assert sum(len(c) for c in calls) == 10
+    assert len(calls) <= 3
+    assert all(len(c) <= 8 for c in calls)
+    print(f"Batches: {calls}")
+    print("Micro-batching passed!")
+
+def test_errors_propagate_to_callers():
+    print("Testing error propagation...")
+
+    async def process(items):
+        raise RuntimeError("upstream down")
+
+    async def run():
+        batcher = MicroBatcher(process, max_batch_size=4, max_wait_ms=1)
+        return await asyncio.gather(*[batcher.submit(i) for i in range(3)], return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    print("Error propagation passed!")
+
+if __name__ == "__main__":
+    test_concurrent_calls_are_batched()
+    test_errors_propagate_to_callers()
@@ -0,0 +1,128 @@
+import sys
+import os
+import asyncio
+import tempfile
+# Add parent directory to path to import from app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from app.core.config import settings
+from app.db.base import Base
+from app.services import rag_service as rag_module
+from app.services.local_vector_store import LocalVectorStore
+from app.services.processing.embedding_service import EmbeddingBackend
+
+GOOGLE_DOC = "application/vnd.google-apps.document"
+
+class LengthBackend(EmbeddingBackend):
+    model_name = "test-length"
+
+    async def embed(self, inputs):
+        return [[1.0, float(len(text))] for text in inputs]
+
+class FakeDrive:
+    """Stands in for GoogleDriveService.get_file_content."""
+    def __init__(self, content):
+        self.content = content
+
+    def get_file_content(self, user, file_id, mime_type):
+        return self.content[file_id]
+
+class FakeUser:
+    id = 1
+
+def run_with_store(root, coro_factory):
+    """Runs coro_factory(store) against a throwaway SQLite DB and local vector store."""
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{root}/test.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        store = LocalVectorStore(backend=LengthBackend(), root=root)
+        saved = rag_module.AsyncSessionLocal, rag_module.vector_store, rag_module.google_drive_service
+        rag_module.AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        rag_module.vector_store = store
+        try:
+            return await coro_factory(store)
+        finally:
+            rag_module.AsyncSessionLocal, rag_module.vector_store, rag_module.google_drive_service = saved
+            await engine.dispose()
+    return asyncio.run(main())
+
+def test_emptied_file_drops_old_chunks():
+    print("Testing re-ingest of a file that no longer yields text...")
+    original = settings.EMBEDDING_CACHE_ENABLED
+    settings.EMBEDDING_CACHE_ENABLED = False
+
+    async def scenario(store):
+        drive = FakeDrive({"f1": "Quarterly report. " * 40})
+        rag_module.google_drive_service = drive
+        service = rag_module.RAGService()
+
+        assert await service.ingest_file(FakeUser(), "f1", GOOGLE_DOC, "Report", drive_file={"version": "1"})
+        assert await store.has_document(1, "f1")
+
+        drive.content["f1"] = ""
+        assert await service.ingest_file(FakeUser(), "f1", GOOGLE_DOC, "Report", drive_file={"version": "2"})
+        assert not await store.has_document(1, "f1")
+        doc = (await service.get_drive_documents(1))["f1"]
+        assert doc.status == "completed" and doc.remote_version == 2
+
+    try:
+        with tempfile.TemporaryDirectory() as root:
+            run_with_store(root, scenario)
+    finally:
+        settings.EMBEDDING_CACHE_ENABLED = original
+    print("Emptied file re-ingest passed!")
+
+class TrackingRAGService(rag_module.RAGService):
+    """ingest_file replaced by a short sleep that records how many ingests overlap."""
+    def __init__(self):
+        super().__init__()
+        self.active = {}
+        self.peak = {}
+        self.peak_total = 0
+
+    async def ingest_file(self, user, file_id, mime_type, file_name=None, drive_file=None):
+        self.active[user.id] = self.active.get(user.id, 0) + 1
+        self.peak[user.id] = max(self.peak.get(user.id, 0), self.active[user.id])
+        self.peak_total = max(self.peak_total, sum(self.active.values()))
+        await asyncio.sleep(0.01)
+        self.active[user.id] -= 1
+        return True
+
+def test_ingest_files_concurrency_bounds():
+    print("Testing bounded concurrent ingestion...")
+    saved = (settings.DRIVE_INGEST_USER_CONCURRENCY, settings.DRIVE_INGEST_GLOBAL_CONCURRENCY, rag_module._global_ingest_slots)
+
+    class User:
+        def __init__(self, id):
+            self.id = id
+
+    async def main():
+        settings.DRIVE_INGEST_USER_CONCURRENCY = 2
+        settings.DRIVE_INGEST_GLOBAL_CONCURRENCY = 3
+        rag_module._global_ingest_slots = asyncio.Semaphore(settings.DRIVE_INGEST_GLOBAL_CONCURRENCY)
+        service = TrackingRAGService()
+        files = [{"id": f"f{i}", "mimeType": GOOGLE_DOC, "name": str(i)} for i in range(6)]
+        # Two overlapping syncs for user 1 share its limit; user 2 competes for the global one
+        results = await asyncio.gather(
+            service.ingest_files(User(1), files),
+            service.ingest_files(User(1), files),
+            service.ingest_files(User(2), files),
+        )
+        assert all(all(r) and len(r) == 6 for r in results)
+        assert service.peak[1] <= settings.DRIVE_INGEST_USER_CONCURRENCY
+        assert service.peak[2] <= settings.DRIVE_INGEST_USER_CONCURRENCY
+        assert service.peak_total == settings.DRIVE_INGEST_GLOBAL_CONCURRENCY
+        # No per-user semaphores left behind once the syncs finish
+        assert service._user_ingest_slots == {}
+
+    try:
+        asyncio.run(main())
+    finally:
+        settings.DRIVE_INGEST_USER_CONCURRENCY, settings.DRIVE_INGEST_GLOBAL_CONCURRENCY, rag_module._global_ingest_slots = saved
+    print("Bounded concurrent ingestion passed!")
+
+if __name__ == "__main__":
+    test_emptied_file_drops_old_chunks()
+    test_ingest_files_concurrency_bounds()
@@ -0,0 +1,88 @@
+import sys
+import os
+import asyncio
+import httpx
+# Add parent directory to path to import from app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.rate_limiter import AdaptiveRateLimiter
+
+def make_limiter():
+    return AdaptiveRateLimiter(rate_per_second=0, burst=1, initial_concurrency=8, min_concurrency=1, max_concurrency=16)
+
+def test_retry_after_parsing():
+    print("Testing Retry-After parsing...")
+    assert AdaptiveRateLimiter.parse_retry_after(httpx.Headers({"Retry-After": "2"})) == 2.0
+    assert AdaptiveRateLimiter.parse_retry_after(httpx.Headers({"X-RateLimit-Reset": "1.5"})) == 1.5
+    assert AdaptiveRateLimiter.parse_retry_after(httpx.Headers({})) is None
+    print("Retry-After parsing passed!")
+
+def test_429_backs_off_and_recovers():
+    print("Testing 429 handling...")
+    limiter = make_limiter()
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        if len(attempts) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        return httpx.Response(200, json={"ok": True})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await limiter.send(lambda: client.get("https://hf.test/"), max_retries=3)
+
+    response = asyncio.run(run())
+    assert response.status_code == 200
+    assert len(attempts) == 2
+    stats = limiter.stats()
+    assert stats["throttled"] == 1 and stats["retries"] == 1
+    # Halved on 429, then a small additive increase on success
+    assert stats["concurrency_limit"] == 4
+    print("429 handling passed!")
+
+def test_concurrency_limit_is_enforced():
+    print("Testing concurrency limit...")
+    limiter = AdaptiveRateLimiter(rate_per_second=0, burst=1, initial_concurrency=2, min_concurrency=1, max_concurrency=2)
+    peak = {"now": 0, "max": 0}
+
+    async def fake_request():
+        peak["now"] += 1
+        peak["max"] = max(peak["max"], peak["now"])
+        await asyncio.sleep(0.01)
+        peak["now"] -= 1
+        return httpx.Response(200)
+
+    async def run():
+        await asyncio.gather(*[limiter.send(fake_request) for _ in range(6)])
+
+    asyncio.run(run())
+    assert peak["max"] == 2
+    print("Concurrency limit passed!")
+
+def test_cancelled_waiter_passes_its_slot_on():
+    print("Testing cancellation of a woken waiter...")
+    limiter = AdaptiveRateLimiter(rate_per_second=0, burst=1, initial_concurrency=1, min_concurrency=1, max_concurrency=1)
+
+    async def run():
+        await limiter._acquire()
+        woken = asyncio.create_task(limiter._acquire())
+        next_in_line = asyncio.create_task(limiter._acquire())
+        await asyncio.sleep(0)
+        assert limiter.stats()["waiting"] == 2
+
+        # The slot is handed to `woken`, which is cancelled (e.g. a wait_for timeout) before it runs
+        limiter._release()
+        woken.cancel()
+        await asyncio.wait_for(next_in_line, timeout=1)
+        assert woken.cancelled()
+        assert limiter.stats()["in_flight"] == 1 and limiter.stats()["waiting"] == 0
+
+    asyncio.run(run())
+    print("Cancelled waiter passed!")
+
+if __name__ == "__main__":
+    test_retry_after_parsing()
+    test_429_backs_off_and_recovers()
+    test_concurrency_limit_is_enforced()
+    test_cancelled_waiter_passes_its_slot_on()
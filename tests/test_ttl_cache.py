@@ -0,0 +1,36 @@
+import sys
+import os
+import time
+# Add parent directory to path to import from app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.cache import TTLLRUCache
+
+def test_lru_eviction():
+    print("Testing LRU eviction...")
+    cache = TTLLRUCache(max_size=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # 'a' is now most recent
+    cache.set("c", 3)           # evicts 'b'
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evicted"] == 1
+    print("LRU eviction passed!")
+
+def test_ttl_expiry():
+    print("Testing TTL expiry...")
+    cache = TTLLRUCache(max_size=10, ttl_seconds=0.05)
+    cache.set("q", [0.1, 0.2])
+    assert cache.get("q") == [0.1, 0.2]
+    time.sleep(0.1)
+    assert cache.get("q") is None
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["expired"] == 1
+    assert stats["hit_ratio"] == 0.5
+    print("TTL expiry passed!")
+
+if __name__ == "__main__":
+    test_lru_eviction()
+    test_ttl_expiry()